@@ -0,0 +1,130 @@
+"""
+Answer Cache Module
+In-memory semantic cache of consensus answers for repeated questions.
+
+Answers are scoped to (repository URL, commit, conversation key), so a new
+commit never serves an old answer and a follow-up question only matches
+answers given after the same recent turns. Within a scope, a question hits when its embedding is close
+enough to a previously answered one. Entries expire after a TTL and the
+least recently used entry is evicted once the cache is full.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+# Cosine similarity above which two questions are treated as the same question
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+
+_answer_cache = None
+
+
+def _normalize(embedding):
+    """Return the embedding as a unit-length float32 vector."""
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class AnswerCache:
+    """Semantic LRU/TTL cache of answers keyed by repository URL, commit and conversation key."""
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+                 similarity_threshold=ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # entry id -> entry dict, least recently used first
+        self._entries = OrderedDict()
+        # (repo_url, commit, history_key) -> set of entry ids
+        self._scopes = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        scope_ids = self._scopes[entry['scope']]
+        scope_ids.discard(entry_id)
+        if not scope_ids:
+            del self._scopes[entry['scope']]
+
+    def _expire(self, scope, now):
+        """Drop expired entries of one scope."""
+        for entry_id in list(self._scopes.get(scope, ())):
+            if now - self._entries[entry_id]['created'] > self.ttl_seconds:
+                self._remove(entry_id)
+
+    def lookup(self, repo_url, commit, question_embedding, history_key=''):
+        """
+        Return the cached answer for the most similar earlier question, or None.
+
+        Only questions asked against the same repository URL and commit, with
+        the same history_key ('' for a fresh conversation), are considered,
+        and only above the similarity threshold.
+        """
+        query = _normalize(question_embedding)
+        with self._lock:
+            scope = (repo_url, commit, history_key)
+            self._expire(scope, time.time())
+            entry_ids = list(self._scopes.get(scope, ()))
+            if entry_ids:
+                similarities = np.stack([self._entries[entry_id]['embedding'] for entry_id in entry_ids]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    entry_id = entry_ids[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id]['answer']
+            self.misses += 1
+            return None
+
+    def store(self, repo_url, commit, question, question_embedding, answer, history_key=''):
+        """Cache an answer, evicting the least recently used entries when full."""
+        with self._lock:
+            scope = (repo_url, commit, history_key)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                'scope': scope,
+                'question': question,
+                'embedding': _normalize(question_embedding),
+                'answer': answer,
+                'created': time.time()
+            }
+            self._scopes.setdefault(scope, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        """Drop every cached answer (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def stats(self):
+        """Return hit/miss counters and cache size."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+def get_answer_cache():
+    """Lazy-load the process-wide answer cache."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+    return _answer_cache
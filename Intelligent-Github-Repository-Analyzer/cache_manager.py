@@ -1,13 +1,55 @@
 """
 Cache Manager Module
 Handles repository caching operations for faster repeated access.
+
+Each cached repository is a directory of flat files: chunk texts and
+metadata (chunk_store), BM25/TF-IDF arrays (lexical_index) and a small
+manifest.json that is written last. Arrays are memory-mapped on load, so
+opening a cache costs the same regardless of repository size and never
+executes pickled code.
+
+Eviction only reads manifests and the mtime of each entry's access marker,
+and runs on a background thread so it never delays a request. Dense
+embeddings live in a shared Chroma store outside the entry directories;
+when a CollectionStore is given, an evicted entry's collection is deleted
+with it and the store's disk use counts toward the budget.
 """
 
 import os
 import hashlib
-import pickle
+import json
 import time
 import shutil
+import threading
+from collections import namedtuple
+from chunk_store import ChunkStore, write_chunk_store, CHUNK_STORE_FILES
+from lexical_index import LexicalIndex
+
+CACHE_FORMAT_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+FILE_HASHES_FILE = "file_hashes.json"
+# Empty file whose mtime records the last load or save of an entry
+ACCESS_MARKER_FILE = "last_access"
+# Written by older versions; never loaded
+LEGACY_CACHE_FILE = "cache_data.pkl"
+# Written into an entry independently of its manifest (graph_utils), possibly
+# into an entry that has no manifest at all; sized separately for the budget
+GRAPH_CACHE_FILE = "dependency_graph.npz"
+SIDECAR_FILES = (GRAPH_CACHE_FILE,)
+
+# Eviction policy: entries unused for this long are removed, then the least
+# recently used entries go until the cache fits the disk budget
+CACHE_MAX_AGE_HOURS = float(os.getenv("CACHE_MAX_AGE_HOURS", str(24 * 7)))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# Minimum gap between background eviction passes
+CACHE_EVICTION_INTERVAL_SECONDS = float(os.getenv("CACHE_EVICTION_INTERVAL_SECONDS", "600"))
+
+# disk_usage() -> bytes used by the whole collection store; delete(name) drops one collection
+CollectionStore = namedtuple('CollectionStore', ['disk_usage', 'delete'])
+
+_eviction_lock = threading.Lock()
+_eviction_thread = None
+_last_eviction = 0.0
 
 
 def get_repo_hash(repo_url):
@@ -21,65 +63,273 @@ def get_cache_path(repo_url, cache_dir):
     return os.path.join(cache_dir, repo_hash)
 
 
+def read_manifest(cache_path):
+    """Return a cache directory's manifest, or None if it is missing, unreadable or outdated"""
+    try:
+        with open(os.path.join(cache_path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format_version') != CACHE_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def _touch_access_marker(cache_path):
+    """Record that an entry was just used"""
+    try:
+        with open(os.path.join(cache_path, ACCESS_MARKER_FILE), 'a'):
+            pass
+        os.utime(os.path.join(cache_path, ACCESS_MARKER_FILE))
+    except OSError:
+        pass
+
+
+def touch_cache_entry(cache_path):
+    """Record a use of a cache entry for LRU eviction (for sidecar readers and writers)"""
+    _touch_access_marker(cache_path)
+
+
+def _directory_size(path):
+    """Total size of the regular files directly inside path"""
+    total = 0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    total += entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        pass
+    return total
+
+
 def is_repo_cached(repo_url, cache_dir):
     """Check if repository is already cached"""
-    cache_path = get_cache_path(repo_url, cache_dir)
-    return os.path.exists(cache_path) and os.path.exists(os.path.join(cache_path, "cache_data.pkl"))
+    return read_manifest(get_cache_path(repo_url, cache_dir)) is not None
+
+
+def is_cache_stale(repo_url, cache_dir, max_age_hours=24):
+    """Check if a cached repository is old enough to be refreshed from upstream"""
+    manifest = read_manifest(get_cache_path(repo_url, cache_dir))
+    if manifest is None:
+        return True
+    return time.time() - manifest['timestamp'] > max_age_hours * 3600
 
 
-def save_repo_cache(repo_url, cache_dir, index, document, file_type_count, file_names):
-    """Save repository processing results to cache"""
+def save_repo_cache(repo_url, cache_dir, index, document, file_type_count, file_names, collection_store=None):
+    """Save repository processing results to cache
+
+    A full re-index writes a new Chroma collection; with collection_store the
+    one the previous manifest pointed to is deleted once the new entry is in place.
+    """
     cache_path = get_cache_path(repo_url, cache_dir)
-    if not os.path.exists(cache_path):
-        os.makedirs(cache_path)
+    previous_manifest = read_manifest(cache_path)
+    staging_path = f"{cache_path}.tmp-{os.getpid()}"
+    shutil.rmtree(staging_path, ignore_errors=True)
+    os.makedirs(staging_path)
     
-    # Drop non-serializable Chroma objects; keep collection name for reload
-    if isinstance(index, dict) and index.get("chroma_collection") is not None:
-        index = {k: v for k, v in index.items() if k != "chroma_collection"}
-
-    cache_data = {
-        'index': index,
-        'document': document,
-        'file_type_count': file_type_count,
-        'file_names': file_names,
-        'timestamp': time.time()
-    }
+    # Chroma objects are not saved; the collection is reopened by name on load
+    index = index if isinstance(index, dict) else {}
+    lexical_index = index.get("lexical")
+    written_files = list(CHUNK_STORE_FILES) + [FILE_HASHES_FILE]
+    try:
+        write_chunk_store(staging_path, document)
+        if lexical_index is not None:
+            lexical_index.save(staging_path)
+            written_files += LexicalIndex.file_names()
+        with open(os.path.join(staging_path, FILE_HASHES_FILE), 'w', encoding='utf-8') as f:
+            json.dump(index.get("file_hashes") or {}, f)
+        
+        manifest = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'repo_url': repo_url,
+            'timestamp': time.time(),
+            # Lets eviction budget disk use without listing every entry's files
+            'size_bytes': _directory_size(staging_path),
+            'num_chunks': len(document),
+            'file_type_count': file_type_count,
+            'has_lexical_index': lexical_index is not None,
+            'chroma_collection_name': index.get("chroma_collection_name"),
+            'commit': index.get("commit")
+        }
+        with open(os.path.join(staging_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        
+        # Invalidate the old entry first so a crash part-way never pairs old and new files.
+        # os.replace keeps replaced files alive for any cache that still has them mapped.
+        os.makedirs(cache_path, exist_ok=True)
+        for name in (MANIFEST_FILE, LEGACY_CACHE_FILE):
+            try:
+                os.remove(os.path.join(cache_path, name))
+            except FileNotFoundError:
+                pass
+        for name in written_files + [MANIFEST_FILE]:
+            os.replace(os.path.join(staging_path, name), os.path.join(cache_path, name))
+        _touch_access_marker(cache_path)
+    finally:
+        shutil.rmtree(staging_path, ignore_errors=True)
     
-    with open(os.path.join(cache_path, "cache_data.pkl"), 'wb') as f:
-        pickle.dump(cache_data, f)
+    previous_collection = previous_manifest.get('chroma_collection_name') if previous_manifest else None
+    if collection_store is not None and previous_collection and previous_collection != manifest['chroma_collection_name']:
+        collection_store.delete(previous_collection)
 
 
 def load_repo_cache(repo_url, cache_dir):
     """Load repository processing results from cache"""
     cache_path = get_cache_path(repo_url, cache_dir)
-    cache_file = os.path.join(cache_path, "cache_data.pkl")
+    manifest = read_manifest(cache_path)
+    if manifest is None:
+        return None, None, None, None
     
-    if os.path.exists(cache_file):
-        with open(cache_file, 'rb') as f:
-            cache_data = pickle.load(f)
-        index = cache_data['index']
-        return index, cache_data['document'], cache_data['file_type_count'], cache_data['file_names']
-    return None, None, None, None
-
-
-def clear_old_cache(cache_dir, max_age_hours=24):
-    """Clear cache files older than specified hours"""
-    if not os.path.exists(cache_dir):
-        return
+    try:
+        document = ChunkStore(cache_path)
+        lexical_index = LexicalIndex.load(cache_path) if manifest['has_lexical_index'] else None
+        with open(os.path.join(cache_path, FILE_HASHES_FILE), 'r', encoding='utf-8') as f:
+            file_hashes = json.load(f)
+    except (OSError, ValueError, KeyError) as ex:
+        print(f"Failed to load cache for {repo_url}: {ex}")
+        return None, None, None, None
+    _touch_access_marker(cache_path)
     
-    current_time = time.time()
-    for cache_folder in os.listdir(cache_dir):
-        cache_path = os.path.join(cache_dir, cache_folder)
-        cache_file = os.path.join(cache_path, "cache_data.pkl")
-        
-        if os.path.exists(cache_file):
+    index = {
+        "lexical": lexical_index,
+        "chroma_collection": None,
+        "chroma_collection_name": manifest.get('chroma_collection_name'),
+        # Built from the chunk store on first dense search
+        "chunk_positions": None,
+        "file_hashes": file_hashes,
+        "commit": manifest.get('commit')
+    }
+    return index, document, manifest['file_type_count'], document.chunk_sources()
+
+
+def list_cache_entries(cache_dir):
+    """
+    Describe every entry in the cache directory from its manifest alone.
+
+    Returns dicts with 'path', 'size_bytes', 'last_access', 'valid',
+    'has_sidecar', 'num_chunks' and 'chroma_collection_name'. Entries
+    without a readable manifest (old pickle caches, interrupted saves,
+    sidecar-only entries) are reported with valid=False. Sidecar files are
+    stat'ed and added to the manifest's size.
+    """
+    entries = []
+    try:
+        folders = [entry for entry in os.scandir(cache_dir) if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return entries
+    
+    for folder in folders:
+        manifest = read_manifest(folder.path)
+        try:
+            last_access = os.path.getmtime(os.path.join(folder.path, ACCESS_MARKER_FILE))
+        except OSError:
+            last_access = manifest['timestamp'] if manifest is not None else folder.stat().st_mtime
+        size_bytes = manifest.get('size_bytes') if manifest is not None else None
+        sidecar_bytes = 0
+        has_sidecar = False
+        for name in SIDECAR_FILES:
             try:
-                with open(cache_file, 'rb') as f:
-                    cache_data = pickle.load(f)
-                
-                if current_time - cache_data['timestamp'] > max_age_hours * 3600:
-                    shutil.rmtree(cache_path)
-                    print(f"Cleared old cache for {cache_folder}")
-            except:
-                # If we can't read the cache file, remove it
-                shutil.rmtree(cache_path)
+                sidecar_bytes += os.path.getsize(os.path.join(folder.path, name))
+                has_sidecar = True
+            except OSError:
+                pass
+        entries.append({
+            'path': folder.path,
+            'size_bytes': size_bytes + sidecar_bytes if size_bytes is not None else _directory_size(folder.path),
+            'last_access': last_access,
+            'valid': manifest is not None,
+            'has_sidecar': has_sidecar,
+            'num_chunks': manifest.get('num_chunks', 0) if manifest is not None else 0,
+            'chroma_collection_name': manifest.get('chroma_collection_name') if manifest is not None else None,
+            'legacy': os.path.exists(os.path.join(folder.path, LEGACY_CACHE_FILE))
+        })
+    return entries
+
+
+def evict_cache(cache_dir, max_age_hours=CACHE_MAX_AGE_HOURS, max_bytes=CACHE_MAX_BYTES, collection_store=None):
+    """
+    Remove expired entries, then least recently used ones until the cache fits max_bytes.
+
+    With collection_store, a removed entry's Chroma collection is deleted
+    too, and the store's disk use is shared out over the remaining entries
+    by chunk count before the budget is checked. The most recently used
+    entry is always kept. Returns the removed paths.
+    """
+    current_time = time.time()
+    entries = sorted(list_cache_entries(cache_dir), key=lambda entry: entry['last_access'])
+    removed = []
+    
+    def remove(entry):
+        shutil.rmtree(entry['path'], ignore_errors=True)
+        if collection_store is not None and entry['chroma_collection_name']:
+            collection_store.delete(entry['chroma_collection_name'])
+        removed.append(entry['path'])
+        print(f"Cleared old cache for {os.path.basename(entry['path'])}")
+    
+    kept = []
+    for entry in entries:
+        # Old pickle format, or an entry unused for too long (including abandoned saves)
+        if entry['legacy'] or current_time - entry['last_access'] > max_age_hours * 3600:
+            remove(entry)
+        elif entry['valid'] or entry['has_sidecar']:
+            # Sidecar-only entries (metrics runs without chat indexing) count toward the budget too
+            kept.append(entry)
+    
+    if collection_store is not None:
+        # Collections are not sized individually; attribute the store's bytes by chunk count
+        store_bytes = collection_store.disk_usage()
+        indexed_chunks = sum(entry['num_chunks'] for entry in kept if entry['chroma_collection_name'])
+        for entry in kept:
+            if entry['chroma_collection_name'] and indexed_chunks:
+                entry['size_bytes'] += store_bytes * entry['num_chunks'] // indexed_chunks
+    
+    total_bytes = sum(entry['size_bytes'] for entry in kept)
+    for entry in kept[:-1]:
+        if total_bytes <= max_bytes:
+            break
+        remove(entry)
+        total_bytes -= entry['size_bytes']
+    return removed
+
+
+def clear_old_cache(cache_dir, max_age_hours=CACHE_MAX_AGE_HOURS, max_bytes=CACHE_MAX_BYTES, collection_store=None,
+                    trim_hooks=()):
+    """Clear cache entries unused for longer than max_age_hours, and trim the cache to max_bytes.
+
+    Stale-but-recent caches are kept so they can be refreshed incrementally.
+    Each of trim_hooks is then called with no arguments to keep a shared
+    store (such as the embedding cache) within its own budget.
+    """
+    if os.path.exists(cache_dir):
+        evict_cache(cache_dir, max_age_hours, max_bytes, collection_store)
+    for trim_hook in trim_hooks:
+        try:
+            trim_hook()
+        except Exception as ex:
+            print(f"Cache trim failed: {ex}")
+
+
+def start_cache_eviction(cache_dir, max_age_hours=CACHE_MAX_AGE_HOURS, max_bytes=CACHE_MAX_BYTES,
+                         min_interval_seconds=CACHE_EVICTION_INTERVAL_SECONDS, collection_store=None,
+                         trim_hooks=()):
+    """
+    Run clear_old_cache on a background thread, at most once per min_interval_seconds.
+
+    Returns immediately; safe to call on every request.
+    """
+    global _eviction_thread, _last_eviction
+    with _eviction_lock:
+        now = time.time()
+        if _eviction_thread is not None and _eviction_thread.is_alive():
+            return
+        if now - _last_eviction < min_interval_seconds:
+            return
+        _last_eviction = now
+        _eviction_thread = threading.Thread(
+            target=clear_old_cache,
+            args=(cache_dir, max_age_hours, max_bytes, collection_store, tuple(trim_hooks)),
+            name="cache-eviction",
+            daemon=True
+        )
+        _eviction_thread.start()
@@ -0,0 +1,126 @@
+"""
+Chunk Store Module
+Columnar on-disk storage for indexed chunks.
+
+Chunk texts live in one UTF-8 blob addressed by an offsets array. Metadata
+is a compact table: the list of source paths plus two integer columns
+(source number and chunk number within the file); file and chunk IDs are
+derived from those, exactly as the indexer derives them. ChunkStore reads
+everything through memory maps and only builds LangChain Documents for the
+chunks that are actually accessed.
+"""
+
+import os
+import json
+import uuid
+from collections.abc import Sequence
+import numpy as np
+from langchain_core.documents import Document
+
+CHUNK_TEXT_FILE = "chunks.bin"
+CHUNK_OFFSETS_FILE = "chunk_offsets.npy"
+CHUNK_SOURCE_FILE = "chunk_source.npy"
+CHUNK_INDEX_FILE = "chunk_index.npy"
+SOURCES_FILE = "sources.json"
+CHUNK_STORE_FILES = [CHUNK_TEXT_FILE, CHUNK_OFFSETS_FILE, CHUNK_SOURCE_FILE, CHUNK_INDEX_FILE, SOURCES_FILE]
+
+
+def file_id_for(source):
+    """Stable per-file ID derived from the relative path."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, source))
+
+
+def write_chunk_store(directory, documents):
+    """Write documents (chunks from the indexer) to directory in the columnar layout."""
+    sources = []
+    source_numbers = {}
+    offsets = np.zeros(len(documents) + 1, dtype=np.int64)
+    chunk_source = np.zeros(len(documents), dtype=np.int32)
+    chunk_index = np.zeros(len(documents), dtype=np.int32)
+
+    with open(os.path.join(directory, CHUNK_TEXT_FILE), 'wb') as f:
+        for i, doc in enumerate(documents):
+            data = doc.page_content.encode('utf-8', errors='surrogatepass')
+            f.write(data)
+            offsets[i + 1] = offsets[i] + len(data)
+
+            source = doc.metadata['source']
+            if source not in source_numbers:
+                source_numbers[source] = len(sources)
+                sources.append(source)
+            chunk_source[i] = source_numbers[source]
+            chunk_index[i] = int(doc.metadata['chunk_id'].rsplit('_', 1)[1])
+
+    np.save(os.path.join(directory, CHUNK_OFFSETS_FILE), offsets)
+    np.save(os.path.join(directory, CHUNK_SOURCE_FILE), chunk_source)
+    np.save(os.path.join(directory, CHUNK_INDEX_FILE), chunk_index)
+    with open(os.path.join(directory, SOURCES_FILE), 'w', encoding='utf-8') as f:
+        json.dump(sources, f)
+
+
+class ChunkStore(Sequence):
+    """Read-only, memory-mapped sequence of chunk Documents."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.offsets = np.load(os.path.join(directory, CHUNK_OFFSETS_FILE), mmap_mode='r')
+        self.chunk_source = self._load_column(CHUNK_SOURCE_FILE)
+        self.chunk_index = self._load_column(CHUNK_INDEX_FILE)
+        with open(os.path.join(directory, SOURCES_FILE), 'r', encoding='utf-8') as f:
+            self.sources = json.load(f)
+
+        text_path = os.path.join(directory, CHUNK_TEXT_FILE)
+        # An empty file cannot be memory-mapped
+        self._text = np.memmap(text_path, dtype=np.uint8, mode='r') if os.path.getsize(text_path) else np.empty(0, dtype=np.uint8)
+        self._file_ids = None
+
+    def _load_column(self, name):
+        try:
+            return np.load(os.path.join(self.directory, name), mmap_mode='r')
+        except ValueError:
+            # Empty arrays cannot be memory-mapped
+            return np.load(os.path.join(self.directory, name))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._document(i) for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("chunk position out of range")
+        return self._document(position)
+
+    def _get_file_ids(self):
+        if self._file_ids is None:
+            self._file_ids = [file_id_for(source) for source in self.sources]
+        return self._file_ids
+
+    def text(self, position):
+        """Decode one chunk's text straight from the blob."""
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return self._text[start:end].tobytes().decode('utf-8', errors='surrogatepass')
+
+    def _document(self, position):
+        source_number = int(self.chunk_source[position])
+        file_id = self._get_file_ids()[source_number]
+        return Document(
+            page_content=self.text(position),
+            metadata={
+                "source": self.sources[source_number],
+                "file_id": file_id,
+                "chunk_id": f"{file_id}_chunk_{int(self.chunk_index[position])}"
+            }
+        )
+
+    def chunk_sources(self):
+        """Source path of every chunk, without decoding any text."""
+        return np.asarray(self.sources, dtype=object)[np.asarray(self.chunk_source)].tolist()
+
+    def chunk_ids(self):
+        """chunk_id of every chunk, without decoding any text."""
+        file_ids = self._get_file_ids()
+        return [f"{file_ids[source_number]}_chunk_{index}"
+                for source_number, index in zip(self.chunk_source.tolist(), self.chunk_index.tolist())]
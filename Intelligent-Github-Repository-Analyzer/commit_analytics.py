@@ -0,0 +1,150 @@
+"""
+Commit Analytics Module
+Columnar commit tables and vectorized history aggregates for the metrics dashboard.
+
+History is loaded once into two DataFrames: one row per commit, and one row
+per (commit, file) change pointing back at its commit's row. Every chart
+statistic is a group-by over those frames, so re-aggregating for a time
+window is a boolean mask plus a few group-bys rather than another walk over
+the history.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Share of commits the smallest group of authors must cover to count as the bus factor
+BUS_FACTOR_THRESHOLD = 0.5
+TOP_CONTRIBUTORS = 10
+
+# Dashboard time windows, in days before the most recent commit (None = whole history)
+HISTORY_WINDOWS = {
+    "All time": None,
+    "Last year": 365,
+    "Last 90 days": 90,
+    "Last 30 days": 30
+}
+
+
+def build_commit_tables(commit_records):
+    """
+    Load CommitRecords (see git_history) into (commits, file_changes) DataFrames.
+
+    commits has one row per commit: hash, author, email, timestamp (epoch
+    seconds), date, message, files_changed, insertions, deletions.
+    file_changes has one row per changed file: commit (row position in
+    commits), path, insertions, deletions.
+    """
+    hashes, authors, emails, timestamps, messages = [], [], [], [], []
+    files_changed, insertions, deletions = [], [], []
+    change_commits, change_paths, change_insertions, change_deletions = [], [], [], []
+
+    for row, commit in enumerate(commit_records):
+        hashes.append(commit.hexsha)
+        authors.append(commit.author)
+        emails.append(commit.email)
+        timestamps.append(commit.timestamp)
+        messages.append(commit.message)
+        files_changed.append(len(commit.files))
+        added = removed = 0
+        for file_change in commit.files:
+            change_commits.append(row)
+            change_paths.append(file_change.path)
+            change_insertions.append(file_change.insertions)
+            change_deletions.append(file_change.deletions)
+            added += file_change.insertions
+            removed += file_change.deletions
+        insertions.append(added)
+        deletions.append(removed)
+
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    commits = pd.DataFrame({
+        'hash': hashes,
+        'author': pd.Categorical(authors),
+        'email': pd.Categorical(emails),
+        'timestamp': timestamps,
+        'date': pd.to_datetime(timestamps, unit='s'),
+        'message': messages,
+        'files_changed': np.asarray(files_changed, dtype=np.int32),
+        'insertions': np.asarray(insertions, dtype=np.int64),
+        'deletions': np.asarray(deletions, dtype=np.int64)
+    })
+    file_changes = pd.DataFrame({
+        'commit': np.asarray(change_commits, dtype=np.int32),
+        'path': pd.Categorical(change_paths),
+        'insertions': np.asarray(change_insertions, dtype=np.int64),
+        'deletions': np.asarray(change_deletions, dtype=np.int64)
+    })
+    return commits, file_changes
+
+
+def window_start(commits, days):
+    """Start of a window of `days` ending at the most recent commit, or None for the whole history."""
+    if days is None or commits.empty:
+        return None
+    return commits['date'].max() - pd.Timedelta(days=days)
+
+
+def bus_factor(author_counts, threshold=BUS_FACTOR_THRESHOLD):
+    """Fewest authors whose commits add up to `threshold` of the total (author_counts sorted descending)."""
+    total = author_counts.sum()
+    if not total:
+        return 0
+    shares = np.cumsum(author_counts.to_numpy()) / total
+    return int(np.searchsorted(shares, threshold) + 1)
+
+
+def summarize_history(commits, file_changes, since=None):
+    """
+    Aggregate the commit tables for the dashboard, optionally from `since` onwards.
+
+    Returns total_commits, author_stats and top_contributors (commits per
+    author, descending), daily_commits (commits per day), weekly_churn
+    (lines inserted/deleted per week), file_changes (commits per path),
+    bus_factor, single_author_files, repo_age_days, first_commit_date and
+    last_commit_date.
+    """
+    # Author of each file change, looked up before filtering while row positions still line up
+    change_authors = commits['author'].cat.codes.to_numpy()[file_changes['commit'].to_numpy()]
+    if since is not None:
+        in_window = (commits['date'] >= since).to_numpy()
+        change_in_window = in_window[file_changes['commit'].to_numpy()]
+        commits = commits[in_window]
+        file_changes = file_changes[change_in_window]
+        change_authors = change_authors[change_in_window]
+
+    author_counts = commits.groupby('author', observed=True).size().sort_values(ascending=False, kind='stable')
+    daily_commits = commits.groupby(commits['date'].dt.normalize()).size()
+    weekly_churn = commits.set_index('date')[['insertions', 'deletions']].resample('W').sum()
+    path_changes = file_changes.groupby('path', observed=True).size().sort_values(ascending=False, kind='stable')
+    authors_per_path = pd.Series(change_authors).groupby(file_changes['path'].cat.codes.to_numpy()).nunique()
+
+    if commits.empty:
+        first_date = last_date = None
+        repo_age_days = 0
+    else:
+        first_date = commits['date'].min()
+        last_date = commits['date'].max()
+        repo_age_days = (last_date - first_date).days
+
+    return {
+        'total_commits': len(commits),
+        'author_stats': author_counts,
+        'top_contributors': author_counts.head(TOP_CONTRIBUTORS),
+        'daily_commits': daily_commits,
+        'weekly_churn': weekly_churn,
+        'file_changes': path_changes,
+        'bus_factor': bus_factor(author_counts),
+        'single_author_files': int((authors_per_path == 1).sum()),
+        'repo_age_days': repo_age_days,
+        'first_commit_date': first_date,
+        'last_commit_date': last_date
+    }
+
+
+def empty_history_metrics():
+    """History metrics for a repository whose git history is unavailable."""
+    commits, file_changes = build_commit_tables([])
+    metrics = summarize_history(commits, file_changes)
+    metrics['commit_table'] = commits
+    metrics['file_change_table'] = file_changes
+    return metrics
@@ -0,0 +1,204 @@
+"""
+Dependency Graph Module
+Two-phase module dependency resolution for the architecture diagram.
+
+Phase one indexes every module the scan found: a map from dotted name to
+module, plus a trie over reversed name components, so an import can match
+the tail of a module path (`utils` or `app.utils` for `src/app/utils.py`).
+Phase two resolves each file's imports against that index. The graph does
+not depend on the order files were visited, and each lookup costs the
+length of the import name rather than the number of modules. Python
+imports are read with `ast`, which also sees relative and nested imports.
+"""
+
+import os
+import ast
+from collections import namedtuple
+import networkx as nx
+
+# module is the imported name ('' for `from . import x`), level the number of leading dots,
+# names the names imported by a `from` import
+ImportRef = namedtuple('ImportRef', ['module', 'level', 'names'])
+
+# Skip built-in modules but keep local ones
+BUILTIN_MODULES = frozenset([
+    'os', 'sys', 'time', 'datetime', 'json', 'urllib', 're', 'math',
+    'collections', 'itertools', 'functools', 'typing', 'pathlib',
+    'tempfile', 'hashlib', 'pickle', 'shutil', 'random', 'subprocess'
+])
+JS_EXTENSIONS = frozenset(['.js', '.jsx', '.ts', '.tsx'])
+# Files that stand for their directory: `import pkg` is pkg/__init__.py, `import './dir'` is dir/index.js
+PACKAGE_FILES = ('__init__', 'index')
+
+
+def parse_python_imports(text):
+    """ImportRefs of every import statement in a Python source, or None if it does not parse."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(ImportRef(alias.name, 0, ()) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append(ImportRef(node.module or '', node.level, tuple(alias.name for alias in node.names)))
+    return imports
+
+
+class ModuleIndex:
+    """Dotted-name map plus a suffix trie over the repository's module names."""
+
+    def __init__(self, module_names=()):
+        self.by_name = {}
+        # component -> [children, modules whose name ends with the path to here]
+        self._suffixes = {}
+        for module_name in module_names:
+            self.add(module_name)
+
+    def add(self, module_name):
+        names = [module_name]
+        package, _, last = module_name.rpartition('.')
+        if last in PACKAGE_FILES and package:
+            names.append(package)
+        for name in names:
+            current = self.by_name.get(name)
+            # A module's own name beats a package alias; colliding aliases go to the smallest name
+            if current is None or (current != name and (name == module_name or module_name < current)):
+                self.by_name[name] = module_name
+            children = self._suffixes
+            for component in reversed(name.split('.')):
+                entry = children.setdefault(component, [{}, set()])
+                entry[1].add(module_name)
+                children = entry[0]
+
+    def suffix_matches(self, name):
+        """Modules whose dotted name ends with all components of name."""
+        children = self._suffixes
+        entry = None
+        for component in reversed(name.split('.')):
+            entry = children.get(component)
+            if entry is None:
+                return []
+            children = entry[0]
+        return list(entry[1]) if entry else []
+
+    def resolve(self, name, importer):
+        """
+        Module for an absolute dotted name, or None if it is not in the repository.
+
+        An exact name wins; otherwise the suffix match sharing the longest
+        package prefix with the importing module (then the shortest name).
+        """
+        if name in self.by_name:
+            return self.by_name[name]
+        candidates = self.suffix_matches(name)
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+        # Ties are broken on the name, so the result never depends on insertion order
+        importer_parts = importer.split('.')
+        return min(candidates, key=lambda candidate: (-_shared_prefix(candidate.split('.'), importer_parts),
+                                                      len(candidate), candidate))
+
+
+def _shared_prefix(parts, other_parts):
+    shared = 0
+    for part, other in zip(parts, other_parts):
+        if part != other:
+            break
+        shared += 1
+    return shared
+
+
+def _is_external_candidate(name, max_parts):
+    return len(name.split('.')) <= max_parts and not any(marker in name for marker in ['http', 'www', 'github'])
+
+
+def _python_targets(ref, module_name, index):
+    """Modules (or ext: nodes) a Python import depends on."""
+    if ref.level:
+        # Package of the importer: a module's parent, or the package itself for __init__
+        parts = module_name.split('.')[:-1]
+        if ref.level - 1 > len(parts):
+            return []
+        parts = parts[:len(parts) - (ref.level - 1)]
+        base = '.'.join(parts + ([ref.module] if ref.module else []))
+        # `from . import views` imports a submodule; `from .models import User` a name
+        targets = [index.by_name[f"{base}.{name}" if base else name] for name in ref.names
+                   if (f"{base}.{name}" if base else name) in index.by_name]
+        if not targets and base in index.by_name:
+            targets.append(index.by_name[base])
+        return targets
+
+    if ref.module.split('.')[0] in BUILTIN_MODULES:
+        return []
+    targets = [target for target in (index.resolve(f"{ref.module}.{name}", module_name) for name in ref.names) if target]
+    if not targets:
+        target = index.resolve(ref.module, module_name)
+        if target:
+            targets.append(target)
+        elif _is_external_candidate(ref.module, 2):
+            # It might be an external library, add it but mark differently
+            targets.append(f"ext:{ref.module}")
+    return targets
+
+
+def _js_targets(ref, rel_path, index):
+    imported = ref.module
+    if imported.startswith('./') or imported.startswith('../'):
+        resolved_path = os.path.normpath(os.path.join(os.path.dirname(rel_path), imported))
+        resolved_module = resolved_path.replace(os.sep, '.').replace('/', '.')
+        stem, ext = os.path.splitext(resolved_path)
+        if ext in JS_EXTENSIONS:
+            # Explicit extension: './Button.jsx'
+            resolved_module = stem.replace(os.sep, '.').replace('/', '.')
+        # Stylesheets, JSON and other non-module files are not drawn
+        return [index.by_name[resolved_module]] if resolved_module in index.by_name else []
+    if imported.startswith('.') or imported.startswith('http') or imported in BUILTIN_MODULES:
+        return []
+    # External module
+    if not imported.startswith('@') and len(imported.split('.')) <= 3:
+        return [imported]
+    return []
+
+
+def _other_targets(ref):
+    imported = ref.module
+    if (imported.startswith('.') or imported in BUILTIN_MODULES or
+            imported.startswith('http') or imported.startswith('std::')):
+        return []
+    # Avoid very long module names
+    return [imported] if len(imported.split('.')) <= 3 else []
+
+
+def resolve_imports(record, index):
+    """Dependency targets of one import record (see file_analyzers) against the module index."""
+    targets = []
+    for ref in record['imports']:
+        if record['file_type'] == '.py':
+            targets.extend(_python_targets(ref, record['module'], index))
+        elif record['file_type'] in JS_EXTENSIONS:
+            targets.extend(_js_targets(ref, record['file_path'], index))
+        else:
+            targets.extend(_other_targets(ref))
+    return targets
+
+
+def build_dependency_graph(records):
+    """
+    Build the module dependency DiGraph from per-file import records.
+
+    Every module is indexed before any import is resolved. Nodes carry
+    lines, complexity, file_path and file_type; unresolved Python imports
+    that look like libraries become `ext:` nodes.
+    """
+    index = ModuleIndex(record['module'] for record in records)
+    G = nx.DiGraph()
+    for record in records:
+        G.add_node(record['module'], lines=record['lines'], complexity=record['complexity'],
+                   file_path=record['file_path'], file_type=record['file_type'])
+    for record in records:
+        for target in resolve_imports(record, index):
+            if target != record['module']:
+                G.add_edge(record['module'], target)
+    return G
@@ -0,0 +1,272 @@
+"""
+Embedding Cache Module
+Content-addressed on-disk store of chunk embeddings, shared across repositories.
+
+Embeddings are keyed by a hash of (model name, chunk text), so vendored files,
+licenses, forks and re-clones of a previously seen repository are only
+embedded once. Vectors live in an append-only float32 file that is read
+through a memory map; a parallel file holds the 16-byte keys.
+
+The files are shared by every Streamlit session and worker process. Each
+access holds an flock on the store's lock file and first catches up with
+rows other processes appended, so a row number always refers to the same
+key in every process. trim_embedding_cache keeps each store within
+EMBEDDING_CACHE_MAX_BYTES by dropping its oldest rows; it runs with the
+repository cache eviction.
+"""
+
+import os
+import hashlib
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows: the store is then only safe within one process
+    fcntl = None
+
+EMBEDDING_CACHE_DIR = "./embedding_cache"
+KEY_SIZE = 16
+# Per model store; trimming keeps the newest rows that fit in TRIM_TARGET of it
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(1024 ** 3)))
+TRIM_TARGET = 0.8
+
+
+def content_key(model_name, text):
+    """Hash (model name, chunk text) into a fixed-size cache key."""
+    digest = hashlib.blake2b(digest_size=KEY_SIZE)
+    digest.update(model_name.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(text.encode('utf-8', errors='surrogatepass'))
+    return digest.digest()
+
+
+class EmbeddingCache:
+    """Append-only, memory-mapped embedding store for one model."""
+
+    def __init__(self, cache_dir, model_name, dimension):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.hits = 0
+        self.misses = 0
+
+        safe_name = "".join(c if c.isalnum() or c in '-_.' else '_' for c in model_name)
+        self.store_dir = os.path.join(cache_dir, f"{safe_name}-{dimension}")
+        os.makedirs(self.store_dir, exist_ok=True)
+        self.keys_path = os.path.join(self.store_dir, "keys.bin")
+        self.vectors_path = os.path.join(self.store_dir, "vectors.f32")
+        self.lock_path = os.path.join(self.store_dir, "lock")
+        self.row_bytes = dimension * 4
+
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._rows = {}
+        # Identity of the key file the index was read from; trimming replaces it
+        self._keys_inode = None
+        with self._store_lock(exclusive=True):
+            self._sync_index()
+            self._truncate_to_index()
+
+    @contextmanager
+    def _store_lock(self, exclusive):
+        """Hold the thread lock and an flock on the store (shared for reads)."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a+b') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _sync_index(self):
+        """
+        Catch the row index up with the files; call with the store lock held.
+
+        Rows appended by other processes are read from the end of the key
+        file. A replaced key file (after a trim) is read again from the start.
+        Vectors written without a key (interrupted append) are not indexed.
+        """
+        try:
+            keys_stat = os.stat(self.keys_path)
+            vector_rows = os.path.getsize(self.vectors_path) // self.row_bytes
+        except FileNotFoundError:
+            keys_stat, vector_rows = None, 0
+        n_rows = min(keys_stat.st_size // KEY_SIZE, vector_rows) if keys_stat else 0
+        inode = (keys_stat.st_dev, keys_stat.st_ino) if keys_stat else None
+
+        if inode != self._keys_inode or n_rows < len(self._rows):
+            self._rows = {}
+            self._vectors = None
+            self._keys_inode = inode
+        if n_rows == len(self._rows):
+            return
+        start = len(self._rows)
+        with open(self.keys_path, 'rb') as f:
+            f.seek(start * KEY_SIZE)
+            keys = f.read((n_rows - start) * KEY_SIZE)
+        for i in range(n_rows - start):
+            self._rows[keys[i * KEY_SIZE:(i + 1) * KEY_SIZE]] = start + i
+
+    def _truncate_to_index(self):
+        """Cut both files back to the indexed rows; call with the exclusive lock held."""
+        with open(self.keys_path, 'ab') as f:
+            f.truncate(len(self._rows) * KEY_SIZE)
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(len(self._rows) * self.row_bytes)
+        stat = os.stat(self.keys_path)
+        self._keys_inode = (stat.st_dev, stat.st_ino)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _vector_view(self):
+        """Memory-map the vector file, remapping after appends."""
+        if self._vectors is None or len(self._vectors) != len(self._rows):
+            if not self._rows:
+                return np.empty((0, self.dimension), dtype=np.float32)
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(len(self._rows), self.dimension))
+        return self._vectors
+
+    def get_many(self, keys):
+        """Return (rows, found_mask) for a list of keys; missing rows are zero."""
+        result = np.zeros((len(keys), self.dimension), dtype=np.float32)
+        found = np.zeros(len(keys), dtype=bool)
+        with self._store_lock(exclusive=False):
+            self._sync_index()
+            positions = [self._rows.get(key) for key in keys]
+            hit_idx = [i for i, pos in enumerate(positions) if pos is not None]
+            if hit_idx:
+                vectors = self._vector_view()
+                result[hit_idx] = vectors[[positions[i] for i in hit_idx]]
+                found[hit_idx] = True
+        return result, found
+
+    def put_many(self, keys, embeddings):
+        """Append new embeddings; keys already present are skipped."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._store_lock(exclusive=True):
+            # Rows other processes appended since our last access come first
+            self._sync_index()
+            new_idx = []
+            seen = set()
+            for i, key in enumerate(keys):
+                if key not in self._rows and key not in seen:
+                    seen.add(key)
+                    new_idx.append(i)
+            if not new_idx:
+                return
+
+            # Drop any orphan vectors so the appended rows line up with their keys
+            self._truncate_to_index()
+            # Vectors first, then keys: a crash in between only leaves orphan vectors
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.ascontiguousarray(embeddings[new_idx]).tobytes())
+            with open(self.keys_path, 'ab') as f:
+                f.write(b''.join(keys[i] for i in new_idx))
+
+            start = len(self._rows)
+            for offset, i in enumerate(new_idx):
+                self._rows[keys[i]] = start + offset
+            self._vectors = None
+
+    def disk_usage(self):
+        """Bytes used by the key and vector files."""
+        try:
+            return os.path.getsize(self.keys_path) + os.path.getsize(self.vectors_path)
+        except OSError:
+            return 0
+
+    def trim(self, max_bytes=EMBEDDING_CACHE_MAX_BYTES):
+        """
+        Keep the store within max_bytes by dropping its oldest rows.
+
+        The newest rows that fit in TRIM_TARGET of max_bytes are copied to
+        new files, which replace the old ones; other processes notice the
+        replaced key file and re-read their index. Returns the rows dropped.
+        """
+        with self._store_lock(exclusive=True):
+            self._sync_index()
+            if self.disk_usage() <= max_bytes:
+                return 0
+            n_rows = len(self._rows)
+            keep = min(n_rows, int(max_bytes * TRIM_TARGET) // (self.row_bytes + KEY_SIZE))
+            start = n_rows - keep
+
+            staging_suffix = f".tmp-{os.getpid()}"
+            with open(self.vectors_path, 'rb') as source, open(self.vectors_path + staging_suffix, 'wb') as target:
+                source.seek(start * self.row_bytes)
+                target.write(source.read(keep * self.row_bytes))
+            with open(self.keys_path, 'rb') as source, open(self.keys_path + staging_suffix, 'wb') as target:
+                source.seek(start * KEY_SIZE)
+                target.write(source.read(keep * KEY_SIZE))
+            # Readers hold the lock too, so they never see one file replaced without the other
+            os.replace(self.vectors_path + staging_suffix, self.vectors_path)
+            os.replace(self.keys_path + staging_suffix, self.keys_path)
+
+            self._keys_inode = None
+            self._sync_index()
+            return start
+
+    def encode(self, embedder, texts, **encode_kwargs):
+        """
+        Embed texts, sending only cache misses to the model.
+
+        Returns a float32 array of shape (len(texts), dimension).
+        """
+        keys = [content_key(self.model_name, text) for text in texts]
+        embeddings, found = self.get_many(keys)
+
+        # Deduplicate misses so identical chunks in one batch are embedded once
+        miss_positions = {}
+        for i in np.flatnonzero(~found):
+            miss_positions.setdefault(keys[i], []).append(i)
+        self.hits += int(found.sum())
+        self.misses += len(miss_positions)
+
+        if miss_positions:
+            first_positions = [positions[0] for positions in miss_positions.values()]
+            new_embeddings = embedder.encode([texts[i] for i in first_positions], convert_to_numpy=True, **encode_kwargs)
+            new_embeddings = np.asarray(new_embeddings, dtype=np.float32)
+            for row, positions in zip(new_embeddings, miss_positions.values()):
+                embeddings[positions] = row
+            self.put_many(list(miss_positions.keys()), new_embeddings)
+
+        return embeddings
+
+    def stats(self):
+        """Return hit/miss counters and store size."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._rows),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+def trim_embedding_cache(cache_dir=EMBEDDING_CACHE_DIR, max_bytes=EMBEDDING_CACHE_MAX_BYTES):
+    """
+    Trim every model store under cache_dir to max_bytes.
+
+    Stores are opened from their directory names (`<model>-<dimension>`), so
+    no embedding model is loaded. Returns the number of rows dropped.
+    """
+    dropped = 0
+    try:
+        store_names = [entry.name for entry in os.scandir(cache_dir) if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return dropped
+    for store_name in store_names:
+        model_name, _, dimension = store_name.rpartition('-')
+        if not model_name or not dimension.isdigit():
+            continue
+        try:
+            dropped += EmbeddingCache(cache_dir, model_name, int(dimension)).trim(max_bytes)
+        except OSError as ex:
+            print(f"Failed to trim embedding cache {store_name}: {ex}")
+    return dropped
@@ -0,0 +1,313 @@
+"""
+File Analyzers Module
+Per-file analyzers run by file_scanner.scan_repository.
+
+Line counting (file-system metrics), secret scanning and code-quality
+checks (security report) and import extraction (architecture diagram) all
+work on the same decoded text, so one scan of the repository feeds every
+tab of the dashboard.
+
+Security rules are matched by a PatternScanner: one alternation of the
+rules' literal prefixes finds candidate positions in a single pass, and only
+the rules whose prefix occurs there are tried, anchored at that position.
+"""
+
+import os
+import re
+from bisect import bisect_right
+from collections import namedtuple
+from file_scanner import ScanAnalyzer
+from file_walker import is_under_dir
+from dependency_graph import ImportRef, parse_python_imports
+
+# Extensions whose lines are counted for the file-system metrics
+LINE_COUNT_EXTENSIONS = frozenset([
+    '.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.c', '.cpp', '.cs',
+    '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala', '.r', '.m',
+    '.sh', '.bash', '.sql', '.html', '.htm', '.css', '.scss', '.xml',
+    '.json', '.yaml', '.yml', '.md', '.txt'
+])
+
+# Security patterns to detect
+SECURITY_PATTERNS = {
+    'hardcoded_secrets': [
+        r'password\s*=\s*["\'][^"\']{3,}["\']',
+        r'api_key\s*=\s*["\'][^"\']{10,}["\']',
+        r'secret\s*=\s*["\'][^"\']{8,}["\']',
+        r'token\s*=\s*["\'][^"\']{10,}["\']',
+        r'private_key\s*=\s*["\'][^"\']{20,}["\']'
+    ],
+    'sql_injection': [
+        r'execute\s*\(\s*["\'].*%.*["\']',
+        r'query\s*\(\s*["\'].*\+.*["\']',
+        r'SELECT.*\+.*FROM',
+        r'INSERT.*\+.*VALUES'
+    ],
+    'weak_crypto': [
+        r'md5\s*\(',
+        r'sha1\s*\(',
+        r'DES\s*\(',
+        r'RC4\s*\('
+    ],
+    'unsafe_eval': [
+        r'eval\s*\(',
+        r'exec\s*\(',
+        r'os\.system\s*\(',
+        r'subprocess\.call.*shell\s*=\s*True'
+    ],
+    'insecure_requests': [
+        r'http://.*requests\.',
+        r'verify\s*=\s*False',
+        r'ssl_verify\s*=\s*False',
+        r'InsecureRequestWarning'
+    ]
+}
+# Source files the security scan covers (build output is skipped)
+SECURITY_EXTENSIONS = frozenset(['.py', '.js', '.java', '.php', '.rb', '.go', '.cs', '.cpp', '.c'])
+SECURITY_SKIP_DIRS = frozenset(['build', 'dist'])
+
+SecurityRule = namedtuple('SecurityRule', ['category', 'pattern', 'regex'])
+
+# Code quality patterns (Python only)
+QUALITY_PATTERNS = {
+    'todo_comments': r'(todo|fixme|hack|xxx)',
+    'empty_catch': r'except.*:\s*pass',
+}
+
+# Language-specific import patterns (Python is parsed with ast; its patterns are the fallback)
+IMPORT_PATTERNS = {
+    '.py': [
+        r'^from\s+([a-zA-Z_][a-zA-Z0-9_.]*)\s+import',
+        r'^import\s+([a-zA-Z_][a-zA-Z0-9_.]*)',
+    ],
+    '.js': [
+        r'from\s+["\']([^"\']+)["\']',
+        r'import\s+.*\s+from\s+["\']([^"\']+)["\']',
+        r'require\s*\(\s*["\']([^"\']+)["\']\s*\)',
+    ],
+    '.jsx': [
+        r'from\s+["\']([^"\']+)["\']',
+        r'import\s+.*\s+from\s+["\']([^"\']+)["\']',
+    ],
+    '.ts': [
+        r'from\s+["\']([^"\']+)["\']',
+        r'import\s+.*\s+from\s+["\']([^"\']+)["\']',
+    ],
+    '.tsx': [
+        r'from\s+["\']([^"\']+)["\']',
+        r'import\s+.*\s+from\s+["\']([^"\']+)["\']',
+    ],
+    '.java': [
+        r'import\s+([a-zA-Z_][a-zA-Z0-9_.]*);',
+    ],
+    '.cpp': [
+        r'#include\s+[<"]([^>"]+)[>"]',
+    ],
+    '.c': [
+        r'#include\s+[<"]([^>"]+)[>"]',
+    ]
+}
+# Simple complexity estimate based on keywords
+COMPLEXITY_KEYWORDS = ['if', 'for', 'while', 'try', 'catch', 'switch', 'case']
+
+
+def count_lines(text):
+    """Number of lines, as len(f.readlines()) would report."""
+    if not text:
+        return 0
+    return text.count('\n') + (not text.endswith('\n'))
+
+
+def _accepts_line_count(repo_file):
+    return repo_file.ext.lower() in LINE_COUNT_EXTENSIONS
+
+
+def _map_line_count(repo_file, text):
+    return count_lines(text)
+
+
+def _reduce_line_count(results):
+    """{rel_path: lines}"""
+    return {repo_file.rel_path: lines for repo_file, lines in results}
+
+
+def _literal_prefix(pattern):
+    """Lowercased literal text that every match of pattern starts with ('' if none)."""
+    if '|' in pattern:
+        return ''
+    literal = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            literal.append(pattern[i + 1])
+            i += 2
+        elif char.isalnum() or char in '_:/':
+            literal.append(char)
+            i += 1
+        else:
+            break
+    # A quantifier makes the last character optional or repeated
+    if i < len(pattern) and pattern[i] in '*?{' and literal:
+        literal.pop()
+    return ''.join(literal).lower()
+
+
+class PatternScanner:
+    """Matches a {category: [pattern, ...]} rule set against a text in one pass."""
+
+    def __init__(self, patterns):
+        self.rules = [SecurityRule(category, pattern, re.compile(pattern, re.IGNORECASE))
+                      for category, category_patterns in patterns.items() for pattern in category_patterns]
+
+        rules_by_literal = {}
+        # Rules without a literal prefix are searched on their own
+        self.unanchored = []
+        for index, rule in enumerate(self.rules):
+            literal = _literal_prefix(rule.pattern)
+            if literal:
+                rules_by_literal.setdefault(literal, []).append(index)
+            else:
+                self.unanchored.append(index)
+
+        # Longest first, so a position reports the longest literal found there; every rule
+        # whose literal is a prefix of that one (exec / execute) is a candidate too
+        self.literals = sorted(rules_by_literal, key=len, reverse=True)
+        self.candidates = {
+            literal: sorted(index for other in self.literals if literal.startswith(other)
+                            for index in rules_by_literal[other])
+            for literal in self.literals
+        }
+        # The prefilter consumes each literal it finds, so literals that can start inside
+        # another one (verify inside ssl_verify) are checked at those offsets explicitly
+        self.overlaps = {
+            literal: [(offset, other) for offset in range(1, len(literal)) for other in self.literals
+                      if other[:len(literal) - offset] == literal[offset:offset + len(other)]]
+            for literal in self.literals
+        }
+        # A plain alternation of literals keeps re's literal-prefix search; named groups
+        # would disable it, so the matched text is looked up instead
+        self.prefilter = re.compile('|'.join(re.escape(literal) for literal in self.literals)) if self.literals else None
+
+    def _anchored_hits(self, content, literal, position, hits):
+        for index in self.candidates[literal]:
+            if self.rules[index].regex.match(content, position):
+                hits.add((index, position))
+
+    def scan(self, text):
+        """
+        Return {category: {'pattern': first matching rule, 'lines': [line, ...]}}.
+
+        Like re.search(pattern, text.lower(), re.IGNORECASE) per rule, but in
+        one pass; every line with a match is reported once per category.
+        """
+        content = text.lower()
+        hits = set()
+        if self.prefilter is not None:
+            for match in self.prefilter.finditer(content):
+                literal = match.group()
+                position = match.start()
+                self._anchored_hits(content, literal, position, hits)
+                for offset, other in self.overlaps[literal]:
+                    if content.startswith(other, position + offset):
+                        self._anchored_hits(content, other, position + offset, hits)
+        for index in self.unanchored:
+            hits.update((index, match.start()) for match in self.rules[index].regex.finditer(content))
+        if not hits:
+            return {}
+
+        newlines = [match.start() for match in re.finditer('\n', content)]
+        found = {}
+        for index, position in sorted(hits):
+            rule = self.rules[index]
+            finding = found.setdefault(rule.category, {'pattern': rule.pattern, 'lines': set()})
+            finding['lines'].add(bisect_right(newlines, position) + 1)
+        for finding in found.values():
+            finding['lines'] = sorted(finding['lines'])
+        return found
+
+
+SECURITY_SCANNER = PatternScanner(SECURITY_PATTERNS)
+
+
+def _accepts_secrets(repo_file):
+    return repo_file.ext in SECURITY_EXTENSIONS and not is_under_dir(repo_file, SECURITY_SKIP_DIRS)
+
+
+def _map_secrets(repo_file, text):
+    """{category: {'pattern', 'lines'}} for one file."""
+    return SECURITY_SCANNER.scan(text)
+
+
+def _reduce_secrets(results):
+    """{'files_scanned': n, 'issues': {category: [{'file', 'pattern', 'lines'}, ...]}}"""
+    issues = {}
+    for repo_file, found in results:
+        for category, finding in found.items():
+            issues.setdefault(category, []).append({'file': repo_file.rel_path, **finding})
+    return {'files_scanned': len(results), 'issues': issues}
+
+
+def _accepts_quality(repo_file):
+    # Focus on Python for quality analysis
+    return repo_file.ext == '.py'
+
+
+def _map_quality(repo_file, text):
+    return {
+        'todos': len(re.findall(QUALITY_PATTERNS['todo_comments'], text, re.IGNORECASE)),
+        'empty_catch': 1 if re.search(QUALITY_PATTERNS['empty_catch'], text) else 0
+    }
+
+
+def _reduce_quality(results):
+    """{issue: total} for issues found at least once."""
+    totals = {}
+    for _, counts in results:
+        for issue, count in counts.items():
+            if count:
+                totals[issue] = totals.get(issue, 0) + count
+    return totals
+
+
+def _accepts_imports(repo_file):
+    return repo_file.ext.lower() in IMPORT_PATTERNS
+
+
+def _map_imports(repo_file, text):
+    """Module name, size, complexity and ImportRefs of one source file."""
+    file_ext = repo_file.ext.lower()
+    rel_path = repo_file.rel_path
+    module_name = rel_path.replace(os.sep, '.').replace('/', '.')
+    if file_ext in ['.py', '.js', '.jsx', '.ts', '.tsx']:
+        module_name = module_name[:-len(file_ext)]
+
+    lowered = text.lower()
+    imports = parse_python_imports(text) if file_ext == '.py' else None
+    if imports is None:
+        imports = []
+        for pattern in IMPORT_PATTERNS[file_ext]:
+            imports.extend(ImportRef(imported.strip(), 0, ()) for imported in re.findall(pattern, text, re.MULTILINE))
+
+    return {
+        'module': module_name,
+        'file_path': rel_path,
+        'file_type': file_ext,
+        'lines': len(text.splitlines()),
+        'complexity': sum(lowered.count(keyword) for keyword in COMPLEXITY_KEYWORDS),
+        'imports': imports
+    }
+
+
+def _reduce_imports(results):
+    """Per-file import records, in walk order."""
+    return [record for _, record in results]
+
+
+LINE_COUNTER = ScanAnalyzer('line_counts', _accepts_line_count, _map_line_count, _reduce_line_count)
+SECRET_SCANNER = ScanAnalyzer('secrets', _accepts_secrets, _map_secrets, _reduce_secrets)
+QUALITY_CHECKER = ScanAnalyzer('quality', _accepts_quality, _map_quality, _reduce_quality)
+IMPORT_EXTRACTOR = ScanAnalyzer('imports', _accepts_imports, _map_imports, _reduce_imports)
+
+# Everything the "Analyze Repository Metrics" button needs, in one scan
+DEFAULT_ANALYZERS = [LINE_COUNTER, SECRET_SCANNER, QUALITY_CHECKER, IMPORT_EXTRACTOR]
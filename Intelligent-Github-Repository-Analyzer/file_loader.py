@@ -0,0 +1,80 @@
+"""
+File Loader Module
+Reads, sniffs and chunks repository files for indexing.
+
+Kept free of heavy imports (Chroma, sentence-transformers) so that
+process-pool workers start quickly.
+"""
+
+import os
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from utility import clean_and_tokenize
+
+CHUNK_SIZE = 3000
+CHUNK_OVERLAP = 200
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB limit
+
+_text_splitter = None
+
+
+def get_text_splitter():
+    """Lazy-load the text splitter (one per process)."""
+    global _text_splitter
+    if _text_splitter is None:
+        _text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return _text_splitter
+
+
+def load_file_content(file_path):
+    """Load content from a single file with robust error handling"""
+    try:
+        # Skip very large files
+        if os.path.getsize(file_path) > MAX_FILE_SIZE:
+            return None
+
+        # Try different encodings
+        encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'iso-8859-1']
+        content = None
+
+        for encoding in encodings:
+            try:
+                with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
+                    content = f.read()
+                break
+            except (UnicodeDecodeError, UnicodeError, PermissionError):
+                continue
+            except Exception:
+                continue
+
+        if content is None:
+            return None
+
+        # Skip empty or very short files
+        if len(content.strip()) < 5:
+            return None
+
+        # Basic binary detection - skip files with too many null bytes or non-printable chars
+        if '\x00' in content[:1000] or content.count('\x00') > 10:
+            return None
+
+        # Check if file appears to be text (reasonable ratio of printable characters)
+        sample = content[:2000]  # Check first 2KB
+        if sample:
+            printable_count = sum(1 for c in sample if c.isprintable() or c in '\n\r\t')
+            if printable_count / len(sample) < 0.7:  # Less than 70% printable = likely binary
+                return None
+
+        return content
+
+    except Exception as e:
+        print(f"Error loading file {file_path}: {e}")
+        return None
+
+
+def split_and_tokenize(content):
+    """Split one file's content into chunks and tokenize each chunk.
+
+    Returns a list of (chunk_text, tokens) tuples in chunk order.
+    """
+    chunks = get_text_splitter().split_text(content)
+    return [(chunk, clean_and_tokenize(chunk)) for chunk in chunks]
@@ -0,0 +1,120 @@
+"""
+File Scanner Module
+Single-read scan engine shared by the file-system, security and architecture analyzers.
+
+Each file is read and decoded once; its text is handed to every registered
+analyzer that accepts the file (map), and each analyzer then folds its
+per-file results into one summary (reduce). Files above MMAP_THRESHOLD_BYTES
+are decoded straight from a memory map instead of being copied through a
+read buffer first.
+
+On large repositories the map phase runs in a process pool: workers read
+and analyze contiguous batches of files and send back only the per-file
+results, which the parent reduces in walk order.
+"""
+
+import os
+import mmap
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+MMAP_THRESHOLD_BYTES = int(os.getenv("MMAP_THRESHOLD_BYTES", str(1024 * 1024)))
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", str(os.cpu_count() or 1)))
+# Below this many files to read, starting a process pool costs more than it saves
+PARALLEL_SCAN_MIN_FILES = int(os.getenv("PARALLEL_SCAN_MIN_FILES", "500"))
+SCAN_BATCH_SIZE = 256
+
+# accepts(repo_file) -> bool
+# map(repo_file, text) -> per-file result
+# reduce([(repo_file, result), ...]) -> summary
+ScanAnalyzer = namedtuple('ScanAnalyzer', ['name', 'accepts', 'map', 'reduce'])
+
+
+def read_text(path, size=None):
+    """
+    Read a file as UTF-8 text (undecodable bytes dropped, newlines translated).
+
+    Matches open(path, 'r', encoding='utf-8', errors='ignore').read().
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        if size and size >= MMAP_THRESHOLD_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                text = str(buffer, 'utf-8', 'ignore')
+        else:
+            text = f.read().decode('utf-8', 'ignore')
+    # Universal newlines, as text-mode reads do
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _map_files(repo_files, analyzers):
+    """Map phase over a batch of files: {analyzer name: [(repo_file, result), ...]}."""
+    per_file = {analyzer.name: [] for analyzer in analyzers}
+
+    for repo_file in repo_files:
+        interested = [analyzer for analyzer in analyzers if analyzer.accepts(repo_file)]
+        if not interested:
+            continue
+        try:
+            text = read_text(repo_file.path, repo_file.size)
+        except (OSError, ValueError):
+            continue
+        for analyzer in interested:
+            try:
+                per_file[analyzer.name].append((repo_file, analyzer.map(repo_file, text)))
+            except Exception as e:
+                print(f"{analyzer.name} failed on {repo_file.rel_path}: {e}")
+
+    return per_file
+
+
+def _parallel_map(repo_files, analyzers, workers):
+    """
+    Run _map_files over contiguous batches in a process pool.
+
+    Returns the merged per-file results in walk order, or None if the pool
+    cannot be used (e.g. an analyzer that cannot be pickled).
+    """
+    # Several batches per worker keeps cores busy when file sizes are uneven
+    batch_size = max(1, min(SCAN_BATCH_SIZE, -(-len(repo_files) // (workers * 4))))
+    batches = [repo_files[start:start + batch_size] for start in range(0, len(repo_files), batch_size)]
+    try:
+        # spawn: forking a process that runs Streamlit and background threads is not safe
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)),
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            batch_results = list(executor.map(_map_files, batches, [analyzers] * len(batches)))
+    except Exception as e:
+        print(f"Parallel scan unavailable, scanning serially: {e}")
+        return None
+
+    per_file = {analyzer.name: [] for analyzer in analyzers}
+    for batch_result in batch_results:
+        for name, results in batch_result.items():
+            per_file[name].extend(results)
+    return per_file
+
+
+def scan_repository(repo_files, analyzers, workers=SCAN_WORKERS):
+    """
+    Run every analyzer over repo_files, reading each file at most once.
+
+    Files no analyzer accepts are never opened. Unreadable files are skipped
+    for all analyzers; an analyzer that fails on a file skips just that file.
+    With workers > 1 and at least PARALLEL_SCAN_MIN_FILES files to read, the
+    map phase runs in a process pool; analyzers must then be picklable
+    (module-level functions). Reduce always runs once, in this process, on
+    results in walk order. Returns {analyzer.name: reduced result}.
+    """
+    wanted = [repo_file for repo_file in repo_files if any(analyzer.accepts(repo_file) for analyzer in analyzers)]
+
+    per_file = None
+    if workers > 1 and len(wanted) >= PARALLEL_SCAN_MIN_FILES:
+        per_file = _parallel_map(wanted, analyzers, workers)
+    if per_file is None:
+        per_file = _map_files(wanted, analyzers)
+
+    return {analyzer.name: analyzer.reduce(per_file[analyzer.name]) for analyzer in analyzers}
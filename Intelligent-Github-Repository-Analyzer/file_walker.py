@@ -0,0 +1,78 @@
+"""
+File Walker Module
+Single-pass repository traversal shared by the indexer and the analyzers.
+"""
+
+import os
+from collections import namedtuple
+
+# Directories that are never worth descending into
+DEFAULT_SKIP_DIRS = frozenset({'.git', 'node_modules', '__pycache__', '.venv', 'venv'})
+
+RepoFile = namedtuple('RepoFile', ['path', 'rel_path', 'ext', 'size'])
+
+
+def walk_repository(repo_path, skip_dirs=DEFAULT_SKIP_DIRS, skip_hidden=True):
+    """
+    Walk the repository tree once using os.scandir.
+
+    Ignored and (optionally) hidden directories are pruned before they are
+    entered. Returns RepoFile entries sorted by relative path; `ext` keeps the
+    leading dot and its original case.
+    """
+    repo_files = []
+    pending_dirs = ['']
+
+    while pending_dirs:
+        rel_dir = pending_dirs.pop()
+        abs_dir = os.path.join(repo_path, rel_dir) if rel_dir else repo_path
+        try:
+            with os.scandir(abs_dir) as entries:
+                entries = list(entries)
+        except OSError:
+            continue
+
+        for entry in entries:
+            name = entry.name
+            if skip_hidden and name.startswith('.'):
+                continue
+            rel_path = os.path.join(rel_dir, name) if rel_dir else name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in skip_dirs:
+                        pending_dirs.append(rel_path)
+                elif entry.is_file():
+                    repo_files.append(RepoFile(
+                        path=entry.path,
+                        rel_path=rel_path,
+                        ext=os.path.splitext(name)[1],
+                        size=entry.stat().st_size
+                    ))
+            except OSError:
+                # Broken symlinks, permission problems, files removed mid-walk
+                continue
+
+    repo_files.sort(key=lambda repo_file: repo_file.rel_path)
+    return repo_files
+
+
+def group_by_extension(repo_files, extensions, case_sensitive=False):
+    """Route files into {extension: [RepoFile, ...]} for the given extension set."""
+    if case_sensitive:
+        wanted = set(extensions)
+        key = lambda repo_file: repo_file.ext
+    else:
+        wanted = {ext.lower() for ext in extensions}
+        key = lambda repo_file: repo_file.ext.lower()
+
+    groups = {}
+    for repo_file in repo_files:
+        ext = key(repo_file)
+        if ext in wanted:
+            groups.setdefault(ext, []).append(repo_file)
+    return groups
+
+
+def is_under_dir(repo_file, dir_names):
+    """True if any parent directory of the file is one of dir_names."""
+    return any(part in dir_names for part in repo_file.rel_path.split(os.sep)[:-1])
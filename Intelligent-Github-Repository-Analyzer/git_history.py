@@ -0,0 +1,128 @@
+"""
+Git History Module
+Streams commit metadata and per-file line counts out of a single `git log` process.
+
+One `git log --numstat` call replaces a `git diff` subprocess per commit;
+its output is parsed incrementally, so memory stays flat however long the
+history is. git's stderr goes to a temporary file rather than a pipe, so a
+chatty stderr (progress from lazy blob fetches in a partial clone) can
+never block the process while stdout is being read.
+
+Records are split on ASCII separators. Commit messages may contain them,
+so a chunk that does not start with a commit header is joined back onto
+the previous record, the message is taken up to the last field separator,
+and records that still do not parse are skipped.
+"""
+
+import os
+import re
+import subprocess
+import tempfile
+from collections import namedtuple
+
+# 0 means the whole history
+MAX_HISTORY_COMMITS = int(os.getenv("MAX_HISTORY_COMMITS", "0"))
+
+# ASCII record/unit separators; only commit messages can contain them
+RECORD_SEP = '\x1e'
+FIELD_SEP = '\x1f'
+LOG_FORMAT = '%x1e%H%x1f%an%x1f%ae%x1f%ct%x1f%B%x1f'
+READ_SIZE = 1 << 16
+# Hash, author, email and timestamp at the start of every record
+RECORD_HEADER = re.compile(r'[0-9a-f]{40,64}\x1f[^\x1f]*\x1f[^\x1f]*\x1f\d+\x1f')
+
+CommitRecord = namedtuple('CommitRecord', ['hexsha', 'author', 'email', 'timestamp', 'message', 'files'])
+FileChange = namedtuple('FileChange', ['path', 'insertions', 'deletions'])
+
+
+def _parse_record(record):
+    """Turn one RECORD_SEP-delimited record of `git log` output into a CommitRecord, or None if malformed."""
+    if not RECORD_HEADER.match(record):
+        return None
+    hexsha, author, email, timestamp, rest = record.split(FIELD_SEP, 4)
+    # The message may contain FIELD_SEP; numstat lines cannot (git quotes control characters in paths)
+    message, separator, numstat = rest.rpartition(FIELD_SEP)
+    if not separator:
+        return None
+    files = []
+    for line in numstat.splitlines():
+        parts = line.split('\t', 2)
+        if len(parts) != 3:
+            continue
+        insertions, deletions, path = parts
+        # Binary files report '-' for both counts
+        files.append(FileChange(
+            path=path,
+            insertions=int(insertions) if insertions.isdigit() else 0,
+            deletions=int(deletions) if deletions.isdigit() else 0
+        ))
+    return CommitRecord(hexsha, author, email, int(timestamp), message.strip(), files)
+
+
+def _join_records(chunks):
+    """
+    Regroup RECORD_SEP-split chunks into whole records.
+
+    A chunk that does not start with a commit header came from a RECORD_SEP
+    inside a commit message and belongs to the record before it.
+    """
+    pending = None
+    for chunk in chunks:
+        if RECORD_HEADER.match(chunk):
+            if pending is not None:
+                yield pending
+            pending = chunk
+        elif pending is not None:
+            pending += RECORD_SEP + chunk
+    if pending is not None:
+        yield pending
+
+
+def iter_commit_history(repo_path, max_count=None, all_refs=True):
+    """
+    Yield CommitRecords newest first from one streamed `git log --numstat`.
+
+    Merge commits are diffed against their first parent and renames are
+    reported as a delete plus an add, matching GitPython's commit.stats.
+    Raises subprocess.CalledProcessError if git fails.
+    """
+    command = ['git', '-C', repo_path, 'log', f'--format={LOG_FORMAT}', '--numstat',
+               '--no-renames', '--diff-merges=first-parent']
+    if all_refs:
+        command.append('--all')
+    if max_count:
+        command.append(f'--max-count={max_count}')
+
+    def read_chunks(stdout):
+        buffer = ''
+        while True:
+            data = stdout.read(READ_SIZE)
+            if not data:
+                break
+            buffer += data
+            # Every chunk but the last is complete once the next separator has arrived
+            chunks = buffer.split(RECORD_SEP)
+            buffer = chunks.pop()
+            yield from chunks
+        yield buffer
+
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file,
+                                   text=True, encoding='utf-8', errors='replace')
+        skipped = 0
+        try:
+            for record in _join_records(read_chunks(process.stdout)):
+                commit = _parse_record(record)
+                if commit is None:
+                    skipped += 1
+                    continue
+                yield commit
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if skipped:
+            print(f"Skipped {skipped} malformed git log records in {repo_path}")
+        if returncode != 0:
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode('utf-8', errors='replace')
+            raise subprocess.CalledProcessError(returncode, command, stderr=stderr)
@@ -0,0 +1,232 @@
+"""
+Graph Layout Module
+Node positions for large dependency graphs, cached per graph.
+
+Mostly acyclic graphs get a layered (Sugiyama-style) layout: import cycles
+are collapsed into their strongly connected components, components are
+layered by longest path from the entry points, and each layer is ordered by
+barycenter sweeps to reduce crossings. Graphs dominated by one big cycle
+fall back to a Fruchterman-Reingold force layout computed on numpy arrays.
+Layouts are cached by a hash of the graph's nodes and edges, so Streamlit
+reruns do not recompute them.
+
+The array helpers at the bottom turn a laid-out graph into the flat
+coordinate arrays the WebGL architecture chart draws from: one NaN-separated
+polyline for all edges, and a role per node computed from degree arrays.
+"""
+
+import os
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import networkx as nx
+
+LAYOUT_CACHE_MAX_ENTRIES = int(os.getenv("LAYOUT_CACHE_MAX_ENTRIES", "32"))
+# Use the force layout when the largest import cycle holds more than this share of the modules
+HIERARCHY_MAX_CYCLE_SHARE = 0.5
+# Layers wider than this wrap onto several rows
+MAX_ROW_WIDTH = 40
+BARYCENTER_SWEEPS = 4
+FORCE_ITERATIONS = 50
+# Pairwise repulsion evaluations per force layout; bounds iterations on big graphs
+FORCE_PAIR_BUDGET = 1e8
+FORCE_BLOCK_ELEMENTS = 2_000_000
+
+# Above this many nodes the architecture chart drops text labels and relies on hover
+LABELED_NODES_MAX = int(os.getenv("LABELED_NODES_MAX", "200"))
+# Architecture roles in rule priority order: (legend name, color)
+NODE_ROLES = [
+    ('Entry points', '#ff6b6b'),
+    ('Leaf modules', '#4ecdc4'),
+    ('Core / shared', '#45b7d1'),
+    ('Heavy dependency users', '#f9ca24'),
+    ('Hubs', '#6c5ce7'),
+    ('Balanced', '#a8e6cf'),
+]
+
+_layout_cache = OrderedDict()
+_layout_cache_lock = threading.Lock()
+
+
+def graph_hash(G):
+    """Stable hash of a graph's node and edge sets."""
+    digest = hashlib.md5()
+    for node in sorted(map(str, G.nodes())):
+        digest.update(node.encode('utf-8', errors='surrogatepass') + b'\0')
+    digest.update(b'\1')
+    for source, target in sorted((str(source), str(target)) for source, target in G.edges()):
+        digest.update(f"{source}\0{target}\0".encode('utf-8', errors='surrogatepass'))
+    return digest.hexdigest()
+
+
+def _barycenter_order(layers, n_nodes, predecessors, successors):
+    """Reorder each layer by the mean relative position of its neighbours, sweeping down then up."""
+    position = np.zeros(n_nodes)
+    for layer in layers:
+        position[layer] = np.arange(len(layer)) / max(len(layer) - 1, 1)
+
+    for sweep in range(BARYCENTER_SWEEPS):
+        downward = sweep % 2 == 0
+        neighbours = predecessors if downward else successors
+        for layer_index in (range(1, len(layers)) if downward else range(len(layers) - 2, -1, -1)):
+            layer = layers[layer_index]
+            keys = [float(np.mean(position[neighbours[node]])) if neighbours[node] else position[node] for node in layer]
+            order = np.argsort(keys, kind='stable')
+            layers[layer_index] = [layer[i] for i in order]
+            position[layers[layer_index]] = np.arange(len(layer)) / max(len(layer) - 1, 1)
+    return layers
+
+
+def hierarchical_layout(G):
+    """
+    Layered layout: entry points at the top, leaf dependencies at the bottom.
+
+    Members of an import cycle share one slot in their layer and are placed
+    next to each other. Returns {node: (x, y)} scaled to roughly [-1, 1].
+    """
+    condensed = nx.condensation(G)
+    members = nx.get_node_attributes(condensed, 'members')
+
+    layers = [sorted(generation) for generation in nx.topological_generations(condensed)]
+    predecessors = {node: list(condensed.predecessors(node)) for node in condensed}
+    successors = {node: list(condensed.successors(node)) for node in condensed}
+    layers = _barycenter_order(layers, condensed.number_of_nodes(), predecessors, successors)
+
+    pos = {}
+    row = 0
+    for layer in layers:
+        layer_nodes = [node for component in layer for node in sorted(members[component], key=str)]
+        for start in range(0, len(layer_nodes), MAX_ROW_WIDTH):
+            row_nodes = layer_nodes[start:start + MAX_ROW_WIDTH]
+            offset = (len(row_nodes) - 1) / 2
+            for column, node in enumerate(row_nodes):
+                pos[node] = (column - offset, -float(row))
+            row += 1
+        # Extra gap between layers, so wrapped rows of one layer stay visually grouped
+        row += 1
+    return _normalize(pos)
+
+
+def force_layout(G, iterations=FORCE_ITERATIONS, seed=42):
+    """
+    Fruchterman-Reingold layout computed with numpy.
+
+    Repulsion is evaluated in blocks of rows so memory stays bounded, and
+    the number of iterations shrinks on large graphs to stay within
+    FORCE_PAIR_BUDGET. Returns {node: (x, y)} scaled to roughly [-1, 1].
+    """
+    nodes = list(G.nodes())
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: (0.0, 0.0)}
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges() if u != v], dtype=np.int64).reshape(-1, 2)
+
+    iterations = max(10, min(iterations, int(FORCE_PAIR_BUDGET / (n * n))))
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2))
+    k = 1.0 / math.sqrt(n)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    block = max(1, FORCE_BLOCK_ELEMENTS // n)
+
+    for _ in range(iterations):
+        displacement = np.zeros((n, 2))
+        # Repulsion between every pair: k^2 / d along the separating vector
+        for start in range(0, n, block):
+            delta = pos[start:start + block, None, :] - pos[None, :, :]
+            distance_sq = np.maximum(np.einsum('ijk,ijk->ij', delta, delta), 1e-6)
+            displacement[start:start + block] += np.einsum('ijk,ij->ik', delta, (k * k) / distance_sq)
+        # Attraction along edges: d^2 / k
+        if len(edges):
+            delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+            pull = delta * (np.sqrt(np.einsum('ij,ij->i', delta, delta)) / k)[:, None]
+            np.subtract.at(displacement, edges[:, 0], pull)
+            np.add.at(displacement, edges[:, 1], pull)
+        length = np.maximum(np.sqrt(np.einsum('ij,ij->i', displacement, displacement)), 1e-9)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    return _normalize({node: (float(x), float(y)) for node, (x, y) in zip(nodes, pos)})
+
+
+def _normalize(pos):
+    """Center positions and scale the longer side to [-1, 1]."""
+    if not pos:
+        return pos
+    coords = np.array(list(pos.values()), dtype=np.float64)
+    center = (coords.max(axis=0) + coords.min(axis=0)) / 2
+    scale = float(np.max(coords.max(axis=0) - coords.min(axis=0))) / 2 or 1.0
+    coords = (coords - center) / scale
+    return {node: (float(x), float(y)) for node, (x, y) in zip(pos, coords)}
+
+
+def compute_layout(G):
+    """
+    Positions for every node of G, as {node: (x, y)}.
+
+    Layered when import cycles are a minority of the graph, force-directed
+    otherwise. Results are cached by graph_hash.
+    """
+    key = graph_hash(G)
+    with _layout_cache_lock:
+        if key in _layout_cache:
+            _layout_cache.move_to_end(key)
+            return _layout_cache[key]
+
+    if G.number_of_nodes() == 0:
+        pos = {}
+    else:
+        largest_cycle = max(len(component) for component in nx.strongly_connected_components(G))
+        if largest_cycle > 1 and largest_cycle > HIERARCHY_MAX_CYCLE_SHARE * G.number_of_nodes():
+            pos = force_layout(G)
+        else:
+            pos = hierarchical_layout(G)
+
+    with _layout_cache_lock:
+        _layout_cache[key] = pos
+        while len(_layout_cache) > LAYOUT_CACHE_MAX_ENTRIES:
+            _layout_cache.popitem(last=False)
+    return pos
+
+
+def graph_arrays(G, pos):
+    """
+    Index arrays for a laid-out graph.
+
+    Returns (nodes, xy, edges, in_degree, out_degree): the node list, an
+    (n, 2) float array of positions in node order, an (m, 2) int array of
+    edge endpoints as node indices, and the degree arrays.
+    """
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    xy = np.array([pos[node] for node in nodes], dtype=np.float64).reshape(-1, 2)
+    edges = np.array([(index[u], index[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+    in_degree = np.bincount(edges[:, 1], minlength=len(nodes))
+    out_degree = np.bincount(edges[:, 0], minlength=len(nodes))
+    return nodes, xy, edges, in_degree, out_degree
+
+
+def edge_polyline(xy, edges):
+    """x and y arrays drawing every edge as one line trace: x0, x1, NaN per edge."""
+    segments = np.full((len(edges), 3, 2), np.nan)
+    segments[:, 0] = xy[edges[:, 0]]
+    segments[:, 1] = xy[edges[:, 1]]
+    return segments[:, :, 0].ravel(), segments[:, :, 1].ravel()
+
+
+def node_roles(in_degree, out_degree):
+    """Index into NODE_ROLES for every node; the first matching rule wins."""
+    return np.select(
+        [(in_degree == 0) & (out_degree > 0),
+         (out_degree == 0) & (in_degree > 0),
+         in_degree > out_degree * 2,
+         out_degree > in_degree * 2,
+         in_degree + out_degree > 5],
+        np.arange(len(NODE_ROLES) - 1),
+        default=len(NODE_ROLES) - 1
+    )
@@ -1,62 +1,208 @@
 """
 Graph Utilities Module
 Provides functions for graph serialization and deserialization.
+
+Graphs are stored in a compact columnar form: one list of node names, an
+int32 (m, 2) array of edges as node indices (COO), and one array per node
+attribute. Numeric attributes are numpy arrays with a presence mask; other
+values are dictionary-encoded as int32 codes into a list of categories,
+and values that are not plain scalars (lists, dicts) are kept as one JSON
+document per column.
+
+The same form is written next to the repository cache as a single .npz
+file, tagged with the commit the graph was built from, so the architecture
+tab can be restored without re-parsing the repository. A file built from
+another commit is ignored. The file is read with allow_pickle=False.
 """
 
+import os
+import json
+import numpy as np
 import networkx as nx
 import streamlit as st
+from cache_manager import GRAPH_CACHE_FILE, touch_cache_entry
+
+GRAPH_FORMAT_VERSION = 2
+GRAPH_FILE = GRAPH_CACHE_FILE
+_SCALAR_TYPES = (str, int, float, bool, np.number, np.bool_)
+
+_MISSING = object()
+
+
+def _encode_column(values):
+    """Columnar form of one node attribute; values holds _MISSING where a node lacks it."""
+    present = [value for value in values if value is not _MISSING]
+    mask = np.array([value is not _MISSING for value in values], dtype=bool)
+    if all(isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_)) for value in present):
+        array = np.array([value if value is not _MISSING else 0 for value in values], dtype=np.int64)
+        return {'kind': 'int', 'values': array, 'mask': mask}
+    if all(isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)) for value in present):
+        array = np.array([value if value is not _MISSING else np.nan for value in values], dtype=np.float64)
+        return {'kind': 'float', 'values': array, 'mask': mask}
+    if not all(value is None or isinstance(value, _SCALAR_TYPES) for value in present):
+        # Lists, dicts and other objects: one JSON array per column (tuples come back as lists)
+        document = json.dumps([value if value is not _MISSING else None for value in values], default=str)
+        return {'kind': 'json', 'values': np.frombuffer(document.encode('utf-8'), dtype=np.uint8), 'mask': mask}
+
+    # Strings and other scalars: codes into a category list, -1 where missing
+    present = [value.item() if isinstance(value, (np.number, np.bool_)) else value for value in present]
+    values = [value.item() if isinstance(value, (np.number, np.bool_)) else value for value in values]
+    categories = list(dict.fromkeys(present))
+    code_of = {category: code for code, category in enumerate(categories)}
+    codes = np.array([code_of[value] if value is not _MISSING else -1 for value in values], dtype=np.int32)
+    return {'kind': 'category', 'values': codes, 'categories': categories}
+
+
+def _decode_column(column):
+    """Per-node attribute values of a column, _MISSING where absent."""
+    if column['kind'] == 'category':
+        categories = column['categories']
+        return [categories[code] if code >= 0 else _MISSING for code in column['values'].tolist()]
+    if column['kind'] == 'json':
+        decoded = json.loads(column['values'].tobytes().decode('utf-8'))
+        return [value if present else _MISSING for value, present in zip(decoded, column['mask'].tolist())]
+    return [value if present else _MISSING
+            for value, present in zip(column['values'].tolist(), column['mask'].tolist())]
 
 
 def serialize_graph_data(G):
-    """Convert NetworkX graph to serializable format for session state storage"""
+    """Convert NetworkX graph to compact columnar form for session state storage"""
     if len(G.nodes()) == 0:
         return None
-    
+
     try:
-        # Convert graph to simple data structure
-        graph_data = {
-            'nodes': [],
-            'edges': []
+        nodes = list(G.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = np.array([(index[source], index[target]) for source, target in G.edges()],
+                         dtype=np.int32).reshape(-1, 2)
+
+        attribute_names = list(dict.fromkeys(name for _, data in G.nodes(data=True) for name in data))
+        attributes = {
+            name: _encode_column([G.nodes[node].get(name, _MISSING) for node in nodes])
+            for name in attribute_names
+        }
+
+        return {
+            'format_version': GRAPH_FORMAT_VERSION,
+            'nodes': nodes,
+            'edges': edges,
+            'attributes': attributes
         }
-        
-        # Store node data
-        for node in G.nodes():
-            node_data = G.nodes[node] if hasattr(G.nodes[node], 'get') else {}
-            graph_data['nodes'].append({
-                'id': node,
-                'data': dict(node_data)  # Convert to regular dict
-            })
-        
-        # Store edge data
-        for edge in G.edges():
-            graph_data['edges'].append({
-                'source': edge[0],
-                'target': edge[1]
-            })
-        
-        return graph_data
     except Exception as e:
         st.warning(f"⚠️ **Graph Serialization Issue**: Could not serialize architecture data - {str(e)}")
         return None
 
 
 def deserialize_graph_data(graph_data):
-    """Convert serialized graph data back to NetworkX graph"""
+    """Convert serialized graph data back to NetworkX graph (compact or the older per-node dict form)"""
     if not graph_data:
         return nx.DiGraph()
-    
+
     try:
         G = nx.DiGraph()
-        
-        # Add nodes with data
-        for node_info in graph_data['nodes']:
-            G.add_node(node_info['id'], **node_info['data'])
-        
-        # Add edges
-        for edge_info in graph_data['edges']:
-            G.add_edge(edge_info['source'], edge_info['target'])
-        
+
+        if 'format_version' not in graph_data:
+            # Older form: {'nodes': [{'id', 'data'}], 'edges': [{'source', 'target'}]}
+            for node_info in graph_data['nodes']:
+                G.add_node(node_info['id'], **node_info['data'])
+            for edge_info in graph_data['edges']:
+                G.add_edge(edge_info['source'], edge_info['target'])
+            return G
+
+        nodes = graph_data['nodes']
+        columns = {name: _decode_column(column) for name, column in graph_data['attributes'].items()}
+        for i, node in enumerate(nodes):
+            G.add_node(node, **{name: values[i] for name, values in columns.items() if values[i] is not _MISSING})
+        G.add_edges_from((nodes[source], nodes[target]) for source, target in graph_data['edges'].tolist())
+
         return G
     except Exception as e:
         st.warning(f"⚠️ **Graph Deserialization Issue**: Could not restore architecture data - {str(e)}")
         return nx.DiGraph()
+
+
+def save_graph_data(graph_data, cache_path, commit):
+    """
+    Write compact graph data, built from commit, to GRAPH_FILE in a repository's cache directory.
+
+    The file is replaced atomically. Returns True on success.
+    """
+    if not graph_data or 'format_version' not in graph_data:
+        return False
+
+    try:
+        # Names as one UTF-8 blob plus character offsets
+        names = [str(node) for node in graph_data['nodes']]
+        name_offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum([len(name) for name in names], out=name_offsets[1:])
+
+        arrays = {
+            'name_bytes': np.frombuffer(''.join(names).encode('utf-8', errors='surrogatepass'), dtype=np.uint8),
+            'name_offsets': name_offsets,
+            'edges': np.asarray(graph_data['edges'], dtype=np.int32).reshape(-1, 2)
+        }
+        columns = []
+        for i, (name, column) in enumerate(graph_data['attributes'].items()):
+            columns.append({'name': name, 'kind': column['kind'], 'categories': column.get('categories')})
+            arrays[f'column{i}_values'] = column['values']
+            if 'mask' in column:
+                arrays[f'column{i}_mask'] = column['mask']
+        meta = json.dumps({'format_version': GRAPH_FORMAT_VERSION, 'commit': commit, 'columns': columns})
+        arrays['meta'] = np.frombuffer(meta.encode('utf-8'), dtype=np.uint8)
+
+        os.makedirs(cache_path, exist_ok=True)
+        graph_path = os.path.join(cache_path, GRAPH_FILE)
+        staging_path = f"{graph_path}.tmp-{os.getpid()}"
+        try:
+            with open(staging_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(staging_path, graph_path)
+        finally:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+        touch_cache_entry(cache_path)
+        return True
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Failed to save dependency graph to {cache_path}: {e}")
+        return False
+
+
+def load_graph_data(cache_path, commit):
+    """
+    Compact graph data saved by save_graph_data for commit.
+
+    Returns None if the file is missing, unreadable, in an older format, or
+    was built from a different commit.
+    """
+    if not commit:
+        return None
+    try:
+        with np.load(os.path.join(cache_path, GRAPH_FILE), allow_pickle=False) as stored:
+            meta = json.loads(stored['meta'].tobytes().decode('utf-8'))
+            if meta.get('format_version') != GRAPH_FORMAT_VERSION or meta.get('commit') != commit:
+                return None
+
+            text = stored['name_bytes'].tobytes().decode('utf-8', errors='surrogatepass')
+            offsets = stored['name_offsets'].tolist()
+            nodes = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+
+            attributes = {}
+            for i, column in enumerate(meta['columns']):
+                attribute = {'kind': column['kind'], 'values': stored[f'column{i}_values']}
+                if column['kind'] == 'category':
+                    attribute['categories'] = column['categories']
+                else:
+                    attribute['mask'] = stored[f'column{i}_mask']
+                attributes[column['name']] = attribute
+
+            touch_cache_entry(cache_path)
+            return {
+                'format_version': GRAPH_FORMAT_VERSION,
+                'nodes': nodes,
+                'edges': stored['edges'],
+                'attributes': attributes
+            }
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Failed to load dependency graph from {cache_path}: {e}")
+        return None
@@ -0,0 +1,186 @@
+"""
+Lexical Index Module
+BM25 and TF-IDF scoring over a term-major postings matrix stored as numpy arrays.
+
+The index is a handful of flat arrays (sorted vocabulary, postings, per-chunk
+lengths and norms, per-term idf), so it is written with np.save and loaded
+back with mmap_mode='r' without any deserialization work. Scores match
+rank_bm25's BM25Okapi and scikit-learn's TfidfVectorizer (sublinear tf,
+smoothed idf, English stop words removed, L2-normalised rows).
+"""
+
+import os
+import math
+from collections import Counter
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+# BM25Okapi defaults, so rankings match the previous rank_bm25 index
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_EPSILON = 0.25
+
+FILE_PREFIX = "lexical_"
+ARRAY_NAMES = ('vocab', 'vocab_offsets', 'postings_indptr', 'postings_docs', 'postings_tf',
+               'doc_len', 'doc_norm', 'bm25_idf', 'tfidf_idf')
+
+
+def _load_array(path, mmap_mode):
+    """np.load with a memory map, falling back to a plain read for empty arrays."""
+    try:
+        return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+    except ValueError:
+        return np.load(path, allow_pickle=False)
+
+
+class LexicalIndex:
+    """BM25 + TF-IDF index over tokenized chunks, backed by flat numpy arrays."""
+
+    def __init__(self, vocab, vocab_offsets, postings_indptr, postings_docs, postings_tf,
+                 doc_len, doc_norm, bm25_idf, tfidf_idf):
+        # vocab is the UTF-8 bytes of the sorted terms, split by vocab_offsets
+        self.vocab = vocab
+        self.vocab_offsets = vocab_offsets
+        # Postings of term t are postings_docs/postings_tf[postings_indptr[t]:postings_indptr[t + 1]]
+        self.postings_indptr = postings_indptr
+        self.postings_docs = postings_docs
+        self.postings_tf = postings_tf
+        self.doc_len = doc_len
+        self.doc_norm = doc_norm
+        self.bm25_idf = bm25_idf
+        self.tfidf_idf = tfidf_idf
+        self.avgdl = float(np.mean(doc_len)) if len(doc_len) else 0.0
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    @property
+    def num_terms(self):
+        return len(self.vocab_offsets) - 1
+
+    @classmethod
+    def from_tokenized(cls, tokenized_documents):
+        """Build the index from one token list per chunk."""
+        return cls.from_term_counts([Counter(tokens) for tokens in tokenized_documents])
+
+    @classmethod
+    def from_term_counts(cls, term_counts):
+        """Build the index from one {term: count} mapping per chunk."""
+        n_docs = len(term_counts)
+        encoded_terms = sorted({term.encode('utf-8', errors='surrogatepass') for counts in term_counts for term in counts})
+        term_ids = {term.decode('utf-8', errors='surrogatepass'): i for i, term in enumerate(encoded_terms)}
+        n_terms = len(encoded_terms)
+
+        vocab = np.frombuffer(b''.join(encoded_terms), dtype=np.uint8).copy()
+        vocab_offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum([len(term) for term in encoded_terms], out=vocab_offsets[1:])
+
+        # Postings sorted by term, then by chunk
+        doc_column = np.fromiter((d for d, counts in enumerate(term_counts) for _ in counts), dtype=np.int32)
+        term_column = np.fromiter((term_ids[term] for counts in term_counts for term in counts), dtype=np.int32)
+        tf_column = np.fromiter((count for counts in term_counts for count in counts.values()), dtype=np.int32)
+        order = np.lexsort((doc_column, term_column))
+        postings_docs = doc_column[order]
+        postings_tf = tf_column[order]
+        document_frequency = np.bincount(term_column, minlength=n_terms)
+        postings_indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=postings_indptr[1:])
+
+        doc_len = np.bincount(doc_column, weights=tf_column, minlength=n_docs).astype(np.int32)
+
+        # BM25Okapi idf: negative values (terms in most chunks) are floored at epsilon * mean idf
+        bm25_idf = np.log(n_docs - document_frequency + 0.5) - np.log(document_frequency + 0.5)
+        if n_terms:
+            bm25_idf[bm25_idf < 0] = BM25_EPSILON * bm25_idf.mean()
+
+        # Smoothed TF-IDF idf; stop words get zero weight so they never contribute
+        tfidf_idf = np.log((1.0 + n_docs) / (1.0 + document_frequency)) + 1.0
+        stop_word_ids = [term_ids[term] for term in ENGLISH_STOP_WORDS if term in term_ids]
+        tfidf_idf[stop_word_ids] = 0.0
+
+        # Row norms of the sublinear TF-IDF matrix, for cosine scoring
+        posting_terms = np.repeat(np.arange(n_terms), document_frequency)
+        weights = (1.0 + np.log(postings_tf)) * tfidf_idf[posting_terms]
+        doc_norm = np.sqrt(np.bincount(postings_docs, weights=weights ** 2, minlength=n_docs))
+
+        return cls(vocab, vocab_offsets, postings_indptr, postings_docs, postings_tf,
+                   doc_len, doc_norm.astype(np.float32), bm25_idf.astype(np.float32), tfidf_idf.astype(np.float32))
+
+    def _term(self, term_id):
+        start, end = self.vocab_offsets[term_id], self.vocab_offsets[term_id + 1]
+        return self.vocab[start:end].tobytes()
+
+    def term_id(self, term):
+        """Binary-search the sorted vocabulary; returns None for unknown terms."""
+        key = term.encode('utf-8', errors='surrogatepass')
+        lo, hi = 0, self.num_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.num_terms and self._term(lo) == key:
+            return lo
+        return None
+
+    def score(self, query_tokens):
+        """
+        Score every chunk against a tokenized query.
+
+        Only the postings of the query's terms are touched. Returns
+        (bm25_scores, tfidf_cosine_scores), each of length len(self).
+        """
+        bm25_scores = np.zeros(len(self), dtype=np.float64)
+        tfidf_dot = np.zeros(len(self), dtype=np.float64)
+        query_norm_sq = 0.0
+
+        for term, query_count in Counter(query_tokens).items():
+            term_id = self.term_id(term)
+            if term_id is None:
+                continue
+            start, end = self.postings_indptr[term_id], self.postings_indptr[term_id + 1]
+            docs = self.postings_docs[start:end]
+            tf = self.postings_tf[start:end].astype(np.float64)
+
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[docs] / self.avgdl)
+            bm25_scores[docs] += query_count * float(self.bm25_idf[term_id]) * tf * (BM25_K1 + 1) / (tf + length_norm)
+
+            idf = float(self.tfidf_idf[term_id])
+            if idf:
+                query_weight = (1.0 + math.log(query_count)) * idf
+                tfidf_dot[docs] += query_weight * (1.0 + np.log(tf)) * idf
+                query_norm_sq += query_weight ** 2
+
+        tfidf_scores = np.zeros_like(tfidf_dot)
+        if query_norm_sq:
+            denominator = np.sqrt(query_norm_sq) * self.doc_norm
+            np.divide(tfidf_dot, denominator, out=tfidf_scores, where=denominator > 0)
+        return bm25_scores, tfidf_scores
+
+    def term_counts(self):
+        """Per-chunk {term: count} dicts, used to rebuild the index after an incremental update."""
+        terms = [self._term(t).decode('utf-8', errors='surrogatepass') for t in range(self.num_terms)]
+        posting_terms = np.repeat(np.arange(self.num_terms), np.diff(self.postings_indptr))
+        order = np.argsort(self.postings_docs, kind='stable')
+
+        counts = [{} for _ in range(len(self))]
+        for doc, term_id, tf in zip(self.postings_docs[order].tolist(), posting_terms[order].tolist(), self.postings_tf[order].tolist()):
+            counts[doc][terms[term_id]] = tf
+        return counts
+
+    def save(self, directory):
+        """Write every array to directory as <FILE_PREFIX><name>.npy."""
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{FILE_PREFIX}{name}.npy"), np.asarray(getattr(self, name)))
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Open a saved index; arrays are memory-mapped, so this does no per-chunk work."""
+        arrays = {name: _load_array(os.path.join(directory, f"{FILE_PREFIX}{name}.npy"), mmap_mode) for name in ARRAY_NAMES}
+        return cls(**arrays)
+
+    @staticmethod
+    def file_names():
+        """Names of the files written by save()."""
+        return [f"{FILE_PREFIX}{name}.npy" for name in ARRAY_NAMES]
@@ -3,15 +3,74 @@ Abstract LLM Client Interface and Implementations
 
 This module provides a pluggable interface for multiple LLM providers.
 Currently implements Groq, but can be extended for other providers.
+Blocking clients derive from BaseLLMClient; async clients derive from
+AsyncBaseLLMClient and run on one shared background event loop.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Iterator, AsyncIterator
+import asyncio
+import concurrent.futures
+import threading
 import time
 import random
-from groq import Groq
+import httpx
+from groq import Groq, AsyncGroq
 import os
 
+# Connection pool shared by every async client in the process
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+
+_event_loop = None
+_shared_http_client = None
+_async_init_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop for async LLM calls, starting it on first use."""
+    global _event_loop
+    with _async_init_lock:
+        if _event_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+            _event_loop = loop
+    return _event_loop
+
+
+def run_async(coroutine) -> concurrent.futures.Future:
+    """Schedule a coroutine on the shared event loop and return a thread-safe future."""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop())
+
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """Return the pooled HTTP client shared by all async LLM clients."""
+    global _shared_http_client
+    with _async_init_lock:
+        if _shared_http_client is None:
+            _shared_http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(30.0, connect=10.0)
+            )
+    return _shared_http_client
+
+
+def _chat_messages(prompt: str) -> list:
+    """Chat messages sent to every provider for a prompt."""
+    return [
+        {"role": "system", "content": "You are a helpful assistant that analyzes code repositories."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Seconds requested by the server's retry-after header on an API error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
 
 class BaseLLMClient(ABC):
     """Abstract base class for LLM clients"""
@@ -29,6 +88,20 @@ class BaseLLMClient(ABC):
         """
         pass
     
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        """
+        Stream the response as text fragments in the order they are generated.
+        
+        Providers without streaming support yield the full response at once.
+        
+        Args:
+            prompt: The input prompt
+            
+        Yields:
+            Successive pieces of the response
+        """
+        yield self.get_response(prompt)
+    
     @abstractmethod
     def get_model_name(self) -> str:
         """
@@ -72,10 +145,7 @@ class GroqLLMClient(BaseLLMClient):
             try:
                 response = self._client.chat.completions.create(
                     model=self.model_name,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant that analyzes code repositories."},
-                        {"role": "user", "content": prompt}
-                    ],
+                    messages=_chat_messages(prompt),
                     timeout=30
                 )
                 return response.choices[0].message.content
@@ -111,6 +181,180 @@ class GroqLLMClient(BaseLLMClient):
         
         raise RuntimeError("Failed to get response from Groq after retries")
     
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        """
+        Stream response tokens from Groq API
+        
+        Errors before the first token fall back to get_response and its retries;
+        a stream that breaks part-way raises, since the tokens are already shown.
+        
+        Args:
+            prompt: The input prompt
+            
+        Yields:
+            Successive pieces of the response
+        """
+        started = False
+        try:
+            stream = self._client.chat.completions.create(
+                model=self.model_name,
+                messages=_chat_messages(prompt),
+                stream=True,
+                timeout=30
+            )
+            for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    started = True
+                    yield token
+        except Exception:
+            if started:
+                raise
+            yield self.get_response(prompt)
+    
+    def get_model_name(self) -> str:
+        """Return the model name"""
+        return self.model_name
+
+
+class AsyncBaseLLMClient(ABC):
+    """Abstract base class for async LLM clients"""
+    
+    @abstractmethod
+    async def get_response(self, prompt: str) -> str:
+        """
+        Get a response from the LLM given a prompt, without blocking the caller's thread.
+        
+        Args:
+            prompt: The input prompt
+            
+        Returns:
+            The LLM's response as a string
+        """
+        pass
+    
+    async def stream_response(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream the response as text fragments in the order they are generated.
+        
+        Providers without streaming support yield the full response at once.
+        
+        Args:
+            prompt: The input prompt
+            
+        Yields:
+            Successive pieces of the response
+        """
+        yield await self.get_response(prompt)
+    
+    @abstractmethod
+    def get_model_name(self) -> str:
+        """
+        Get the name/identifier of the model.
+        
+        Returns:
+            Model name/identifier
+        """
+        pass
+
+
+class AsyncGroqLLMClient(AsyncBaseLLMClient):
+    """Async Groq API LLM Client sharing one pooled HTTP client across model instances"""
+    
+    def __init__(self, api_key: str = None, model_name: str = "llama-3.3-70b-versatile", max_retries: int = 3):
+        """
+        Initialize async Groq LLM Client
+        
+        Args:
+            api_key: Groq API key. If None, reads from GROQ_API_KEY env var
+            model_name: Model to use (default: llama-3.3-70b-versatile)
+            max_retries: Attempts per request, including the first
+        """
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.model_name = model_name
+        self.max_retries = max_retries
+        # Retries are handled here so they can honour retry-after without blocking
+        self._client = AsyncGroq(api_key=self.api_key, http_client=get_shared_http_client(), max_retries=0)
+    
+    async def get_response(self, prompt: str) -> str:
+        """
+        Get response from Groq API with non-blocking retry logic
+        
+        Args:
+            prompt: The input prompt
+            
+        Returns:
+            The LLM's response text
+        """
+        retry_delay = 1
+        
+        for attempt in range(self.max_retries):
+            try:
+                response = await self._client.chat.completions.create(
+                    model=self.model_name,
+                    messages=_chat_messages(prompt),
+                    timeout=30
+                )
+                return response.choices[0].message.content
+                
+            except Exception as e:
+                error_message = str(e)
+                retry_after = _retry_after_seconds(e)
+                is_last_attempt = attempt >= self.max_retries - 1
+                
+                # Handle specific error types
+                if "503" in error_message or "Service unavailable" in error_message:
+                    if is_last_attempt:
+                        raise RuntimeError("Groq service unavailable after retries")
+                    wait_time = retry_after if retry_after is not None else retry_delay * (2 ** attempt) + random.uniform(0, 1)
+                    print(f"Groq service temporarily unavailable. Retrying in {wait_time:.1f} seconds...")
+                
+                elif "rate limit" in error_message.lower() or getattr(e, "status_code", None) == 429:
+                    if is_last_attempt:
+                        raise RuntimeError("Rate limit exceeded")
+                    wait_time = retry_after if retry_after is not None else 60
+                    print(f"Rate limit reached. Waiting {wait_time:.1f} seconds...")
+                
+                else:
+                    if is_last_attempt:
+                        raise
+                    wait_time = retry_after if retry_after is not None else retry_delay
+                
+                await asyncio.sleep(wait_time)
+        
+        raise RuntimeError("Failed to get response from Groq after retries")
+    
+    async def stream_response(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream response tokens from Groq API
+        
+        Errors before the first token fall back to get_response and its retries;
+        a stream that breaks part-way raises, since the tokens are already shown.
+        
+        Args:
+            prompt: The input prompt
+            
+        Yields:
+            Successive pieces of the response
+        """
+        started = False
+        try:
+            stream = await self._client.chat.completions.create(
+                model=self.model_name,
+                messages=_chat_messages(prompt),
+                stream=True,
+                timeout=30
+            )
+            async for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    started = True
+                    yield token
+        except Exception:
+            if started:
+                raise
+            yield await self.get_response(prompt)
+    
     def get_model_name(self) -> str:
         """Return the model name"""
         return self.model_name
@@ -1,18 +1,31 @@
 import os
-import tempfile
 from typing import List, Any, Optional, Mapping, Dict
 from langchain_core.prompts import PromptTemplate
 from langchain_core.language_models import BaseLLM
 from langchain_core.outputs import Generation, LLMResult
 from pydantic import Field, PrivateAttr
-from repo_reader import clone_git_repo, load_and_index_files
-from questions import QuestionContext, ask_question
-from utility import format_questions
-from llm_client import GroqLLMClient, BaseLLMClient
+from repo_reader import (load_and_index_files, update_index_files, get_head_commit, INDEX_SPARSE_PATTERNS,
+                         CHROMA_STORE)
+from embedding_cache import trim_embedding_cache
+from questions import QuestionContext, stream_question
+from utility import format_questions, ensure_nltk_data
+from llm_client import GroqLLMClient, AsyncGroqLLMClient, BaseLLMClient
 from ui_styling import apply_modern_styling
-from cache_manager import (get_cache_path, is_repo_cached, save_repo_cache, 
-                           load_repo_cache, clear_old_cache)
-from graph_utils import serialize_graph_data, deserialize_graph_data
+from cache_manager import (get_cache_path, is_repo_cached, is_cache_stale, save_repo_cache, 
+                           load_repo_cache, clear_old_cache, start_cache_eviction, list_cache_entries)
+from graph_utils import serialize_graph_data, deserialize_graph_data, save_graph_data, load_graph_data
+from file_walker import walk_repository
+from file_scanner import scan_repository
+from dependency_graph import build_dependency_graph
+from graph_layout import (compute_layout, graph_arrays, edge_polyline, node_roles, NODE_ROLES,
+                          LABELED_NODES_MAX)
+from file_analyzers import (DEFAULT_ANALYZERS, LINE_COUNTER, SECRET_SCANNER, QUALITY_CHECKER,
+                            IMPORT_EXTRACTOR)
+from git_history import iter_commit_history, MAX_HISTORY_COMMITS
+from commit_analytics import (build_commit_tables, summarize_history, empty_history_metrics,
+                              window_start, HISTORY_WINDOWS)
+from mirror_store import (checkout_repository, mirror_head_commit, start_mirror_eviction, INDEX_PROFILE,
+                          METRICS_PROFILE)
 import streamlit as st
 from dotenv import load_dotenv
 from groq import Groq
@@ -24,6 +37,7 @@ import shutil
 import re
 import git
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 from collections import defaultdict, Counter
 import plotly.express as px
@@ -33,6 +47,8 @@ import networkx as nx
 import ast
 
 load_dotenv()
+# Query tokenization for lexical search needs punkt too
+ensure_nltk_data()
 
 # Initialize session state
 if 'conversation_count' not in st.session_state:
@@ -56,7 +72,7 @@ CACHE_DIR = os.path.join(os.getcwd(), "repo_cache")
 if not os.path.exists(CACHE_DIR):
     os.makedirs(CACHE_DIR)
 
-def analyze_repository_metrics(repo_path):
+def analyze_repository_metrics(repo_path, repo_files=None, scan_results=None):
     """Comprehensive repository analysis including git history, contributors, etc."""
     try:
         # First check if it's a valid git repository
@@ -64,15 +80,9 @@ def analyze_repository_metrics(repo_path):
             st.warning("⚠️ **Not a Git Repository**: Repository doesn't appear to be a git repository. Analyzing file system only.")
             st.info("💡 **Note**: Limited analysis available - commit history, contributors, and git-specific metrics will not be available.")
             # Fall back to file system analysis only
-            file_stats = analyze_file_system(repo_path)
+            file_stats = analyze_file_system(repo_path, repo_files, scan_results)
             file_stats.update({
-                'total_commits': 0,
-                'author_stats': {},
-                'daily_commits': {},
-                'file_changes': {},
-                'top_contributors': {},
-                'commit_data': [],
-                'repo_age_days': 0,
+                **empty_history_metrics(),
                 'total_branches': 0,
                 'total_tags': 0
             })
@@ -91,7 +101,11 @@ def analyze_repository_metrics(repo_path):
         try:
             metrics['current_branch'] = repo.active_branch.name
         except:
-            metrics['current_branch'] = "Unknown"
+            try:
+                # Detached worktree of a mirror: report the branch it was checked out from
+                metrics['current_branch'] = repo.git.execute(['git', '--git-dir', repo.common_dir, 'symbolic-ref', '--short', 'HEAD'])
+            except:
+                metrics['current_branch'] = "Unknown"
             
         try:
             metrics['total_branches'] = len(list(repo.branches))
@@ -103,74 +117,22 @@ def analyze_repository_metrics(repo_path):
         except:
             metrics['total_tags'] = 0
         
-        # Get all commits with error handling
+        # Analyze commit history: one streamed `git log --numstat` loaded into columnar
+        # commit/file-change tables; every aggregate is a group-by over those tables
         try:
-            commits = list(repo.iter_commits('--all', max_count=1000))  # Limit to prevent memory issues
-            metrics['total_commits'] = len(commits)
+            commits, file_changes = build_commit_tables(
+                iter_commit_history(repo_path, max_count=MAX_HISTORY_COMMITS or None))
         except Exception as e:
             st.warning(f"⚠️ **Repository Access Issue**: Could not access commit history - {str(e)}")
             st.info("💡 **Tip**: This often happens with shallow clones, corrupted repositories, or access permission issues.")
-            commits = []
-            metrics['total_commits'] = 0
-        
-        # Analyze commit history
-        commit_data = []
-        author_stats = defaultdict(int)
-        daily_commits = defaultdict(int)
-        file_changes = defaultdict(int)
-        
-        for commit in commits:
-            try:
-                commit_date = datetime.fromtimestamp(commit.committed_date)
-                day_key = commit_date.strftime('%Y-%m-%d')
-                
-                commit_data.append({
-                    'hash': commit.hexsha[:8],
-                    'author': commit.author.name,
-                    'email': commit.author.email,
-                    'date': commit_date,
-                    'message': commit.message.strip(),
-                    'files_changed': len(commit.stats.files) if hasattr(commit, 'stats') else 0
-                })
-                
-                author_stats[commit.author.name] += 1
-                daily_commits[day_key] += 1
-                
-                # Count file changes with error handling
-                try:
-                    if hasattr(commit, 'stats'):
-                        for file_path in commit.stats.files:
-                            file_changes[file_path] += 1
-                except:
-                    pass  # Skip file changes if stats are not available
-                    
-            except Exception as e:
-                # Skip problematic commits
-                continue
-        
-        metrics['commit_data'] = commit_data
-        metrics['author_stats'] = dict(author_stats)
-        metrics['daily_commits'] = dict(daily_commits)
-        metrics['file_changes'] = dict(file_changes)
-        metrics['top_contributors'] = dict(sorted(author_stats.items(), key=lambda x: x[1], reverse=True)[:10])
+            commits, file_changes = build_commit_tables([])
         
-        # Repository age
-        if commits:
-            try:
-                first_commit = commits[-1]
-                last_commit = commits[0]
-                first_date = datetime.fromtimestamp(first_commit.committed_date)
-                last_date = datetime.fromtimestamp(last_commit.committed_date)
-                metrics['repo_age_days'] = (last_date - first_date).days
-                metrics['first_commit_date'] = first_date
-                metrics['last_commit_date'] = last_date
-            except:
-                metrics['repo_age_days'] = 0
-        else:
-            metrics['repo_age_days'] = 0
+        metrics['commit_table'] = commits
+        metrics['file_change_table'] = file_changes
+        metrics.update(summarize_history(commits, file_changes))
         
         # File system analysis
-        file_stats = analyze_file_system(repo_path)
+        file_stats = analyze_file_system(repo_path, repo_files, scan_results)
         metrics.update(file_stats)
         
         return metrics
@@ -178,15 +140,9 @@ def analyze_repository_metrics(repo_path):
     except git.exc.InvalidGitRepositoryError:
         st.warning("Invalid git repository. Analyzing file system only.")
         # Fall back to file system analysis
-        file_stats = analyze_file_system(repo_path)
+        file_stats = analyze_file_system(repo_path, repo_files, scan_results)
         file_stats.update({
-            'total_commits': 0,
-            'author_stats': {},
-            'daily_commits': {},
-            'file_changes': {},
-            'top_contributors': {},
-            'commit_data': [],
-            'repo_age_days': 0,
+            **empty_history_metrics(),
             'total_branches': 0,
             'total_tags': 0
         })
@@ -206,15 +162,9 @@ def analyze_repository_metrics(repo_path):
         
         # Fallback to basic file analysis
         try:
-            file_stats = analyze_file_system(repo_path)
+            file_stats = analyze_file_system(repo_path, repo_files, scan_results)
             file_stats.update({
-                'total_commits': 0,
-                'author_stats': {},
-                'daily_commits': {},
-                'file_changes': {},
-                'top_contributors': {},
-                'commit_data': [],
-                'repo_age_days': 0,
+                **empty_history_metrics(),
                 'total_branches': 0,
                 'total_tags': 0
             })
@@ -231,179 +181,23 @@ def analyze_repository_metrics(repo_path):
                 """)
             return None
 
-def generate_architecture_diagram(repo_path):
+def generate_architecture_diagram(repo_path, repo_files=None, scan_results=None):
     """Generate interactive architecture diagram showing module dependencies"""
     try:
-        # Build dependency graph
-        G = nx.DiGraph()
-        module_info = {}
-        
-        # Language-specific import patterns
-        import_patterns = {
-            '.py': [
-                r'^from\s+([a-zA-Z_][a-zA-Z0-9_.]*)\s+import',
-                r'^import\s+([a-zA-Z_][a-zA-Z0-9_.]*)',
-            ],
-            '.js': [
-                r'from\s+["\']([^"\']+)["\']',
-                r'import\s+.*\s+from\s+["\']([^"\']+)["\']',
-                r'require\s*\(\s*["\']([^"\']+)["\']\s*\)',
-            ],
-            '.jsx': [
-                r'from\s+["\']([^"\']+)["\']',
-                r'import\s+.*\s+from\s+["\']([^"\']+)["\']',
-            ],
-            '.ts': [
-                r'from\s+["\']([^"\']+)["\']',
-                r'import\s+.*\s+from\s+["\']([^"\']+)["\']',
-            ],
-            '.tsx': [
-                r'from\s+["\']([^"\']+)["\']',
-                r'import\s+.*\s+from\s+["\']([^"\']+)["\']',
-            ],
-            '.java': [
-                r'import\s+([a-zA-Z_][a-zA-Z0-9_.]*);',
-            ],
-            '.cpp': [
-                r'#include\s+[<"]([^>"]+)[>"]',
-            ],
-            '.c': [
-                r'#include\s+[<"]([^>"]+)[>"]',
-            ]
-        }
+        # Import records come from the shared single-read scan
+        if scan_results is None:
+            if repo_files is None:
+                repo_files = walk_repository(repo_path)
+            scan_results = scan_repository(repo_files, [IMPORT_EXTRACTOR])
         
-        # Analyze files and build dependency graph
-        for root, dirs, files in os.walk(repo_path):
-            # Skip .git and other hidden directories
-            if any(skip in root for skip in ['.git', '__pycache__', 'node_modules', '.venv', 'venv']):
-                continue
-                
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_ext = os.path.splitext(file)[1].lower()
-                
-                if file_ext in import_patterns:
-                    try:
-                        # Create module name from file path
-                        rel_path = os.path.relpath(file_path, repo_path)
-                        module_name = rel_path.replace(os.sep, '.').replace('/', '.')
-                        if file_ext in ['.py']:
-                            module_name = module_name[:-3]  # Remove .py extension
-                        elif file_ext in ['.js', '.jsx', '.ts', '.tsx']:
-                            module_name = module_name[:-len(file_ext)]
-                        
-                        # Store simple name for easier matching
-                        simple_name = os.path.splitext(os.path.basename(file))[0]
-                        
-                        # Read file content
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                        
-                        # Count lines and complexity estimate
-                        lines_count = len(content.splitlines())
-                        
-                        # Simple complexity estimate based on keywords
-                        complexity_keywords = ['if', 'for', 'while', 'try', 'catch', 'switch', 'case']
-                        complexity_score = sum(content.lower().count(keyword) for keyword in complexity_keywords)
-                        
-                        # Store module information
-                        module_info[module_name] = {
-                            'lines': lines_count,
-                            'complexity': complexity_score,
-                            'file_path': rel_path,
-                            'file_type': file_ext
-                        }
-                        
-                        # Add node to graph
-                        G.add_node(module_name, **module_info[module_name])
-                        
-                        # Find imports using patterns for this file type
-                        for pattern in import_patterns[file_ext]:
-                            imports = re.findall(pattern, content, re.MULTILINE)
-                            
-                            for imported_module in imports:
-                                # Clean up the import name
-                                imported_module = imported_module.strip()
-                                
-                                # Skip built-in modules but keep local ones
-                                builtin_modules = [
-                                    'os', 'sys', 'time', 'datetime', 'json', 'urllib', 're', 'math', 
-                                    'collections', 'itertools', 'functools', 'typing', 'pathlib',
-                                    'tempfile', 'hashlib', 'pickle', 'shutil', 'random', 'subprocess'
-                                ]
-                                
-                                # Skip relative imports starting with '.' and built-ins
-                                if (imported_module.startswith('.') or 
-                                    imported_module in builtin_modules or
-                                    imported_module.startswith('http') or
-                                    imported_module.startswith('std::')):
-                                    continue
-                                
-                                # For Python, handle both local and external imports
-                                if file_ext == '.py' and not imported_module.startswith('.'):
-                                    # Check if this might be a local module first
-                                    potential_local_path = imported_module.replace('.', os.sep) + '.py'
-                                    full_potential_path = os.path.join(repo_path, potential_local_path)
-                                    
-                                    # Also check if it matches any of our discovered modules
-                                    is_local_module = (
-                                        os.path.exists(full_potential_path) or
-                                        imported_module in module_info.keys() or
-                                        any(imported_module == local.split('.')[-1] for local in module_info.keys()) or
-                                        any(local.endswith(imported_module) for local in module_info.keys())
-                                    )
-                                    
-                                    if is_local_module:
-                                        # It's a local module, add the edge
-                                        G.add_edge(module_name, imported_module)
-                                        print(f"Found local dependency: {module_name} -> {imported_module}")
-                                    elif len(imported_module.split('.')) <= 2 and not any(ext in imported_module for ext in ['http', 'www', 'github']):
-                                        # It might be an external library, add it but mark differently
-                                        G.add_edge(module_name, f"ext:{imported_module}")
-                                
-                                # For JavaScript/TypeScript, check relative imports
-                                elif file_ext in ['.js', '.jsx', '.ts', '.tsx']:
-                                    if imported_module.startswith('./') or imported_module.startswith('../'):
-                                        # Resolve relative path
-                                        import_dir = os.path.dirname(rel_path)
-                                        resolved_path = os.path.normpath(os.path.join(import_dir, imported_module))
-                                        resolved_module = resolved_path.replace(os.sep, '.').replace('/', '.')
-                                        G.add_edge(module_name, resolved_module)
-                                    else:
-                                        # External module, add but mark as external
-                                        if not imported_module.startswith('@') and len(imported_module.split('.')) <= 3:
-                                            G.add_edge(module_name, imported_module)
-                                
-                                # For other languages, add direct dependencies
-                                else:
-                                    if len(imported_module.split('.')) <= 3:  # Avoid very long module names
-                                        G.add_edge(module_name, imported_module)
-                        
-                    except Exception as e:
-                        # Skip files that can't be processed
-                        continue
+        # Build dependency graph: index every module first, then resolve each file's imports
+        G = build_dependency_graph(scan_results['imports'])
         
         # Keep nodes with low connectivity but remove completely isolated ones
         isolated_nodes = [node for node in G.nodes() if G.degree(node) == 0 and len(G.nodes()) > 5]
         G.remove_nodes_from(isolated_nodes)
         
-        # If graph is too large, keep only the most connected components
-        if len(G.nodes()) > 50:
-            # Get the largest connected component
-            if G.number_of_nodes() > 0:
-                # For directed graphs, use weakly connected components
-                components = list(nx.weakly_connected_components(G))
-                if components:
-                    largest_component = max(components, key=len)
-                    G = G.subgraph(largest_component).copy()
-        
-        return G
-        
-        # Debug information
         print(f"Architecture analysis complete: {len(G.nodes())} nodes, {len(G.edges())} edges")
-        print(f"Modules found: {list(module_info.keys())}")
-        print(f"Edges: {list(G.edges())}")
-        
         return G
         
     except Exception as e:
@@ -419,78 +213,20 @@ def generate_architecture_diagram(repo_path):
             """)
         return nx.DiGraph()  # Return empty graph
 
-def analyze_security_vulnerabilities(repo_path):
+def analyze_security_vulnerabilities(repo_path, repo_files=None, scan_results=None):
     """Analyze repository for potential security vulnerabilities and issues"""
     vulnerabilities = []
     improvements = []
     
     try:
-        # Security patterns to detect
-        security_patterns = {
-            'hardcoded_secrets': [
-                r'password\s*=\s*["\'][^"\']{3,}["\']',
-                r'api_key\s*=\s*["\'][^"\']{10,}["\']',
-                r'secret\s*=\s*["\'][^"\']{8,}["\']',
-                r'token\s*=\s*["\'][^"\']{10,}["\']',
-                r'private_key\s*=\s*["\'][^"\']{20,}["\']'
-            ],
-            'sql_injection': [
-                r'execute\s*\(\s*["\'].*%.*["\']',
-                r'query\s*\(\s*["\'].*\+.*["\']',
-                r'SELECT.*\+.*FROM',
-                r'INSERT.*\+.*VALUES'
-            ],
-            'weak_crypto': [
-                r'md5\s*\(',
-                r'sha1\s*\(',
-                r'DES\s*\(',
-                r'RC4\s*\('
-            ],
-            'unsafe_eval': [
-                r'eval\s*\(',
-                r'exec\s*\(',
-                r'os\.system\s*\(',
-                r'subprocess\.call.*shell\s*=\s*True'
-            ],
-            'insecure_requests': [
-                r'http://.*requests\.',
-                r'verify\s*=\s*False',
-                r'ssl_verify\s*=\s*False',
-                r'InsecureRequestWarning'
-            ]
-        }
+        # Security and quality patterns run inside the shared single-read scan (see file_analyzers)
+        if scan_results is None:
+            if repo_files is None:
+                repo_files = walk_repository(repo_path)
+            scan_results = scan_repository(repo_files, [SECRET_SCANNER, QUALITY_CHECKER])
         
-        # File extensions to analyze
-        code_extensions = ['.py', '.js', '.java', '.php', '.rb', '.go', '.cs', '.cpp', '.c']
-        
-        security_issues = {}
-        file_count = 0
-        
-        for root, dirs, files in os.walk(repo_path):
-            # Skip hidden directories and common build/cache folders
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', '__pycache__', 'build', 'dist']]
-            
-            for file in files:
-                if any(file.endswith(ext) for ext in code_extensions):
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read().lower()
-                            file_count += 1
-                            
-                            for category, patterns in security_patterns.items():
-                                for pattern in patterns:
-                                    if re.search(pattern, content, re.IGNORECASE):
-                                        if category not in security_issues:
-                                            security_issues[category] = []
-                                        rel_path = os.path.relpath(file_path, repo_path)
-                                        if rel_path not in [item['file'] for item in security_issues[category]]:
-                                            security_issues[category].append({
-                                                'file': rel_path,
-                                                'pattern': pattern
-                                            })
-                    except:
-                        continue
+        security_issues = scan_results['secrets']['issues']
+        file_count = scan_results['secrets']['files_scanned']
         
         # Convert findings to vulnerabilities
         issue_descriptions = {
@@ -531,38 +267,10 @@ def analyze_security_vulnerabilities(repo_path):
                 vuln = issue_descriptions[category].copy()
                 vuln['count'] = len(issues)
                 vuln['files'] = [item['file'] for item in issues[:3]]  # Show first 3 files
+                vuln['locations'] = [f"{item['file']}:{item['lines'][0]}" for item in issues[:3]]
                 vulnerabilities.append(vuln)
         
-        # Code quality improvements
-        improvement_patterns = {
-            'todo_comments': r'(todo|fixme|hack|xxx)',
-            'empty_catch': r'except.*:\s*pass',
-            'magic_numbers': r'\b\d{3,}\b',  # Numbers with 3+ digits might be magic numbers
-            'long_functions': r'def\s+\w+.*?(?=def|\Z)',  # Basic detection
-        }
-        
-        quality_issues = {}
-        for root, dirs, files in os.walk(repo_path):
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', '__pycache__']]
-            
-            for file in files:
-                if file.endswith('.py'):  # Focus on Python for quality analysis
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                            
-                            # TODO comments
-                            if re.search(improvement_patterns['todo_comments'], content, re.IGNORECASE):
-                                quality_issues.setdefault('todos', 0)
-                                quality_issues['todos'] += len(re.findall(improvement_patterns['todo_comments'], content, re.IGNORECASE))
-                            
-                            # Empty exception handlers
-                            if re.search(improvement_patterns['empty_catch'], content):
-                                quality_issues.setdefault('empty_catch', 0)
-                                quality_issues['empty_catch'] += 1
-                    except:
-                        continue
+        quality_issues = scan_results['quality']
         
         # Add improvement suggestions
         if quality_issues.get('todos', 0) > 5:
@@ -634,117 +342,80 @@ def display_architecture_visualization(G, repo_name):
     """, unsafe_allow_html=True)
     
     try:
-        # Use hierarchical layout for better module organization
-        if len(G.nodes()) > 50:
-            # For large graphs, use circular layout
-            pos = nx.circular_layout(G)
-        else:
-            # For smaller graphs, use spring layout with better parameters
-            pos = nx.spring_layout(G, k=2, iterations=100, seed=42)
-        
-        # Prepare edge traces
-        edge_x = []
-        edge_y = []
-        edge_info = []
+        # Layered layout (force-directed for heavily cyclic graphs), cached per graph
+        pos = compute_layout(G)
         
-        for edge in G.edges():
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-            edge_x.extend([x0, x1, None])
-            edge_y.extend([y0, y1, None])
-            edge_info.append(f"{edge[0]} → {edge[1]}")
+        # Flat numpy arrays for the whole graph; WebGL traces keep large diagrams responsive
+        nodes, xy, edges, in_degree, out_degree = graph_arrays(G, pos)
+        degree = in_degree + out_degree
         
-        edge_trace = go.Scatter(
+        edge_x, edge_y = edge_polyline(xy, edges)
+        edge_trace = go.Scattergl(
             x=edge_x, y=edge_y,
-            line=dict(width=2, color='rgba(0,0,0,0.8)'),
+            line=dict(width=2 if len(edges) <= 200 else 1, color='rgba(0,0,0,0.8)' if len(edges) <= 200 else 'rgba(0,0,0,0.35)'),
             hoverinfo='none',
             mode='lines',
             name='Dependencies'
         )
         
-        # Prepare node traces
-        node_x = []
-        node_y = []
-        node_text = []
-        node_size = []
-        node_color = []
-        node_hover = []
-        
-        for node in G.nodes():
-            if node in pos:
-                x, y = pos[node]
-                node_x.append(x)
-                node_y.append(y)
-                
-                # Node size based on degree (number of connections)
-                degree = G.degree(node)
-                size = min(max(degree * 3 + 10, 15), 40)
-                node_size.append(size)
-                
-                # Enhanced node coloring based on role in architecture
-                in_degree = G.in_degree(node)
-                out_degree = G.out_degree(node)
-                total_degree = degree
-                
-                # More sophisticated coloring scheme
-                if in_degree == 0 and out_degree > 0:
-                    color = '#ff6b6b'  # Red: Entry points/controllers
-                elif out_degree == 0 and in_degree > 0:
-                    color = '#4ecdc4'  # Teal: Leaf nodes/utilities
-                elif in_degree > out_degree * 2:
-                    color = '#45b7d1'  # Blue: Core/shared modules
-                elif out_degree > in_degree * 2:
-                    color = '#f9ca24'  # Yellow: Heavy dependency users
-                elif total_degree > 5:
-                    color = '#6c5ce7'  # Purple: Highly connected hubs
-                else:
-                    color = '#a8e6cf'  # Light green: Balanced modules
-                    
-                node_color.append(color)
-                
-                # Truncate long node names for display
-                display_name = node.split('.')[-1] if '.' in node else node
-                if len(display_name) > 15:
-                    display_name = display_name[:12] + '...'
-                node_text.append(display_name)
-                
-                # Hover information
-                node_data = G.nodes[node] if hasattr(G.nodes[node], 'get') else {}
-                hover_text = f"<b>{node}</b><br>"
-                hover_text += f"Connections: {degree}<br>"
-                hover_text += f"Dependencies: {out_degree}<br>"
-                hover_text += f"Dependents: {in_degree}<br>"
-                
-                if 'lines' in node_data:
-                    hover_text += f"Lines of code: {node_data['lines']}<br>"
-                if 'complexity' in node_data:
-                    hover_text += f"Complexity score: {node_data['complexity']}<br>"
-                if 'file_type' in node_data:
-                    hover_text += f"File type: {node_data['file_type']}<br>"
-                
-                node_hover.append(hover_text)
-        
-        node_trace = go.Scatter(
-            x=node_x, y=node_y,
-            mode='markers+text',
-            hovertemplate='%{customdata}<extra></extra>',
-            customdata=node_hover,
-            text=node_text,
-            textposition="middle center",
-            textfont=dict(size=9, color='white', family='Inter, sans-serif'),
-            marker=dict(
-                size=node_size,
-                color=node_color,
-                line=dict(width=2, color='white'),
-                opacity=0.9,
-                sizemode='diameter'
-            ),
-            name='Modules',
-            showlegend=True
-        )
+        # Node size based on degree (number of connections)
+        node_size = np.clip(degree * 3 + 10, 15, 40)
+        roles = node_roles(in_degree, out_degree)
+        
+        # Hover columns: connections, dependencies, dependents, then the optional node attributes
+        optional_fields = [('lines', 'Lines of code'), ('complexity', 'Complexity score'), ('file_type', 'File type')]
+        node_data = np.empty((len(nodes), 3 + len(optional_fields)), dtype=object)
+        node_data[:, 0] = degree
+        node_data[:, 1] = out_degree
+        node_data[:, 2] = in_degree
+        # Bit i set when a node has optional field i; nodes without data (external ones) leave those lines out
+        field_sets = np.zeros(len(nodes), dtype=np.int64)
+        for i, (attribute, _) in enumerate(optional_fields):
+            values = nx.get_node_attributes(G, attribute)
+            node_data[:, 3 + i] = [values.get(node, '') for node in nodes]
+            field_sets |= np.array([node in values for node in nodes], dtype=np.int64) << i
+        node_names = np.array(nodes, dtype=object)
+        
+        # Labels only where they stay readable; big graphs rely on hover
+        show_labels = len(nodes) <= LABELED_NODES_MAX
+        if show_labels:
+            # Truncate long node names for display
+            display_names = [str(node).split('.')[-1] for node in nodes]
+            node_text = np.array([name[:12] + '...' if len(name) > 15 else name for name in display_names], dtype=object)
+        
+        # One legend entry per architectural role; one trace per set of hover fields within it
+        node_traces = []
+        for role, (role_name, color) in enumerate(NODE_ROLES):
+            role_mask = roles == role
+            for field_set in np.unique(field_sets[role_mask]):
+                mask = role_mask & (field_sets == field_set)
+                hovertemplate = ('<b>%{hovertext}</b><br>Connections: %{customdata[0]}<br>'
+                                 'Dependencies: %{customdata[1]}<br>Dependents: %{customdata[2]}<br>')
+                hovertemplate += ''.join(f'{label}: %{{customdata[{3 + i}]}}<br>'
+                                         for i, (_, label) in enumerate(optional_fields) if field_set >> i & 1)
+                node_traces.append(go.Scattergl(
+                    x=xy[mask, 0], y=xy[mask, 1],
+                    mode='markers+text' if show_labels else 'markers',
+                    hovertext=node_names[mask],
+                    customdata=node_data[mask],
+                    hovertemplate=hovertemplate + '<extra></extra>',
+                    text=node_text[mask] if show_labels else None,
+                    textposition="middle center",
+                    textfont=dict(size=9, color='white', family='Inter, sans-serif'),
+                    marker=dict(
+                        size=node_size[mask],
+                        color=color,
+                        line=dict(width=2 if show_labels else 1, color='white'),
+                        opacity=0.9,
+                        sizemode='diameter'
+                    ),
+                    name=f"{role_name} ({int(role_mask.sum())})",
+                    legendgroup=role_name,
+                    showlegend=bool(field_set == field_sets[role_mask].max())
+                ))
         
         # Create the enhanced figure with better styling
-        fig = go.Figure(data=[edge_trace, node_trace],
+        fig = go.Figure(data=[edge_trace, *node_traces],
                        layout=go.Layout(
                            title=dict(
                                text=f'🏗️ Interactive Module Dependency Architecture - {repo_name}',
@@ -757,7 +428,7 @@ def display_architecture_visualization(G, repo_name):
                            margin=dict(b=40,l=20,r=20,t=80),
                            annotations=[ 
                                dict(
-                                   text="🎯 Interactive Dependency Graph<br>🔵 Core Modules  🔴 High Dependencies  🟢 Balanced  🟡 Leaf Modules<br>Click nodes • Drag to explore • Hover for details",
+                                   text="🎯 Interactive Dependency Graph<br>Node colors mark architectural roles (see legend)<br>Click legend entries to toggle • Drag to explore • Hover for details",
                                    showarrow=False,
                                    xref="paper", yref="paper",
                                    x=0.005, y=-0.02,
@@ -843,7 +514,7 @@ def display_architecture_visualization(G, repo_name):
         st.error(f"Error generating architecture visualization: {str(e)}")
 
 
-def analyze_file_system(repo_path):
+def analyze_file_system(repo_path, repo_files=None, scan_results=None):
     """Analyze file system structure and statistics"""
     file_stats = {
         'total_files': 0,
@@ -902,55 +573,45 @@ def analyze_file_system(repo_path):
         '.pl': 'Perl'
     }
     
-    for root, dirs, files in os.walk(repo_path):
-        # Skip .git directory
-        if '.git' in root:
-            continue
-            
+    if repo_files is None:
+        repo_files = walk_repository(repo_path)
+    if scan_results is None:
+        scan_results = scan_repository(repo_files, [LINE_COUNTER])
+    line_counts = scan_results['line_counts']
+    
+    for repo_file in repo_files:
         # Count directory depth
-        depth = root.replace(repo_path, '').count(os.sep)
-        file_stats['directory_structure'][depth] += len(files)
+        file_stats['directory_structure'][repo_file.rel_path.count(os.sep)] += 1
         
-        for file in files:
-            file_path = os.path.join(root, file)
+        try:
+            # Get file size
+            file_size = repo_file.size
+            file_stats['file_sizes'].append(file_size)
             
-            try:
-                # Get file size
-                file_size = os.path.getsize(file_path)
-                file_stats['file_sizes'].append(file_size)
-                
-                # Get file extension
-                _, ext = os.path.splitext(file)
-                ext = ext.lower()
-                file_stats['file_types'][ext] += 1
-                
-                # Map to language
-                if ext in language_map:
-                    file_stats['language_stats'][language_map[ext]] += 1
-                
-                # Count lines for text files
-                if ext in ['.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.c', '.cpp', '.cs', 
-                          '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala', '.r', '.m',
-                          '.sh', '.bash', '.sql', '.html', '.htm', '.css', '.scss', '.xml',
-                          '.json', '.yaml', '.yml', '.md', '.txt']:
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            lines = len(f.readlines())
-                            file_stats['total_lines'] += lines
-                            
-                            # Track largest files
-                            file_stats['largest_files'].append({
-                                'path': os.path.relpath(file_path, repo_path),
-                                'lines': lines,
-                                'size': file_size
-                            })
-                    except:
-                        pass
-                
-                file_stats['total_files'] += 1
+            # Get file extension
+            ext = repo_file.ext.lower()
+            file_stats['file_types'][ext] += 1
+            
+            # Map to language
+            if ext in language_map:
+                file_stats['language_stats'][language_map[ext]] += 1
+            
+            # Line counts of text files come from the shared scan
+            if repo_file.rel_path in line_counts:
+                lines = line_counts[repo_file.rel_path]
+                file_stats['total_lines'] += lines
                 
-            except:
-                continue
+                # Track largest files
+                file_stats['largest_files'].append({
+                    'path': repo_file.rel_path,
+                    'lines': lines,
+                    'size': file_size
+                })
+            
+            file_stats['total_files'] += 1
+            
+        except:
+            continue
     
     # Sort largest files
     file_stats['largest_files'] = sorted(
@@ -970,6 +631,19 @@ def display_repository_metrics(metrics, repo_name="default"):
     """Display comprehensive repository metrics dashboard"""
     st.header("📊 Repository Analytics Dashboard")
     
+    # History charts follow the selected time window; the aggregates are re-computed
+    # from the columnar commit tables, which is a mask and a few group-bys
+    window = st.selectbox(
+        "🗓️ Time Window",
+        list(HISTORY_WINDOWS),
+        key=f"history_window_{repo_name}",
+        help="Measured back from the most recent commit"
+    )
+    history = metrics
+    if HISTORY_WINDOWS[window] is not None:
+        since = window_start(metrics['commit_table'], HISTORY_WINDOWS[window])
+        history = summarize_history(metrics['commit_table'], metrics['file_change_table'], since=since)
+    
     # Basic Info Section
     col1, col2, col3, col4 = st.columns(4)
     
@@ -978,9 +652,9 @@ def display_repository_metrics(metrics, repo_name="default"):
     with col2:
         st.metric("📝 Total Lines", f"{metrics['total_lines']:,}")
     with col3:
-        st.metric("🔀 Total Commits", f"{metrics['total_commits']:,}")
+        st.metric("🔀 Total Commits", f"{history['total_commits']:,}")
     with col4:
-        st.metric("👥 Contributors", len(metrics['author_stats']))
+        st.metric("👥 Contributors", len(history['author_stats']))
     
     # Repository Timeline
     col1, col2, col3 = st.columns(3)
@@ -994,14 +668,8 @@ def display_repository_metrics(metrics, repo_name="default"):
     
     # Commit Activity Chart
     st.subheader("📈 Commit Activity Over Time")
-    if metrics.get('daily_commits') and len(metrics['daily_commits']) > 0:
-        dates = list(metrics['daily_commits'].keys())
-        commits = list(metrics['daily_commits'].values())
-        
-        df_commits = pd.DataFrame({
-            'Date': pd.to_datetime(dates),
-            'Commits': commits
-        }).sort_values('Date')
+    if len(history['daily_commits']) > 0:
+        df_commits = history['daily_commits'].rename_axis('Date').reset_index(name='Commits')
         
         fig = px.line(df_commits, x='Date', y='Commits', 
                       title='Daily Commit Activity',
@@ -1013,19 +681,31 @@ def display_repository_metrics(metrics, repo_name="default"):
     
     # Contributors Analysis
     st.subheader("👥 Top Contributors")
-    if metrics.get('top_contributors') and len(metrics['top_contributors']) > 0:
-        contributors_df = pd.DataFrame(
-            list(metrics['top_contributors'].items()), 
-            columns=['Contributor', 'Commits']
-        )
+    if len(history['top_contributors']) > 0:
+        contributors_df = history['top_contributors'].rename_axis('Contributor').reset_index(name='Commits')
+        contributors_df['Contributor'] = contributors_df['Contributor'].astype(str)
         
-        fig = px.bar(contributors_df.head(10), x='Commits', y='Contributor', 
+        fig = px.bar(contributors_df, x='Commits', y='Contributor', 
                      orientation='h', title='Top 10 Contributors by Commits')
         fig.update_layout(yaxis={'categoryorder':'total ascending'})
         st.plotly_chart(fig, use_container_width=True, key=f"contributors_chart_{repo_name}")
     else:
         st.info("👥 No contributor data available")
     
+    # Code Churn
+    st.subheader("🔄 Code Churn")
+    if len(history['weekly_churn']) > 0:
+        churn_df = history['weekly_churn'].rename_axis('Week').reset_index()
+        churn_df['deletions'] = -churn_df['deletions']
+        
+        fig = px.bar(churn_df, x='Week', y=['insertions', 'deletions'],
+                     title='Lines Added and Removed per Week',
+                     labels={'value': 'Lines', 'variable': 'Change'})
+        fig.update_layout(barmode='relative')
+        st.plotly_chart(fig, use_container_width=True, key=f"churn_chart_{repo_name}")
+    else:
+        st.info("🔄 No churn data available")
+    
     # Language Distribution
     col1, col2 = st.columns(2)
     
@@ -1086,13 +766,12 @@ def display_repository_metrics(metrics, repo_name="default"):
     
     # Recent Commits
     st.subheader("🕒 Recent Commits")
-    if metrics['commit_data']:
-        recent_commits = metrics['commit_data'][:20]
-        commits_df = pd.DataFrame(recent_commits)
-        commits_df['date'] = pd.to_datetime(commits_df['date'])
+    if not metrics['commit_table'].empty:
+        recent_commits = metrics['commit_table'].nlargest(20, 'timestamp')
         
         # Format for display
-        display_df = commits_df[['hash', 'author', 'date', 'message', 'files_changed']].copy()
+        display_df = recent_commits[['hash', 'author', 'date', 'message', 'files_changed']].copy()
+        display_df['hash'] = display_df['hash'].str[:8]
         display_df['date'] = display_df['date'].dt.strftime('%Y-%m-%d %H:%M')
         display_df['message'] = display_df['message'].str[:100] + '...'
         
@@ -1104,8 +783,8 @@ def display_repository_metrics(metrics, repo_name="default"):
     
     with health_col1:
         # Calculate commit frequency
-        if metrics.get('repo_age_days', 0) > 0:
-            commit_frequency = metrics['total_commits'] / max(metrics['repo_age_days'], 1)
+        if history.get('repo_age_days', 0) > 0:
+            commit_frequency = history['total_commits'] / max(history['repo_age_days'], 1)
             st.metric("📊 Commits/Day", f"{commit_frequency:.2f}")
         
     with health_col2:
@@ -1120,6 +799,19 @@ def display_repository_metrics(metrics, repo_name="default"):
             lines_per_file = metrics['total_lines'] / metrics['total_files']
             st.metric("📄 Lines/File", f"{lines_per_file:.1f}")
     
+    # Knowledge concentration within the selected window
+    health_col4, health_col5 = st.columns(2)
+    
+    with health_col4:
+        if history['total_commits'] > 0:
+            st.metric("🚌 Bus Factor", history['bus_factor'],
+                      help="Fewest contributors who together authored half of the commits")
+    
+    with health_col5:
+        if len(history['file_changes']) > 0:
+            st.metric("🧍 Single-Author Files", f"{history['single_author_files']:,}",
+                      help="Changed files that only one contributor has touched")
+    
     # === ENHANCED: Interactive Architecture Visualization ===
     st.markdown("""
     <div class="architecture-section">
@@ -1157,23 +849,34 @@ def display_repository_metrics(metrics, repo_name="default"):
                     # Try to get repo_url from session state or reconstruct cache path
                     if 'current_repo_url' in st.session_state:
                         repo_url = st.session_state.current_repo_url
-                        cache_key = hashlib.md5(repo_url.encode()).hexdigest()
-                        cache_path = os.path.join(CACHE_DIR, cache_key)
+                        cache_path = get_cache_path(repo_url, CACHE_DIR)
                     else:
                         st.warning("⚠️ Repository URL not found. Please run 'Analyze Repository Metrics' first.")
                         return
                     
-                    if os.path.exists(cache_path):
-                        dependency_graph = generate_architecture_diagram(cache_path)
-                        if dependency_graph and dependency_graph.number_of_nodes() > 0:
-                            metrics['architecture_graph_data'] = serialize_graph_data(dependency_graph)
-                            st.session_state[f'metrics_{repo_name}'] = metrics
-                            st.success("✅ Architecture analysis complete!")
-                            st.rerun()
-                        else:
-                            st.info("🔍 **No module dependencies found** - Repository may not have complex interconnections.")
+                    # A graph saved for the repository's current commit loads without re-parsing it
+                    graph_data = load_graph_data(cache_path, mirror_head_commit(repo_url))
+                    if graph_data is not None:
+                        metrics['architecture_graph_data'] = graph_data
+                        st.session_state[f'metrics_{repo_name}'] = metrics
+                        st.success("✅ Architecture loaded from cache!")
+                        st.rerun()
+                    
+                    # The import graph needs the files but not the history
+                    with checkout_repository(repo_url, INDEX_PROFILE) as local_path:
+                        if local_path is None:
+                            st.warning("⚠️ Repository data not available. Please run 'Analyze Repository Metrics' first.")
+                            return
+                        dependency_graph = generate_architecture_diagram(local_path)
+                        commit = get_head_commit(local_path)
+                    if dependency_graph and dependency_graph.number_of_nodes() > 0:
+                        metrics['architecture_graph_data'] = serialize_graph_data(dependency_graph)
+                        save_graph_data(metrics['architecture_graph_data'], cache_path, commit)
+                        st.session_state[f'metrics_{repo_name}'] = metrics
+                        st.success("✅ Architecture analysis complete!")
+                        st.rerun()
                     else:
-                        st.warning("⚠️ Repository data not available. Please run 'Analyze Repository Metrics' first.")
+                        st.info("🔍 **No module dependencies found** - Repository may not have complex interconnections.")
                 except Exception as e:
                     st.error(f"❌ **Architecture generation failed**: {str(e)}")
         else:
@@ -1249,8 +952,10 @@ def display_repository_metrics(metrics, repo_name="default"):
                 color = severity_colors.get(vuln.get('severity', 'medium'), '#6c757d')
                 
                 files_text = f"Found in {vuln.get('count', 0)} locations"
-                if vuln.get('files'):
-                    files_text += f": {', '.join(vuln['files'][:2])}"
+                # file:line of the first match where available
+                shown = vuln.get('locations') or vuln.get('files')
+                if shown:
+                    files_text += f": {', '.join(shown[:2])}"
                     if vuln.get('count', 0) > 2:
                         files_text += f" and {vuln.get('count', 0) - 2} more files"
                 
@@ -1387,13 +1092,29 @@ def display_enhanced_answer(answer):
 from pydantic import Field, PrivateAttr
 
 
-def process_repository_fresh(repo_url, repo_name):
-    """Process repository fresh when not cached"""
-    st.info("🔄 Cloning and processing repository for the first time...")
+def process_repository_fresh(repo_url, repo_name, cached_index=None, cached_document=None):
+    """Process repository fresh when not cached, or refresh an expired cache incrementally"""
+    if cached_index is not None:
+        st.info("🔄 Cache expired - re-indexing only files changed upstream...")
+    else:
+        st.info("🔄 Cloning and processing repository for the first time...")
     
-    with tempfile.TemporaryDirectory() as local_path:
-        if clone_git_repo(repo_url, local_path):
-            index, document, file_type_count, file_names = load_and_index_files(local_path)
+    # Worktree from the shared mirror: cloned once, then only fetched.
+    # Indexing needs just the HEAD tree, and only the files it indexes.
+    with checkout_repository(repo_url, INDEX_PROFILE, INDEX_SPARSE_PATTERNS) as local_path:
+        if local_path is not None:
+            progress_bar = st.progress(0.0, text="🧠 Embedding repository chunks...")
+            
+            def report_embedding_progress(done, total):
+                progress_bar.progress(done / total, text=f"🧠 Embedding chunks: {done:,} / {total:,}")
+            
+            if cached_index is not None:
+                index, document, file_type_count, file_names = update_index_files(
+                    local_path, cached_index, cached_document, progress_callback=report_embedding_progress)
+            else:
+                index, document, file_type_count, file_names = load_and_index_files(
+                    local_path, progress_callback=report_embedding_progress)
+            progress_bar.empty()
             
             if index is None:
                 st.error("No documents were found to index in this repository.")
@@ -1401,11 +1122,11 @@ def process_repository_fresh(repo_url, repo_name):
 
             print("Repo cloned.....Indexing Files")
             
-            # Create LLM clients - 3 different Groq models for consensus
+            # Create LLM clients - 3 different Groq models for consensus, sharing one connection pool
             llm_clients = [
-                GroqLLMClient(api_key=GROQ_API_KEY, model_name="llama-3.3-70b-versatile"),
-                GroqLLMClient(api_key=GROQ_API_KEY, model_name="llama-3.1-8b-instant"),
-                GroqLLMClient(api_key=GROQ_API_KEY, model_name="qwen/qwen3-32b")
+                AsyncGroqLLMClient(api_key=GROQ_API_KEY, model_name="llama-3.3-70b-versatile"),
+                AsyncGroqLLMClient(api_key=GROQ_API_KEY, model_name="llama-3.1-8b-instant"),
+                AsyncGroqLLMClient(api_key=GROQ_API_KEY, model_name="qwen/qwen3-32b")
             ]
 
             question_context = QuestionContext(
@@ -1420,7 +1141,7 @@ def process_repository_fresh(repo_url, repo_name):
             )
             
             # Save to cache
-            save_repo_cache(repo_url, CACHE_DIR, index, document, file_type_count, file_names)
+            save_repo_cache(repo_url, CACHE_DIR, index, document, file_type_count, file_names, CHROMA_STORE)
             
             # Cache in session state for faster access
             st.session_state.cached_repos[repo_url] = {
@@ -1454,6 +1175,10 @@ def main():
         st.markdown('<h3 style="color: #ffffff;">📁 Cache Management</h3>', unsafe_allow_html=True)
         if st.button("🗑️ Clear All Cache"):
             if os.path.exists(CACHE_DIR):
+                # Collections live outside the cache directory
+                for entry in list_cache_entries(CACHE_DIR):
+                    if entry['chroma_collection_name']:
+                        CHROMA_STORE.delete(entry['chroma_collection_name'])
                 shutil.rmtree(CACHE_DIR)
                 os.makedirs(CACHE_DIR)
             st.session_state.cached_repos = {}
@@ -1492,8 +1217,9 @@ def main():
     
     repo_name = repo_url.split("/")[-1]
     
-    # Clear old cache files periodically
-    clear_old_cache(CACHE_DIR)
+    # Evict old cache entries and git mirrors in the background (rate-limited, never blocks the rerun)
+    start_cache_eviction(CACHE_DIR, collection_store=CHROMA_STORE, trim_hooks=(trim_embedding_cache,))
+    start_mirror_eviction()
     
     with tab1:
         st.header("📊 Repository Analytics Dashboard")
@@ -1502,24 +1228,30 @@ def main():
             # Store the current repo URL for later use
             st.session_state.current_repo_url = repo_url
             with st.spinner("🔄 Cloning and analyzing repository..."):
-                with tempfile.TemporaryDirectory() as local_path:
-                    if clone_git_repo(repo_url, local_path):
-                        metrics = analyze_repository_metrics(local_path)
+                with checkout_repository(repo_url, METRICS_PROFILE) as local_path:
+                    if local_path is not None:
+                        # Walk the tree once and read every file once; all analyzers share the scan
+                        repo_files = walk_repository(local_path)
+                        scan_results = scan_repository(repo_files, DEFAULT_ANALYZERS)
+                        metrics = analyze_repository_metrics(local_path, repo_files, scan_results)
                         if metrics:
                             # Generate architecture diagram while repo is still available
                             with st.spinner("🏗️ Analyzing architecture and dependencies..."):
-                                dependency_graph = generate_architecture_diagram(local_path)
+                                dependency_graph = generate_architecture_diagram(local_path, repo_files, scan_results)
                                 if dependency_graph and dependency_graph.number_of_nodes() > 0:
                                     print(f"Architecture graph generated: {dependency_graph.number_of_nodes()} nodes, {dependency_graph.number_of_edges()} edges")
                                     # Store the graph data in serializable format
                                     metrics['architecture_graph_data'] = serialize_graph_data(dependency_graph)
+                                    # Kept next to the repository cache for the architecture tab
+                                    save_graph_data(metrics['architecture_graph_data'], get_cache_path(repo_url, CACHE_DIR),
+                                                    get_head_commit(local_path))
                                 else:
                                     print("No architecture graph generated - no dependencies found")
                                     metrics['architecture_graph_data'] = None
                             
                             # Analyze security vulnerabilities and code quality
                             with st.spinner("🔒 Scanning for security vulnerabilities and code quality issues..."):
-                                security_analysis = analyze_security_vulnerabilities(local_path)
+                                security_analysis = analyze_security_vulnerabilities(local_path, repo_files, scan_results)
                                 metrics['security_analysis'] = security_analysis
                                 
                             # Store metrics in session state for persistence
@@ -1550,6 +1282,12 @@ def main():
             question_context = cached_data['question_context']
             st.success(f"✅ Repository '{repo_name}' loaded from memory cache!")
             
+        elif is_repo_cached(repo_url, CACHE_DIR) and is_cache_stale(repo_url, CACHE_DIR):
+            # Expired disk cache: refresh it against a new clone, re-embedding only changed files
+            cached_index, cached_document, _, _ = load_repo_cache(repo_url, CACHE_DIR)
+            index, document, file_type_count, file_names, question_context = process_repository_fresh(
+                repo_url, repo_name, cached_index, cached_document)
+            
         elif is_repo_cached(repo_url, CACHE_DIR):
             # Load from disk cache
             st.info("📂 Loading repository from disk cache...")
@@ -1558,9 +1296,9 @@ def main():
             if index is not None:
                 # Create LLM clients for cached repo - 3 different Groq models
                 llm_clients = [
-                    GroqLLMClient(api_key=GROQ_API_KEY, model_name="llama-3.3-70b-versatile"),
-                    GroqLLMClient(api_key=GROQ_API_KEY, model_name="llama-3.1-8b-instant"),
-                    GroqLLMClient(api_key=GROQ_API_KEY, model_name="qwen/qwen3-32b")
+                    AsyncGroqLLMClient(api_key=GROQ_API_KEY, model_name="llama-3.3-70b-versatile"),
+                    AsyncGroqLLMClient(api_key=GROQ_API_KEY, model_name="llama-3.1-8b-instant"),
+                    AsyncGroqLLMClient(api_key=GROQ_API_KEY, model_name="qwen/qwen3-32b")
                 ]
                 
                 # Create question context
@@ -1648,20 +1386,31 @@ def main():
                 st.warning("Session ended")
                 return
             try:
+                # Ensure question_context exists
+                if 'question_context' not in locals() or question_context is None:
+                    st.error("❌ Repository data not loaded. Please ensure the repository was processed successfully.")
+                    return
+                
                 with st.spinner("🤖 Processing your question..."):
-                    # Ensure question_context exists
-                    if 'question_context' not in locals() or question_context is None:
-                        st.error("❌ Repository data not loaded. Please ensure the repository was processed successfully.")
-                        return
-                    
                     # Format the question
                     formatted_question = format_questions(user_question)
                     
                     # Update conversation history in context
                     question_context.conversation_history = st.session_state.conversation_history
                     
-                    # Get the answer
-                    answer = ask_question(formatted_question, question_context)
+                    # Start every model; retrieval happens here
+                    streaming_answer = stream_question(formatted_question, question_context)
+                
+                # Show the fastest model's answer as it is generated
+                live_answer = st.empty()
+                with live_answer.container():
+                    st.caption("✍️ Drafting answer while the other models finish...")
+                    st.write_stream(streaming_answer.tokens())
+                
+                with st.spinner("🤝 Comparing model answers..."):
+                    # Consensus confirms the streamed answer or swaps in a better one
+                    answer = streaming_answer.final_answer()
+                    live_answer.empty()
                     
                     # Add to QA history
                     st.session_state.qa_history.append((user_question, answer))
@@ -0,0 +1,324 @@
+"""
+Mirror Store Module
+Persistent bare mirrors of analyzed repositories, shared across sessions.
+
+Each repository URL is cloned once into a bare mirror and refreshed with
+`git fetch`; analyses run in throwaway worktrees checked out from it.
+Clone profiles pick the cheapest mirror that serves a pipeline: indexing
+only needs a shallow mirror and a sparse checkout of indexable files,
+while metrics need full history. Mirrors are partial clones that skip
+blobs over MIRROR_BLOB_LIMIT until something reads them.
+Mirrors are guarded by two advisory file locks: a write lock held while
+cloning, fetching or adding/removing worktrees, and a use lock held
+(shared) for as long as a worktree exists, which eviction must acquire
+exclusively before deleting a mirror.
+"""
+
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on this platform: locking is skipped (single-process deployments only)
+    fcntl = None
+
+MIRROR_DIR = os.getenv("MIRROR_DIR", os.path.join(os.getcwd(), "git_mirrors"))
+# Skip the fetch when the mirror was refreshed this recently
+MIRROR_FETCH_INTERVAL_SECONDS = float(os.getenv("MIRROR_FETCH_INTERVAL_SECONDS", "300"))
+MIRROR_MAX_BYTES = int(os.getenv("MIRROR_MAX_BYTES", str(10 * 1024 ** 3)))
+MIRROR_EVICTION_INTERVAL_SECONDS = float(os.getenv("MIRROR_EVICTION_INTERVAL_SECONDS", "600"))
+
+# Mirror tracks branches and tags only; --mirror would also pull refs/pull/* and similar
+MIRROR_REFSPECS = ["+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"]
+# Blobs above this size are left on the server (the indexer skips files over 10MB anyway)
+MIRROR_BLOB_LIMIT = os.getenv("MIRROR_BLOB_LIMIT", "10m")
+
+CloneProfile = namedtuple('CloneProfile', ['name', 'full_history', 'sparse'])
+# HEAD tree only; sparse checkout limited to the patterns the caller indexes
+INDEX_PROFILE = CloneProfile('index', full_history=False, sparse=True)
+# Complete history and working tree, for commit analytics and file scans
+METRICS_PROFILE = CloneProfile('metrics', full_history=True, sparse=False)
+
+_eviction_lock = threading.Lock()
+_eviction_thread = None
+_last_eviction = 0.0
+
+
+def normalize_repo_url(url):
+    """Add a protocol and a .git suffix, as clone_git_repo always has."""
+    if url.startswith('github.com/') or (not url.startswith('http://') and not url.startswith('https://') and not url.startswith('git@')):
+        url = f'https://{url}'
+    if not url.endswith('.git'):
+        url = f'{url}.git'
+    return url
+
+
+def get_mirror_path(repo_url, mirror_dir=MIRROR_DIR):
+    """Path of the bare mirror for a repository URL"""
+    return os.path.join(mirror_dir, hashlib.md5(normalize_repo_url(repo_url).encode()).hexdigest() + ".git")
+
+
+def _git(*args):
+    return subprocess.run(['git', *args], check=True, capture_output=True, text=True)
+
+
+@contextmanager
+def _file_lock(lock_path, shared=False, blocking=True):
+    """Hold an flock on lock_path; yields False when non-blocking and already held."""
+    with open(lock_path, 'a') as lock_file:
+        if fcntl is None:
+            yield True
+            return
+        flags = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB)
+        try:
+            fcntl.flock(lock_file, flags)
+        except BlockingIOError:
+            acquired = False
+        else:
+            acquired = True
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _configure_refspecs(mirror_path):
+    """Make fetches update every branch and tag of the mirror in place."""
+    _git('-C', mirror_path, 'config', 'remote.origin.fetch', MIRROR_REFSPECS[0])
+    for refspec in MIRROR_REFSPECS[1:]:
+        _git('-C', mirror_path, 'config', '--add', 'remote.origin.fetch', refspec)
+
+
+def is_shallow_mirror(mirror_path):
+    """True for a mirror created by a profile that does not need history."""
+    return os.path.exists(os.path.join(mirror_path, 'shallow'))
+
+
+def _clone_mirror(repo_url, mirror_path, full_history):
+    """Bare-clone into a staging directory and move it into place once complete."""
+    staging_path = f"{mirror_path}.tmp-{os.getpid()}"
+    url = normalize_repo_url(repo_url)
+    clone_args = ['clone', '--bare', f'--filter=blob:limit={MIRROR_BLOB_LIMIT}']
+    if not full_history:
+        # Default branch tip only
+        clone_args += ['--depth', '1']
+    # Same fallback as clone_git_repo: retry without the .git suffix
+    for candidate_url in (url, url[:-4]):
+        shutil.rmtree(staging_path, ignore_errors=True)
+        try:
+            _git(*clone_args, candidate_url, staging_path)
+        except subprocess.CalledProcessError as ex:
+            print(f"failed to clone repo: {ex}")
+            continue
+        if full_history:
+            _configure_refspecs(staging_path)
+        os.replace(staging_path, mirror_path)
+        return True
+    shutil.rmtree(staging_path, ignore_errors=True)
+    return False
+
+
+def _fetch_mirror(mirror_path, full_history):
+    """Bring the mirror up to date, deepening a shallow mirror when history is needed."""
+    if not is_shallow_mirror(mirror_path):
+        _git('-C', mirror_path, 'fetch', '--prune', 'origin')
+    elif full_history:
+        _configure_refspecs(mirror_path)
+        _git('-C', mirror_path, 'fetch', '--unshallow', '--prune', 'origin')
+    else:
+        # Stay shallow: move the default branch to the new tip only
+        head_ref = _git('-C', mirror_path, 'symbolic-ref', 'HEAD').stdout.strip()
+        _git('-C', mirror_path, 'fetch', '--depth', '1', 'origin', f'+{head_ref}:{head_ref}')
+
+
+def ensure_mirror(repo_url, mirror_dir=MIRROR_DIR, fetch_interval_seconds=MIRROR_FETCH_INTERVAL_SECONDS,
+                  full_history=True):
+    """
+    Clone the repository's mirror on first use, otherwise fetch if it is out of date.
+
+    With full_history=False a new mirror is a depth-1 clone; an existing
+    shallow mirror is deepened as soon as a caller needs full history.
+    Returns the mirror path, or None if the repository cannot be cloned. A
+    failed fetch keeps serving the existing mirror.
+    """
+    os.makedirs(mirror_dir, exist_ok=True)
+    mirror_path = get_mirror_path(repo_url, mirror_dir)
+    fetch_marker = f"{mirror_path}.fetched"
+
+    with _file_lock(f"{mirror_path}.lock"):
+        if not os.path.isdir(mirror_path):
+            if not _clone_mirror(repo_url, mirror_path, full_history):
+                return None
+        else:
+            try:
+                last_fetch = os.path.getmtime(fetch_marker)
+            except OSError:
+                last_fetch = 0.0
+            needs_history = full_history and is_shallow_mirror(mirror_path)
+            if not needs_history and time.time() - last_fetch < fetch_interval_seconds:
+                return mirror_path
+            try:
+                _fetch_mirror(mirror_path, full_history)
+            except subprocess.CalledProcessError as ex:
+                print(f"Failed to fetch {repo_url}, using existing mirror: {ex.stderr}")
+                return mirror_path
+        with open(fetch_marker, 'a'):
+            pass
+        os.utime(fetch_marker)
+    return mirror_path
+
+
+def mirror_head_commit(repo_url, mirror_dir=MIRROR_DIR):
+    """
+    SHA of the default branch tip in the repository's mirror, or None.
+
+    Creates or fetches the mirror like ensure_mirror (shallow if new), so the
+    answer is as fresh as a checkout would be.
+    """
+    mirror_path = ensure_mirror(repo_url, mirror_dir, full_history=False)
+    if mirror_path is None:
+        return None
+    try:
+        return _git('-C', mirror_path, 'rev-parse', 'HEAD').stdout.strip() or None
+    except subprocess.CalledProcessError:
+        return None
+
+
+@contextmanager
+def checkout_repository(repo_url, profile=METRICS_PROFILE, sparse_patterns=None, mirror_dir=MIRROR_DIR):
+    """
+    Yield a temporary worktree of the repository's default branch, or None on failure.
+
+    With a sparse profile and sparse_patterns (gitignore-style, e.g. '*.py'),
+    only matching files are checked out. The worktree is removed when the
+    block exits; the mirror is kept for next time.
+    """
+    os.makedirs(mirror_dir, exist_ok=True)
+    mirror_path = get_mirror_path(repo_url, mirror_dir)
+    use_lock = f"{mirror_path}.use"
+
+    # Shared for as long as the worktree lives, so eviction cannot delete the mirror under it
+    with _file_lock(use_lock, shared=True):
+        # Marks the mirror as recently used for LRU eviction
+        with open(use_lock, 'a'):
+            pass
+        os.utime(use_lock)
+
+        if ensure_mirror(repo_url, mirror_dir, full_history=profile.full_history) is None:
+            yield None
+            return
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            worktree_path = os.path.join(temp_dir, "checkout")
+            sparse = profile.sparse and sparse_patterns
+            try:
+                with _file_lock(f"{mirror_path}.lock"):
+                    _git('-C', mirror_path, 'worktree', 'add', '--no-checkout', '--detach', worktree_path, 'HEAD')
+            except subprocess.CalledProcessError as ex:
+                print(f"failed to check out worktree: {ex.stderr}")
+                yield None
+                return
+            try:
+                try:
+                    if sparse:
+                        # Blobs of excluded files are never written, nor fetched from a partial clone
+                        _git('-C', worktree_path, 'sparse-checkout', 'set', '--no-cone', *sparse_patterns)
+                    _git('-C', worktree_path, 'checkout', '--detach', 'HEAD')
+                except subprocess.CalledProcessError as ex:
+                    print(f"failed to check out worktree: {ex.stderr}")
+                    worktree_path = None
+                yield worktree_path
+            finally:
+                # Delete the checkout first so prune drops its metadata from the mirror.
+                # A failed prune only leaves stale metadata; it must not replace the
+                # block's own exception or skip releasing the locks.
+                try:
+                    with _file_lock(f"{mirror_path}.lock"):
+                        shutil.rmtree(os.path.join(temp_dir, "checkout"), ignore_errors=True)
+                        _git('-C', mirror_path, 'worktree', 'prune')
+                except (subprocess.CalledProcessError, OSError) as ex:
+                    print(f"failed to prune worktrees of {mirror_path}: {getattr(ex, 'stderr', None) or ex}")
+
+
+def _mirror_size(mirror_path):
+    total = 0
+    for root, _, files in os.walk(mirror_path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def evict_mirrors(mirror_dir=MIRROR_DIR, max_bytes=MIRROR_MAX_BYTES):
+    """
+    Delete least recently used mirrors until the store fits max_bytes.
+
+    Mirrors with a live worktree are skipped. Returns the removed paths.
+    """
+    if not os.path.isdir(mirror_dir):
+        return []
+
+    mirrors = []
+    for name in os.listdir(mirror_dir):
+        mirror_path = os.path.join(mirror_dir, name)
+        if name.endswith('.git') and os.path.isdir(mirror_path):
+            try:
+                last_used = os.path.getmtime(f"{mirror_path}.use")
+            except OSError:
+                last_used = os.path.getmtime(mirror_path)
+            mirrors.append((last_used, mirror_path, _mirror_size(mirror_path)))
+    mirrors.sort()
+
+    total_bytes = sum(size for _, _, size in mirrors)
+    removed = []
+    for _, mirror_path, size in mirrors:
+        if total_bytes <= max_bytes:
+            break
+        with _file_lock(f"{mirror_path}.use", blocking=False) as acquired:
+            if not acquired:
+                continue
+            with _file_lock(f"{mirror_path}.lock"):
+                shutil.rmtree(mirror_path, ignore_errors=True)
+                try:
+                    os.remove(f"{mirror_path}.fetched")
+                except OSError:
+                    pass
+        total_bytes -= size
+        removed.append(mirror_path)
+        print(f"Evicted git mirror {os.path.basename(mirror_path)}")
+    return removed
+
+
+def start_mirror_eviction(mirror_dir=MIRROR_DIR, max_bytes=MIRROR_MAX_BYTES,
+                          min_interval_seconds=MIRROR_EVICTION_INTERVAL_SECONDS):
+    """
+    Run evict_mirrors on a background thread, at most once per min_interval_seconds.
+
+    Returns immediately; safe to call on every request.
+    """
+    global _eviction_thread, _last_eviction
+    with _eviction_lock:
+        now = time.time()
+        if _eviction_thread is not None and _eviction_thread.is_alive():
+            return
+        if now - _last_eviction < min_interval_seconds:
+            return
+        _last_eviction = now
+        _eviction_thread = threading.Thread(
+            target=evict_mirrors,
+            args=(mirror_dir, max_bytes),
+            name="mirror-eviction",
+            daemon=True
+        )
+        _eviction_thread.start()
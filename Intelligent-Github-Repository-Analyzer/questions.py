@@ -1,12 +1,28 @@
 
 from utility import format_document
 from repo_reader import search_documents
-from typing import List, Dict, Any
-from llm_client import BaseLLMClient
+from typing import List, Dict, Any, Union
+from llm_client import BaseLLMClient, AsyncBaseLLMClient, run_async
+from answer_cache import get_answer_cache
 from langchain_core.prompts import PromptTemplate
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
+from concurrent.futures import ThreadPoolExecutor, wait
 import numpy as np
+import hashlib
+import os
+import queue
+import re
+import time
+
+# Seconds each LLM client gets before consensus runs without it
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "45"))
+# Minimum extra wait for consensus after streaming, even when the deadline is spent
+CONSENSUS_GRACE_SECONDS = float(os.getenv("CONSENSUS_GRACE_SECONDS", "2"))
+# Follow-up questions share cached answers only when these many latest turns match
+ANSWER_CACHE_HISTORY_TURNS = int(os.getenv("ANSWER_CACHE_HISTORY_TURNS", "3"))
+# Turn header written by the chat UI into conversation_history
+HISTORY_TURN_HEADER = re.compile(r'^===== Previous Conversation \d+ =====$', re.MULTILINE)
 
 # Initialize embedding model globally (loaded once)
 _embedding_model = None
@@ -82,8 +98,200 @@ def compute_consensus(responses: List[Dict[str, str]]) -> Dict[str, Any]:
     }
 
 
+def collect_llm_responses(llm_clients: List[Union[BaseLLMClient, AsyncBaseLLMClient]], prompt: str, timeout: float = LLM_TIMEOUT_SECONDS) -> List[Dict[str, str]]:
+    """
+    Query all LLM clients concurrently.
+    
+    Every client gets the same deadline, so latency is roughly that of the
+    slowest client that answers in time rather than the sum of all of them.
+    Async clients run on the shared event loop; blocking clients on threads.
+    Clients that fail or miss the deadline get an error entry, which
+    compute_consensus filters out.
+    
+    Args:
+        llm_clients: Clients to query
+        prompt: The formatted prompt
+        timeout: Seconds to wait for each client
+        
+    Returns:
+        List of dicts with 'model_name' and 'response' keys, in client order
+    """
+    print("\n" + "="*80)
+    print("LLM RESPONSES FROM ALL MODELS")
+    print("="*80)
+    
+    executor = None
+    futures = []
+    for llm_client in llm_clients:
+        if isinstance(llm_client, AsyncBaseLLMClient):
+            futures.append(run_async(llm_client.get_response(prompt)))
+        else:
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=len(llm_clients), thread_name_prefix="llm-fanout")
+            futures.append(executor.submit(llm_client.get_response, prompt))
+    
+    return _gather_responses(llm_clients, futures, executor, timeout)
+
+
+def _gather_responses(llm_clients, futures, executor, timeout: float) -> List[Dict[str, str]]:
+    """Wait up to timeout for the client futures and turn them into response entries."""
+    wait(futures, timeout=timeout)
+    # Don't block on stragglers: async calls are cancelled, threads finish in the background
+    for future in futures:
+        future.cancel()
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    responses = []
+    for llm_client, future in zip(llm_clients, futures):
+        model_name = llm_client.get_model_name()
+        if future.cancelled() or not future.done():
+            error = f"timed out after {timeout:.0f}s"
+        elif future.exception() is not None:
+            error = str(future.exception())
+        else:
+            error = None
+        
+        print(f"\n--- {model_name} ---")
+        if error is None:
+            response_text = future.result()
+            responses.append({"model_name": model_name, "response": response_text})
+            print(response_text)
+        else:
+            responses.append({
+                "model_name": model_name,
+                "response": f"Error getting response from {model_name}: {error}"
+            })
+            print(f"ERROR: {error}")
+        print("-" * 40)
+    
+    return responses
+
+
+class StreamingAnswer:
+    """
+    Streams the fastest model's tokens while every model keeps generating.
+    
+    tokens() yields the text of whichever client produces a token first.
+    final_answer() then waits for the rest, runs compute_consensus and
+    returns the answer to keep, which may come from a different model. If
+    no model finishes in time, the text already streamed is kept.
+    """
+    
+    _END = object()
+    
+    def __init__(self, llm_clients: List[Union[BaseLLMClient, AsyncBaseLLMClient]], prompt: str, timeout: float = LLM_TIMEOUT_SECONDS, on_consensus=None):
+        self.llm_clients = llm_clients
+        self.timeout = timeout
+        self.on_consensus = on_consensus
+        self.streamed_model = None
+        self.consensus_model = None
+        self._deadline = time.monotonic() + timeout
+        self._tokens = queue.Queue()
+        self._streamed_parts = []
+        
+        print("\n" + "="*80)
+        print("LLM RESPONSES FROM ALL MODELS (STREAMING)")
+        print("="*80)
+        
+        self._executor = None
+        self._futures = []
+        for idx, llm_client in enumerate(llm_clients):
+            if isinstance(llm_client, AsyncBaseLLMClient):
+                self._futures.append(run_async(self._pump_async(idx, llm_client, prompt)))
+            else:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=len(llm_clients), thread_name_prefix="llm-stream")
+                self._futures.append(self._executor.submit(self._pump, idx, llm_client, prompt))
+    
+    def _pump(self, idx, llm_client, prompt):
+        """Forward a blocking client's stream to the token queue; return the full text."""
+        parts = []
+        try:
+            for token in llm_client.stream_response(prompt):
+                parts.append(token)
+                self._tokens.put((idx, token))
+        finally:
+            self._tokens.put((idx, self._END))
+        return "".join(parts)
+    
+    async def _pump_async(self, idx, llm_client, prompt):
+        """Forward an async client's stream to the token queue; return the full text."""
+        parts = []
+        try:
+            async for token in llm_client.stream_response(prompt):
+                parts.append(token)
+                self._tokens.put((idx, token))
+        finally:
+            self._tokens.put((idx, self._END))
+        return "".join(parts)
+    
+    def tokens(self):
+        """Yield the first-responding model's tokens until its stream ends or the deadline passes."""
+        leader = None
+        finished = set()
+        while len(finished) < len(self.llm_clients):
+            remaining = self._deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                idx, token = self._tokens.get(timeout=remaining)
+            except queue.Empty:
+                return
+            
+            if token is self._END:
+                finished.add(idx)
+                if idx == leader:
+                    return
+            elif leader is None or idx == leader:
+                if leader is None:
+                    leader = idx
+                    self.streamed_model = self.llm_clients[idx].get_model_name()
+                self._streamed_parts.append(token)
+                yield token
+    
+    def final_answer(self) -> str:
+        """
+        Wait for the remaining models and return the consensus answer.
+        
+        Models get what is left of the deadline, but at least
+        CONSENSUS_GRACE_SECONDS. When none of them produced a valid response
+        by then, the leader's streamed text is returned instead.
+        """
+        remaining = max(CONSENSUS_GRACE_SECONDS, self._deadline - time.monotonic())
+        responses = _gather_responses(self.llm_clients, self._futures, self._executor, remaining)
+        consensus_result = _log_consensus(responses)
+        streamed_text = "".join(self._streamed_parts)
+        if consensus_result is None:
+            return streamed_text or "No response received from any LLM client"
+        if consensus_result["model_scores"]:
+            self.consensus_model = consensus_result["model_scores"][0]["model"]
+        if self.on_consensus is not None:
+            self.on_consensus(consensus_result)
+        if not consensus_result["model_scores"] and streamed_text:
+            # Consensus could not finish; keep the answer the user already saw
+            self.consensus_model = self.streamed_model
+            return streamed_text
+        return consensus_result["consensus_response"]
+
+
+class CachedAnswer:
+    """Stand-in for StreamingAnswer when the answer cache already has the answer."""
+    
+    def __init__(self, answer: str):
+        self.answer = answer
+        self.streamed_model = "answer cache"
+        self.consensus_model = "answer cache"
+    
+    def tokens(self):
+        yield self.answer
+    
+    def final_answer(self) -> str:
+        return self.answer
+
+
 class QuestionContext:
-    def __init__(self, index, documents, llm_clients: List[BaseLLMClient], repo_name, repo_url, conversation_history, file_type_count, filenames):
+    def __init__(self, index, documents, llm_clients: List[Union[BaseLLMClient, AsyncBaseLLMClient]], repo_name, repo_url, conversation_history, file_type_count, filenames):
         self.index = index
         self.documents = documents
         self.llm_clients = llm_clients  # List of LLM clients instead of single chain
@@ -93,17 +301,16 @@ class QuestionContext:
         self.file_type_count = file_type_count
         self.filenames = filenames
         
-def ask_question(question: str, context: QuestionContext) -> str:
+def build_question_prompt(question: str, context: QuestionContext) -> str:
     """
-    Ask a question and get responses from all configured LLM clients.
-    Returns the response in a structured format with model name and response.
+    Retrieve the most relevant documents and format the full LLM prompt.
     
     Args:
         question: The user's question
         context: QuestionContext with repository and LLM info
         
     Returns:
-        A formatted string containing responses from all LLM clients
+        The prompt sent to every LLM client
     """
     relevant_docs = search_documents(question, context.index, context.documents, n_results=5)
     numbered_document = format_document(relevant_docs)
@@ -150,44 +357,119 @@ Please analyze the provided documents and conversation history to answer the que
         question=question,
         file_type_count=str(context.file_type_count)
     )
-    
-    # Get responses from all LLM clients
-    responses = []
+    return formatted_prompt
+
+
+def _log_consensus(responses: List[Dict[str, str]]):
+    """Run compute_consensus and log the outcome; None when there are no responses."""
     print("\n" + "="*80)
-    print("LLM RESPONSES FROM ALL MODELS")
+    if not responses:
+        return None
+    consensus_result = compute_consensus(responses)
+    print("CONSENSUS RESULT")
     print("="*80)
-    for llm_client in context.llm_clients:
-        try:
-            response_text = llm_client.get_response(formatted_prompt)
-            response_data = {
-                "model_name": llm_client.get_model_name(),
-                "response": response_text
-            }
-            responses.append(response_data)
-            print(f"\n--- {llm_client.get_model_name()} ---")
-            print(response_text)
-            print("-" * 40)
-        except Exception as e:
-            response_data = {
-                "model_name": llm_client.get_model_name(),
-                "response": f"Error getting response from {llm_client.get_model_name()}: {str(e)}"
-            }
-            responses.append(response_data)
-            print(f"\n--- {llm_client.get_model_name()} ---")
-            print(f"ERROR: {str(e)}")
-            print("-" * 40)
+    print(f"Selected response from: {consensus_result['model_scores'][0]['model'] if consensus_result['model_scores'] else 'N/A'}")
+    print(f"Model similarity scores: {consensus_result['model_scores']}")
+    print("="*80 + "\n")
+    return consensus_result
+
+
+def _history_key(conversation_history) -> str:
+    """
+    Hash of the last ANSWER_CACHE_HISTORY_TURNS turns, or '' for a fresh conversation.
     
-    print("\n" + "="*80)
+    Turn numbers are left out, so the same recent exchange keys the same
+    way wherever it falls in a session. Earlier turns do not count.
+    """
+    if not conversation_history or not conversation_history.strip():
+        return ''
+    turns = [turn.strip() for turn in HISTORY_TURN_HEADER.split(conversation_history) if turn.strip()]
+    recent = "\n\0".join(turns[-ANSWER_CACHE_HISTORY_TURNS:])
+    return hashlib.sha1(recent.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+def _cached_answer(question: str, context: QuestionContext):
+    """
+    Look the question up in the answer cache.
+    
+    Follow-up questions are looked up under a hash of the latest turns, so
+    they only match answers given in the same conversational context. The
+    cache is skipped when the indexed commit is unknown.
+    
+    Returns:
+        (cached_answer, cache_key); cache_key is None when the cache does not apply
+    """
+    commit = context.index.get("commit") if isinstance(context.index, dict) else None
+    if not commit:
+        return None, None
+    
+    history_key = _history_key(context.conversation_history)
+    embedding = get_embedding_model().encode([question], convert_to_numpy=True)[0]
+    answer_cache = get_answer_cache()
+    cached = answer_cache.lookup(context.repo_url, commit, embedding, history_key)
+    print(f"Answer cache {'hit' if cached is not None else 'miss'}: {answer_cache.stats()}")
+    return cached, (commit, embedding, history_key)
+
+
+def _remember_answer(question: str, context: QuestionContext, cache_key, consensus_result):
+    """Store a consensus answer, unless every model failed."""
+    if cache_key is None or not consensus_result["model_scores"]:
+        return
+    commit, embedding, history_key = cache_key
+    get_answer_cache().store(context.repo_url, commit, question, embedding, consensus_result["consensus_response"],
+                             history_key)
+
+
+def ask_question(question: str, context: QuestionContext) -> str:
+    """
+    Ask a question and get responses from all configured LLM clients.
+    Returns the response in a structured format with model name and response.
+    
+    Args:
+        question: The user's question
+        context: QuestionContext with repository and LLM info
+        
+    Returns:
+        A formatted string containing responses from all LLM clients
+    """
+    cached, cache_key = _cached_answer(question, context)
+    if cached is not None:
+        return cached
+    
+    formatted_prompt = build_question_prompt(question, context)
+    
+    # Get responses from all LLM clients concurrently
+    responses = collect_llm_responses(context.llm_clients, formatted_prompt)
     
     # Compute consensus from all responses
-    if responses:
-        consensus_result = compute_consensus(responses)
-        print("CONSENSUS RESULT")
-        print("="*80)
-        print(f"Selected response from: {consensus_result['model_scores'][0]['model'] if consensus_result['model_scores'] else 'N/A'}")
-        print(f"Model similarity scores: {consensus_result['model_scores']}")
-        print("="*80 + "\n")
-        # Return only the consensus response to UI
-        return consensus_result["consensus_response"]
-    else:
-        return "No response received from any LLM client"
\ No newline at end of file
+    consensus_result = _log_consensus(responses)
+    if consensus_result is None:
+        return "No response received from any LLM client"
+    _remember_answer(question, context, cache_key, consensus_result)
+    # Return only the consensus response to UI
+    return consensus_result["consensus_response"]
+
+
+def stream_question(question: str, context: QuestionContext) -> Union[StreamingAnswer, CachedAnswer]:
+    """
+    Ask a question and stream the fastest model's answer as it is generated.
+    
+    Iterate StreamingAnswer.tokens() to render the live answer, then call
+    StreamingAnswer.final_answer() for the consensus result.
+    
+    Args:
+        question: The user's question
+        context: QuestionContext with repository and LLM info
+        
+    Returns:
+        A StreamingAnswer already querying every client, or a CachedAnswer
+    """
+    cached, cache_key = _cached_answer(question, context)
+    if cached is not None:
+        return CachedAnswer(cached)
+    
+    return StreamingAnswer(
+        context.llm_clients,
+        build_question_prompt(question, context),
+        on_consensus=lambda consensus_result: _remember_answer(question, context, cache_key, consensus_result)
+    )
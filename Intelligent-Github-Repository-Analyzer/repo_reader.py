@@ -1,19 +1,40 @@
 import os
+import hashlib
 import subprocess
 import uuid
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import numpy as np
-from rank_bm25 import BM25Okapi
 from langchain_community.document_loaders import DirectoryLoader, NotebookLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from utility import clean_and_tokenize
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from utility import clean_and_tokenize, ensure_nltk_data
+from file_loader import load_file_content, split_and_tokenize
+from file_walker import walk_repository, group_by_extension
+from embedding_cache import EmbeddingCache, EMBEDDING_CACHE_DIR
+from lexical_index import LexicalIndex
+from cache_manager import CollectionStore
 from sentence_transformers import SentenceTransformer
 import chromadb
 from chromadb.config import Settings
 
 CHROMA_DB_DIR = "./chroma_db"
+RETRIEVAL_MODEL_NAME = "all-MiniLM-L6-v2"
+# Worker count for parallel ingestion; 1 disables the pools
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", "0")) or (os.cpu_count() or 1)
+# Below this many files the pool start-up cost outweighs the gain
+PARALLEL_MIN_FILES = 32
+# Chunks embedded and upserted per Chroma call
+EMBED_BATCH_SIZE = 256
+# Hybrid search: candidates taken from each retriever, and the RRF damping constant
+CANDIDATES_PER_RETRIEVER = 50
+RRF_K = 60
+# File extensions we want to process
+INDEX_EXTENSIONS = ['txt', 'md', 'markdown', 'rst', 'py', 'js', 'ts', 'jsx', 'tsx', 'java', 'c', 'cpp', 'cs', 'go', 'rb', 'php', 'scala', 'html', 'htm', 'xml', 'json', 'yaml', 'yml', 'ini', 'toml', 'cfg', 'conf', 'sh', 'bash', 'css', 'scss', 'sql', 'vue', 'svelte', 'r', 'R', 'dart', 'kt', 'swift', 'pl', 'lua']
+# Sparse-checkout patterns that materialize only indexable files
+INDEX_SPARSE_PATTERNS = [f'*.{ext}' for ext in INDEX_EXTENSIONS]
 _retrieval_embedder = None
+_embedding_cache = None
 _chroma_client = None
 
 
@@ -21,10 +42,19 @@ def get_retrieval_embedder():
     """Lazy-load embedding model for retrieval."""
     global _retrieval_embedder
     if _retrieval_embedder is None:
-        _retrieval_embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        _retrieval_embedder = SentenceTransformer(RETRIEVAL_MODEL_NAME)
     return _retrieval_embedder
 
 
+def get_embedding_cache():
+    """Lazy-load the content-addressed chunk embedding cache."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        dimension = get_retrieval_embedder().get_sentence_embedding_dimension()
+        _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, RETRIEVAL_MODEL_NAME, dimension)
+    return _embedding_cache
+
+
 def get_chroma_client():
     """Lazy-load Chroma client with persistent local storage."""
     global _chroma_client
@@ -32,6 +62,31 @@ def get_chroma_client():
         _chroma_client = chromadb.Client(Settings(persist_directory=CHROMA_DB_DIR, is_persistent=True))
     return _chroma_client
 
+
+def chroma_disk_usage():
+    """Bytes the persistent Chroma store occupies on disk."""
+    total = 0
+    for root, _, files in os.walk(CHROMA_DB_DIR):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def delete_chroma_collection(collection_name):
+    """Drop a collection and its embeddings from the persistent Chroma store."""
+    try:
+        get_chroma_client().delete_collection(collection_name)
+    except Exception as ex:
+        print(f"Could not delete Chroma collection {collection_name}: {ex}")
+
+
+# Lets cache eviction delete the collections of evicted entries and budget their size
+CHROMA_STORE = CollectionStore(chroma_disk_usage, delete_chroma_collection)
+
+
 def clone_git_repo(url, path):
     """Clone a git repository with URL validation and auto-correction."""
     try:
@@ -56,137 +111,257 @@ def clone_git_repo(url, path):
             except subprocess.CalledProcessError:
                 return False
         return False
-    
-def load_and_index_files(repo_path):
-    import glob as glob_module
+
+
+def get_head_commit(repo_path):
+    """Return the SHA of the checked-out commit, or None if it cannot be read."""
+    try:
+        result = subprocess.run(['git', '-C', repo_path, 'rev-parse', 'HEAD'], check=True, capture_output=True, text=True)
+        return result.stdout.strip() or None
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def _pool_map(executor_cls, func, items, workers, **kwargs):
+    """Map func over items in order, in a pool when it is worth it."""
+    if workers <= 1 or len(items) < PARALLEL_MIN_FILES:
+        return list(map(func, items))
+    pool_kwargs = {'max_workers': workers}
+    if executor_cls is ProcessPoolExecutor:
+        # spawn: forking a process that runs Streamlit and background threads is not safe
+        pool_kwargs['mp_context'] = multiprocessing.get_context('spawn')
+    try:
+        with executor_cls(**pool_kwargs) as executor:
+            return list(executor.map(func, items, **kwargs))
+    except (OSError, BrokenProcessPool) as ex:
+        print(f"Parallel ingestion unavailable ({ex}); falling back to a single worker")
+        return list(map(func, items))
+
+
+def _hash_git_blob(file_path):
+    """Compute a file's git blob SHA-1 (the value `git hash-object` prints)."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def get_file_blob_hashes(repo_path, relative_paths):
+    """
+    Map each relative path to its git blob SHA.
+
+    Tracked files come from a single `git ls-files -s` call, so unchanged
+    files are never read; anything git does not know about is hashed from disk.
+    """
+    tracked = {}
+    try:
+        result = subprocess.run(['git', '-C', repo_path, 'ls-files', '-s', '-z'], check=True, capture_output=True)
+        for entry in result.stdout.split(b'\0'):
+            if not entry:
+                continue
+            meta, path = entry.split(b'\t', 1)
+            tracked[os.path.normpath(os.fsdecode(path))] = meta.split()[1].decode()
+    except (subprocess.CalledProcessError, OSError):
+        pass
+
+    hashes = {}
+    for relative_path in relative_paths:
+        blob_sha = tracked.get(relative_path)
+        if blob_sha is None:
+            try:
+                blob_sha = _hash_git_blob(os.path.join(repo_path, relative_path))
+            except OSError:
+                continue
+        hashes[relative_path] = blob_sha
+    return hashes
+
+
+def _collect_candidate_files(repo_path, repo_files=None):
+    """Return [(relative_path, ext)] for indexable files in a deterministic order."""
+    # Single walk of the tree (hidden and vendored directories pruned up front),
+    # then route files by extension so chunk IDs are reproducible
+    if repo_files is None:
+        repo_files = walk_repository(repo_path)
+    files_by_ext = group_by_extension(repo_files, [f'.{ext}' for ext in INDEX_EXTENSIONS], case_sensitive=True)
+
+    candidate_files = []
+    for ext in INDEX_EXTENSIONS:
+        for repo_file in files_by_ext.get(f'.{ext}', []):
+            candidate_files.append((repo_file.rel_path, ext))
+    return candidate_files
+
+
+def _load_and_split_files(repo_path, candidate_files, workers):
+    """
+    Read, chunk and tokenize candidate files.
+
+    Returns (documents, tokenized_documents, file_type_counts).
+    """
     from langchain_core.documents import Document
-    
-    # Define file extensions we want to process
-    extensions = ['txt', 'md', 'markdown', 'rst', 'py', 'js', 'ts', 'jsx', 'tsx', 'java', 'c', 'cpp', 'cs', 'go', 'rb', 'php', 'scala', 'html', 'htm', 'xml', 'json', 'yaml', 'yml', 'ini', 'toml', 'cfg', 'conf', 'sh', 'bash', 'css', 'scss', 'sql', 'vue', 'svelte', 'r', 'R', 'dart', 'kt', 'swift', 'pl', 'lua']
-    
+
+    # Workers tokenize with punkt but never download it themselves
+    ensure_nltk_data()
     file_type_counts = {}
-    documents_dict = {}
     total_processed = 0
     total_errors = 0
-    
-    def load_file_content(file_path):
-        """Load content from a single file with robust error handling"""
-        try:
-            # Skip very large files
-            if os.path.getsize(file_path) > 10 * 1024 * 1024:  # 10MB limit
-                return None
-            
-            # Try different encodings
-            encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'iso-8859-1']
-            content = None
-            
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
-                        content = f.read()
-                    break
-                except (UnicodeDecodeError, UnicodeError, PermissionError):
-                    continue
-                except Exception:
-                    continue
-            
-            if content is None:
-                return None
-            
-            # Skip empty or very short files
-            if len(content.strip()) < 5:
-                return None
-            
-            # Basic binary detection - skip files with too many null bytes or non-printable chars
-            if '\x00' in content[:1000] or content.count('\x00') > 10:
-                return None
-            
-            # Check if file appears to be text (reasonable ratio of printable characters)
-            sample = content[:2000]  # Check first 2KB
-            if sample:
-                printable_count = sum(1 for c in sample if c.isprintable() or c in '\n\r\t')
-                if printable_count / len(sample) < 0.7:  # Less than 70% printable = likely binary
-                    return None
-            
-            return content
-            
-        except Exception as e:
-            print(f"Error loading file {file_path}: {e}")
-            return None
-    
-    # Process each file extension
-    for ext in extensions:
-        ext_file_count = 0
-        
-        # Find all files with this extension
-        pattern = os.path.join(repo_path, '**', f'*.{ext}')
-        matching_files = glob_module.glob(pattern, recursive=True)
-        
-        for file_path in matching_files:
-            try:
-                # Skip hidden files and directories
-                if any(part.startswith('.') for part in os.path.relpath(file_path, repo_path).split(os.sep)):
-                    if not any(file_path.endswith(f'.{allowed}') for allowed in ['gitignore', 'dockerignore', 'editorconfig']):
-                        continue
-                
-                # Load file content
-                content = load_file_content(file_path)
-                if content is not None:
-                    # Create document
-                    relative_path = os.path.relpath(file_path, repo_path)
-                    file_id = str(uuid.uuid4())
-                    
-                    doc = Document(
-                        page_content=content,
-                        metadata={
-                            "source": relative_path,
-                            "file_id": file_id
-                        }
-                    )
-                    
-                    documents_dict[file_id] = doc
-                    ext_file_count += 1
-                    total_processed += 1
-                else:
-                    total_errors += 1
-                    
-            except Exception as e:
-                total_errors += 1
-                continue
-        
-        if ext_file_count > 0:
-            file_type_counts[ext] = ext_file_count
-    
+
+    # Read, decode and sniff files on a thread pool (I/O bound)
+    contents = _pool_map(
+        ThreadPoolExecutor,
+        load_file_content,
+        [os.path.join(repo_path, relative_path) for relative_path, _ in candidate_files],
+        workers,
+    )
+
+    loaded_files = []
+    for (relative_path, ext), content in zip(candidate_files, contents):
+        if content is None:
+            total_errors += 1
+            continue
+        loaded_files.append((relative_path, content))
+        file_type_counts[ext] = file_type_counts.get(ext, 0) + 1
+        total_processed += 1
+
     print(f"Repository indexing complete: {total_processed} files processed, {total_errors} errors")
     print(f"File types found: {list(file_type_counts.keys())}")
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=3000, chunk_overlap=200)
+    # Split and tokenize on a process pool (CPU bound); map() keeps input order
+    split_results = _pool_map(
+        ProcessPoolExecutor,
+        split_and_tokenize,
+        [content for _, content in loaded_files],
+        workers,
+        chunksize=max(1, len(loaded_files) // (workers * 4)),
+    )
 
     split_documents = []
-    for file_id, original_doc in documents_dict.items():
-        split_docs = text_splitter.split_documents([original_doc])
-        for i, split_doc in enumerate(split_docs):
-            # Create unique chunk_id for each split document
-            split_doc.metadata['chunk_id'] = f"{original_doc.metadata['file_id']}_chunk_{i}"
-            split_doc.metadata['file_id'] = original_doc.metadata['file_id']
-            split_doc.metadata['source'] = original_doc.metadata['source']
+    tokenized_documents = []
+    for (relative_path, _), chunks in zip(loaded_files, split_results):
+        # Stable per-file ID derived from the path
+        file_id = str(uuid.uuid5(uuid.NAMESPACE_URL, relative_path))
+        for i, (chunk_text, tokens) in enumerate(chunks):
+            split_documents.append(Document(
+                page_content=chunk_text,
+                metadata={
+                    "source": relative_path,
+                    "file_id": file_id,
+                    # Create unique chunk_id for each split document
+                    "chunk_id": f"{file_id}_chunk_{i}"
+                }
+            ))
+            tokenized_documents.append(tokens)
 
-        split_documents.extend(split_docs)
+    return split_documents, tokenized_documents, file_type_counts
+
+
+def _count_file_types(documents):
+    """Count indexed files per extension, in INDEX_EXTENSIONS order."""
+    sources = {doc.metadata['source'] for doc in documents}
+    counts = Counter(os.path.splitext(source)[1][1:] for source in sources)
+    return {ext: counts[ext] for ext in INDEX_EXTENSIONS if counts[ext]}
+
+
+def _add_to_collection(chroma_collection, documents, progress_callback=None, batch_size=EMBED_BATCH_SIZE):
+    """
+    Embed chunks and upsert them into the Chroma collection batch by batch.
+
+    Only one batch of embeddings is held in memory at a time, batches never
+    exceed Chroma's max batch size, and progress_callback(done, total) is
+    called after each batch.
+    """
+    if not documents:
+        return
+
+    embedder = get_retrieval_embedder()
+    embedding_cache = get_embedding_cache()
+    try:
+        batch_size = min(batch_size, get_chroma_client().get_max_batch_size())
+    except Exception:
+        pass
+
+    total = len(documents)
+    for start in range(0, total, batch_size):
+        batch = documents[start:start + batch_size]
+        texts = [doc.page_content for doc in batch]
+        # Chunks seen before (in any repository) come from the cache; only misses hit the model
+        embeddings = embedding_cache.encode(embedder, texts, show_progress_bar=False)
+
+        # numpy arrays go straight to Chroma, no Python list conversion
+        chroma_collection.upsert(
+            ids=[doc.metadata['chunk_id'] for doc in batch],
+            documents=texts,
+            embeddings=np.asarray(embeddings, dtype=np.float32),
+            metadatas=[{"source": doc.metadata.get("source", ""), "file_id": doc.metadata.get("file_id", ""), "chunk_id": doc.metadata.get("chunk_id", "")} for doc in batch]
+        )
+
+        if progress_callback is not None:
+            progress_callback(min(start + batch_size, total), total)
+
+    print(f"Embedding cache: {embedding_cache.stats()}")
+
+
+def _resolve_chroma_collection(index_bundle):
+    """Return the bundle's Chroma collection, reopening it by name after a cache load."""
+    if not isinstance(index_bundle, dict):
+        return None
+    chroma_collection = index_bundle.get("chroma_collection")
+    collection_name = index_bundle.get("chroma_collection_name")
+    if chroma_collection is None and collection_name:
+        client = get_chroma_client()
+        try:
+            chroma_collection = client.get_collection(name=collection_name)
+            index_bundle["chroma_collection"] = chroma_collection
+        except Exception:
+            chroma_collection = None
+    return chroma_collection
+
+
+def build_chunk_positions(documents):
+    """Map each chunk_id to its position in the documents list."""
+    if hasattr(documents, 'chunk_ids'):
+        # On-disk chunk store: IDs come from the metadata table, no text is decoded
+        return {chunk_id: position for position, chunk_id in enumerate(documents.chunk_ids())}
+    return {doc.metadata.get('chunk_id'): position for position, doc in enumerate(documents)}
+
+
+def _get_chunk_positions(index_bundle, documents):
+    """Return the bundle's chunk_id -> position map, building it for older caches."""
+    if not isinstance(index_bundle, dict):
+        return build_chunk_positions(documents)
+    chunk_positions = index_bundle.get("chunk_positions")
+    if chunk_positions is None or len(chunk_positions) != len(documents):
+        chunk_positions = build_chunk_positions(documents)
+        index_bundle["chunk_positions"] = chunk_positions
+    return chunk_positions
+
+
+def _make_index_bundle(documents, term_counts, chroma_collection, collection_name, file_hashes, commit=None):
+    """Build the lexical index and package it with the dense collection."""
+    return {
+        # BM25 + TF-IDF statistics as flat arrays, built once and reused for every question
+        "lexical": LexicalIndex.from_term_counts(term_counts) if term_counts else None,
+        "chroma_collection": chroma_collection,
+        "chroma_collection_name": collection_name,
+        # Maps Chroma ids back to document positions in O(1)
+        "chunk_positions": build_chunk_positions(documents),
+        # Git blob SHA per candidate file, used by update_index_files
+        "file_hashes": file_hashes,
+        # Indexed commit, scopes cached answers to this exact tree
+        "commit": commit
+    }
+
+
+def load_and_index_files(repo_path, workers=None, repo_files=None, progress_callback=None):
+    workers = workers or INDEX_WORKERS
+
+    candidate_files = _collect_candidate_files(repo_path, repo_files)
+    split_documents, tokenized_documents, file_type_counts = _load_and_split_files(repo_path, candidate_files, workers)
+    file_hashes = get_file_blob_hashes(repo_path, [relative_path for relative_path, _ in candidate_files])
 
-    index = None
     chroma_collection = None
     collection_name = None
 
     if split_documents:
-        # BM25 (lexical) index
-        tokenized_documents = [clean_and_tokenize(doc.page_content) for doc in split_documents]
-        index = BM25Okapi(tokenized_documents)
-
         # Dense embeddings stored in persistent ChromaDB (local disk)
-        embedder = get_retrieval_embedder()
-        embeddings = embedder.encode([doc.page_content for doc in split_documents], show_progress_bar=False)
-        embeddings = np.asarray(embeddings, dtype=np.float32)
-
         client = get_chroma_client()
         collection_name = f"repo-{uuid.uuid4()}"
         # Recreate collection fresh to avoid stale data
@@ -195,80 +370,143 @@ def load_and_index_files(repo_path):
         except Exception:
             pass
         chroma_collection = client.get_or_create_collection(name=collection_name, metadata={"source": "local"})
+        _add_to_collection(chroma_collection, split_documents, progress_callback)
 
-        chroma_collection.add(
-            ids=[doc.metadata['chunk_id'] for doc in split_documents],
-            documents=[doc.page_content for doc in split_documents],
-            embeddings=embeddings.tolist(),
-            metadatas=[{"source": doc.metadata.get("source", ""), "file_id": doc.metadata.get("file_id", ""), "chunk_id": doc.metadata.get("chunk_id", "")} for doc in split_documents]
-        )
+    term_counts = [Counter(tokens) for tokens in tokenized_documents]
+    index_bundle = _make_index_bundle(split_documents, term_counts, chroma_collection, collection_name, file_hashes, get_head_commit(repo_path))
+    return index_bundle, split_documents, file_type_counts, [doc.metadata['source'] for doc in split_documents]
+
+
+def update_index_files(repo_path, index_bundle, documents, workers=None, repo_files=None, progress_callback=None):
+    """
+    Incrementally re-index a fresh checkout of a previously indexed repository.
+
+    Files whose git blob SHA is unchanged keep their chunks and embeddings; only
+    added or modified files are re-chunked and embedded into the existing Chroma
+    collection, and chunks of deleted files are removed. BM25/TF-IDF are rebuilt
+    from the lexical index's stored term counts, so unchanged files are never re-tokenized. Falls
+    back to load_and_index_files when the previous index cannot be reused.
+    """
+    workers = workers or INDEX_WORKERS
+
+    previous_hashes = index_bundle.get("file_hashes") if isinstance(index_bundle, dict) else None
+    lexical_index = index_bundle.get("lexical") if isinstance(index_bundle, dict) else None
+    chroma_collection = _resolve_chroma_collection(index_bundle)
+    if not previous_hashes or lexical_index is None or chroma_collection is None or documents is None:
+        print("Previous index cannot be reused; running a full re-index")
+        return load_and_index_files(repo_path, workers, repo_files, progress_callback)
+
+    candidate_files = _collect_candidate_files(repo_path, repo_files)
+    file_hashes = get_file_blob_hashes(repo_path, [relative_path for relative_path, _ in candidate_files])
+
+    changed = {path for path, blob_sha in file_hashes.items() if previous_hashes.get(path) != blob_sha}
+    deleted = set(previous_hashes) - set(file_hashes)
+    stale_sources = changed | deleted
+    print(f"Incremental re-index: {len(changed)} added/changed, {len(deleted)} deleted, "
+          f"{len(file_hashes) - len(changed)} unchanged files")
+
+    if not stale_sources:
+        index_bundle["file_hashes"] = file_hashes
+        index_bundle["commit"] = get_head_commit(repo_path)
+        return index_bundle, documents, _count_file_types(documents), [doc.metadata['source'] for doc in documents]
+
+    # Keep unchanged chunks; their term counts come straight from the lexical index
+    kept_documents = []
+    kept_term_counts = []
+    for doc, term_freqs in zip(documents, lexical_index.term_counts()):
+        if doc.metadata.get('source') not in stale_sources:
+            kept_documents.append(doc)
+            kept_term_counts.append(term_freqs)
+
+    new_documents, new_tokens, _ = _load_and_split_files(
+        repo_path,
+        [(relative_path, ext) for relative_path, ext in candidate_files if relative_path in changed],
+        workers,
+    )
+
+    # Drop stale chunks from Chroma, then embed only the new ones
+    stale_file_ids = sorted({doc.metadata['file_id'] for doc in documents if doc.metadata.get('source') in stale_sources})
+    if stale_file_ids:
+        chroma_collection.delete(where={"file_id": {"$in": stale_file_ids}})
+    if new_documents:
+        _add_to_collection(chroma_collection, new_documents, progress_callback)
+
+    split_documents = kept_documents + new_documents
+    index_bundle = _make_index_bundle(
+        split_documents,
+        kept_term_counts + [Counter(tokens) for tokens in new_tokens],
+        chroma_collection,
+        index_bundle.get("chroma_collection_name"),
+        file_hashes,
+        get_head_commit(repo_path),
+    )
+    return index_bundle, split_documents, _count_file_types(split_documents), [doc.metadata['source'] for doc in split_documents]
+
+def top_k_indices(scores, k):
+    """Positions of the k highest scores, best first (argpartition, no full sort); ties go to the earlier position."""
+    scores = np.asarray(scores)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def reciprocal_rank_fusion(rankings, n_results, rrf_k=RRF_K):
+    """Fuse best-first candidate lists by summing 1 / (rrf_k + rank) per document."""
+    fused_scores = {}
+    for ranking in rankings:
+        for rank, doc_pos in enumerate(ranking, start=1):
+            doc_pos = int(doc_pos)
+            fused_scores[doc_pos] = fused_scores.get(doc_pos, 0.0) + 1.0 / (rrf_k + rank)
+    # Ties broken by document position so results are deterministic
+    return sorted(fused_scores, key=lambda doc_pos: (-fused_scores[doc_pos], doc_pos))[:n_results]
 
-    return {
-        "bm25": index,
-        "chroma_collection": chroma_collection,
-        "chroma_collection_name": collection_name
-    }, split_documents, file_type_counts, [doc.metadata['source'] for doc in split_documents]
 
 def search_documents(query, index_bundle, documents, n_results=5):
-    """Hybrid search using BM25 + TF-IDF + Chroma (persistent local)."""
+    """Hybrid search using BM25 + TF-IDF + Chroma (persistent local), fused by reciprocal rank."""
     if not documents:
         return []
 
-    bm25_index = index_bundle.get("bm25") if isinstance(index_bundle, dict) else index_bundle
-    chroma_collection = None
-    if isinstance(index_bundle, dict):
-        chroma_collection = index_bundle.get("chroma_collection")
-        collection_name = index_bundle.get("chroma_collection_name")
-        if chroma_collection is None and collection_name:
-            client = get_chroma_client()
-            try:
-                chroma_collection = client.get_collection(name=collection_name)
-                index_bundle["chroma_collection"] = chroma_collection
-            except Exception:
-                chroma_collection = None
-
-    # BM25 lexical scores
-    query_tokens = clean_and_tokenize(query)
-    bm25_scores = bm25_index.get_scores(query_tokens) if bm25_index else np.zeros(len(documents))
-
-    # TF-IDF semantic-lite scores
-    tfidf_vectorizer = TfidfVectorizer(
-        tokenizer=clean_and_tokenize,
-        lowercase=True,
-        stop_words='english',
-        use_idf=True,
-        smooth_idf=True,
-        sublinear_tf=True,
-    )
-    tfidf_matrix = tfidf_vectorizer.fit_transform([doc.page_content for doc in documents])
-    query_tfidf = tfidf_vectorizer.transform([query])
-    cosine_sim_scores = cosine_similarity(query_tfidf, tfidf_matrix).flatten()
+    lexical_index = index_bundle.get("lexical") if isinstance(index_bundle, dict) else None
+    chroma_collection = _resolve_chroma_collection(index_bundle)
+    # Each retriever contributes its own top-k; fusion cost depends on k, not corpus size
+    candidate_k = max(n_results, CANDIDATES_PER_RETRIEVER)
+    rankings = []
+    # Used to fill up the results when the retrievers find fewer than n_results matches
+    fallback_ranking = range(len(documents))
 
-    # Chroma dense scores (convert distances to similarity)
-    chroma_scores = np.zeros(len(documents))
+    # BM25 and TF-IDF lexical rankings; only the query terms' postings are read
+    if lexical_index is not None:
+        bm25_scores, tfidf_scores = lexical_index.score(clean_and_tokenize(query))
+        bm25_ranking = top_k_indices(bm25_scores, candidate_k)
+        tfidf_ranking = top_k_indices(tfidf_scores, candidate_k)
+        # Only documents sharing a term with the query take part in fusion
+        rankings.append(bm25_ranking[bm25_scores[bm25_ranking] > 0])
+        rankings.append(tfidf_ranking[tfidf_scores[tfidf_ranking] > 0])
+        fallback_ranking = bm25_ranking
+
+    # Chroma dense ranking (results already come back nearest first)
     if chroma_collection is not None:
         try:
             embedder = get_retrieval_embedder()
             q_embed = embedder.encode([query], show_progress_bar=False)
             q_embed = np.asarray(q_embed, dtype=np.float32)
-            result = chroma_collection.query(query_embeddings=q_embed.tolist(), n_results=min(n_results, len(documents)))
+            result = chroma_collection.query(query_embeddings=q_embed.tolist(), n_results=min(candidate_k, len(documents)))
             if result and result.get("ids"):
-                ids = result["ids"][0]
-                distances = result.get("distances", [[0] * len(ids)])[0]
-                for idx, doc_id in enumerate(ids):
-                    try:
-                        doc_pos = next(i for i, d in enumerate(documents) if d.metadata.get("file_id") == doc_id)
-                        chroma_scores[doc_pos] = 1 - distances[idx]
-                    except StopIteration:
-                        continue
+                # Chroma ids are chunk_ids; resolve them through the prebuilt position map
+                chunk_positions = _get_chunk_positions(index_bundle, documents)
+                dense_ranking = [chunk_positions[chunk_id] for chunk_id in result["ids"][0] if chunk_id in chunk_positions]
+                rankings.append(dense_ranking)
         except Exception:
             pass
 
-    combined_scores = (
-        0.34 * bm25_scores
-        + 0.33 * cosine_sim_scores
-        + 0.33 * chroma_scores
-    )
-
-    unique_top_document_indices = list(set(combined_scores.argsort()[::-1]))[:n_results]
-    return [documents[i] for i in unique_top_document_indices]
+    top_document_indices = reciprocal_rank_fusion(rankings, n_results)
+    if len(top_document_indices) < n_results:
+        chosen = set(top_document_indices)
+        for doc_pos in fallback_ranking:
+            if len(top_document_indices) == n_results:
+                break
+            if int(doc_pos) not in chosen:
+                top_document_indices.append(int(doc_pos))
+    return [documents[i] for i in top_document_indices]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the semantic answer cache
+"""
+
+import time
+import numpy as np
+from answer_cache import AnswerCache
+
+
+def test_similar_question_hits():
+    print("🔍 Testing semantic lookup...")
+    cache = AnswerCache(max_entries=10, ttl_seconds=60, similarity_threshold=0.9)
+    cache.store("https://github.com/a/b", "c1", "What is this repo about?", [1.0, 0.0, 0.1], "An analyzer.")
+
+    # Near-duplicate question on the same commit hits
+    assert cache.lookup("https://github.com/a/b", "c1", [0.98, 0.0, 0.12]) == "An analyzer."
+    # Unrelated question, other commit or other repo all miss
+    assert cache.lookup("https://github.com/a/b", "c1", [0.0, 1.0, 0.0]) is None
+    assert cache.lookup("https://github.com/a/b", "c2", [1.0, 0.0, 0.1]) is None
+    assert cache.lookup("https://github.com/x/y", "c1", [1.0, 0.0, 0.1]) is None
+
+    stats = cache.stats()
+    print(f"   stats: {stats}")
+    assert stats['hits'] == 1 and stats['misses'] == 3
+    print("✅ Semantic lookup works")
+
+
+def test_conversation_scope():
+    print("\n🔍 Testing follow-up scoping...")
+    cache = AnswerCache(max_entries=10, ttl_seconds=60, similarity_threshold=0.9)
+    cache.store("repo", "c1", "And the tests?", [1.0, 0.0], "In tests/.", history_key="h1")
+    # Same follow-up after the same turns hits; after other turns or in a fresh conversation it misses
+    assert cache.lookup("repo", "c1", [1.0, 0.0], history_key="h1") == "In tests/."
+    assert cache.lookup("repo", "c1", [1.0, 0.0], history_key="h2") is None
+    assert cache.lookup("repo", "c1", [1.0, 0.0]) is None
+    print("✅ Follow-up scoping works")
+
+
+def test_lru_and_ttl_eviction():
+    print("\n🔍 Testing LRU and TTL eviction...")
+    cache = AnswerCache(max_entries=2, ttl_seconds=60, similarity_threshold=0.9)
+    cache.store("repo", "c1", "q1", [1.0, 0.0, 0.0], "a1")
+    cache.store("repo", "c1", "q2", [0.0, 1.0, 0.0], "a2")
+    # Touch q1 so q2 becomes least recently used
+    assert cache.lookup("repo", "c1", [1.0, 0.0, 0.0]) == "a1"
+    cache.store("repo", "c1", "q3", [0.0, 0.0, 1.0], "a3")
+    assert len(cache) == 2
+    assert cache.lookup("repo", "c1", [0.0, 1.0, 0.0]) is None
+    assert cache.lookup("repo", "c1", [1.0, 0.0, 0.0]) == "a1"
+
+    expiring = AnswerCache(max_entries=10, ttl_seconds=0.05, similarity_threshold=0.9)
+    expiring.store("repo", "c1", "q1", np.array([1.0, 0.0]), "a1")
+    time.sleep(0.1)
+    assert expiring.lookup("repo", "c1", [1.0, 0.0]) is None
+    assert len(expiring) == 0
+    print("✅ Eviction works")
+
+
+if __name__ == "__main__":
+    try:
+        test_similar_question_hits()
+        test_conversation_scope()
+        test_lru_and_ttl_eviction()
+        print("\n✅ All answer cache tests passed!")
+    except Exception as e:
+        print(f"\n❌ Error testing answer cache: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test script for the columnar commit analytics
+"""
+
+from git_history import CommitRecord, FileChange
+from commit_analytics import build_commit_tables, summarize_history, window_start, empty_history_metrics
+
+DAY = 24 * 3600
+
+
+def make_history():
+    # Newest first, as git log yields them
+    return [
+        CommitRecord('c' * 40, 'bob', 'bob@x', 30 * DAY, 'tweak', [FileChange('a.py', 2, 1)]),
+        CommitRecord('b' * 40, 'alice', 'alice@x', 10 * DAY, 'feature', [FileChange('a.py', 10, 0), FileChange('b.py', 5, 0)]),
+        CommitRecord('a' * 40, 'alice', 'alice@x', 0, 'init', [FileChange('a.py', 1, 0), FileChange('logo.png', 0, 0)]),
+    ]
+
+
+def test_summary():
+    print("🔍 Testing history aggregates...")
+    commits, file_changes = build_commit_tables(make_history())
+    assert len(commits) == 3 and len(file_changes) == 5
+    assert commits['insertions'].tolist() == [2, 15, 1]
+
+    summary = summarize_history(commits, file_changes)
+    print(f"   authors: {summary['author_stats'].to_dict()}")
+    assert summary['total_commits'] == 3
+    assert summary['author_stats'].to_dict() == {'alice': 2, 'bob': 1}
+    assert summary['file_changes'].to_dict() == {'a.py': 3, 'b.py': 1, 'logo.png': 1}
+    assert summary['daily_commits'].sum() == 3
+    assert summary['weekly_churn']['insertions'].sum() == 18
+    assert summary['bus_factor'] == 1
+    # a.py has two authors
+    assert summary['single_author_files'] == 2
+    assert summary['repo_age_days'] == 30
+    print("✅ History aggregates work")
+
+
+def test_time_window():
+    print("\n🔍 Testing time windows...")
+    commits, file_changes = build_commit_tables(make_history())
+    recent = summarize_history(commits, file_changes, since=window_start(commits, 25))
+    assert recent['total_commits'] == 2
+    assert recent['author_stats'].to_dict() == {'alice': 1, 'bob': 1}
+    assert recent['file_changes'].to_dict() == {'a.py': 2, 'b.py': 1}
+    assert recent['bus_factor'] == 1 and recent['single_author_files'] == 1
+
+    empty = empty_history_metrics()
+    assert empty['total_commits'] == 0 and empty['bus_factor'] == 0
+    assert len(empty['daily_commits']) == 0 and empty['commit_table'].empty
+    print("✅ Time windows work")
+
+
+if __name__ == "__main__":
+    try:
+        test_summary()
+        test_time_window()
+        print("\n✅ All commit analytics tests passed!")
+    except Exception as e:
+        print(f"\n❌ Error testing commit analytics: {e}")
+        import traceback
+        traceback.print_exc()
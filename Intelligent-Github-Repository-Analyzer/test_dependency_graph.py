@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for AST import extraction and module-index resolution
+"""
+
+import random
+from dependency_graph import ModuleIndex, build_dependency_graph, parse_python_imports
+
+SOURCES = {
+    'src/app/__init__.py': "from . import views\nfrom .models import User\nimport requests\n",
+    'src/app/views.py': "from ..lib import utils\nfrom app.models import User\ntry:\n    import numpy\nexcept ImportError:\n    pass\n",
+    'src/app/models.py': "import os\nfrom lib.utils import helper\n",
+    'src/app/api/handlers.py': "from .. import views\n",
+    'src/lib/utils.py': "def helper():\n    pass\n",
+}
+
+
+def make_records():
+    records = []
+    for path, source in SOURCES.items():
+        records.append({
+            'module': path.replace('/', '.')[:-3],
+            'file_path': path,
+            'file_type': '.py',
+            'lines': source.count('\n'),
+            'complexity': 0,
+            'imports': parse_python_imports(source)
+        })
+    return records
+
+
+def test_module_index():
+    print("🔍 Testing module index...")
+    index = ModuleIndex(['src.app.__init__', 'src.app.utils', 'src.lib.utils'])
+    assert index.resolve('src.app', 'x') == 'src.app.__init__'
+    assert sorted(index.suffix_matches('utils')) == ['src.app.utils', 'src.lib.utils']
+    # Ambiguous suffix: the candidate closest to the importer wins
+    assert index.resolve('utils', 'src.lib.other') == 'src.lib.utils'
+    assert index.resolve('lib.utils', 'src.app.views') == 'src.lib.utils'
+    assert index.resolve('missing', 'src.app.views') is None
+    assert parse_python_imports("def broken(:\n") is None
+    print("✅ Module index works")
+
+
+def test_graph_resolution():
+    print("\n🔍 Testing dependency resolution...")
+    records = make_records()
+    G = build_dependency_graph(records)
+    edges = set(G.edges())
+    print(f"   edges: {sorted(edges)}")
+    assert ('src.app.__init__', 'src.app.views') in edges
+    assert ('src.app.__init__', 'src.app.models') in edges
+    assert ('src.app.__init__', 'ext:requests') in edges
+    assert ('src.app.views', 'src.lib.utils') in edges
+    assert ('src.app.views', 'src.app.models') in edges
+    # Imports nested in try blocks are found too; os is a built-in
+    assert ('src.app.views', 'ext:numpy') in edges
+    assert ('src.app.api.handlers', 'src.app.views') in edges
+    assert ('src.app.models', 'src.lib.utils') in edges
+    assert not any(target == 'ext:os' for _, target in edges)
+
+    # Walk order does not matter
+    for _ in range(5):
+        random.shuffle(records)
+        assert set(build_dependency_graph(records).edges()) == edges
+    print("✅ Dependency resolution works")
+
+
+if __name__ == "__main__":
+    try:
+        test_module_index()
+        test_graph_resolution()
+        print("\n✅ All dependency graph tests passed!")
+    except Exception as e:
+        print(f"\n❌ Error testing dependency graph: {e}")
+        import traceback
+        traceback.print_exc()
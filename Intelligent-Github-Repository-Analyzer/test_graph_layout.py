@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached graph layout and the architecture chart arrays
+"""
+
+import numpy as np
+import networkx as nx
+from graph_layout import compute_layout, graph_arrays, edge_polyline, node_roles, NODE_ROLES
+
+
+def make_graph():
+    G = nx.DiGraph()
+    G.add_edges_from([('app', 'views'), ('app', 'models'), ('views', 'models'),
+                      ('views', 'utils'), ('models', 'utils')])
+    G.add_node('lonely')
+    return G
+
+
+def test_layout():
+    print("🔍 Testing layered layout...")
+    G = make_graph()
+    pos = compute_layout(G)
+    assert set(pos) == set(G.nodes())
+    # Entry point above its dependencies, leaves at the bottom
+    assert pos['app'][1] > pos['views'][1] > pos['models'][1] > pos['utils'][1]
+    assert compute_layout(G) is pos
+    print("✅ Layered layout works")
+
+
+def test_chart_arrays():
+    print("\n🔍 Testing chart arrays...")
+    G = make_graph()
+    pos = compute_layout(G)
+    nodes, xy, edges, in_degree, out_degree = graph_arrays(G, pos)
+    assert list(in_degree) == [G.in_degree(node) for node in nodes]
+    assert list(out_degree) == [G.out_degree(node) for node in nodes]
+
+    edge_x, edge_y = edge_polyline(xy, edges)
+    assert len(edge_x) == 3 * G.number_of_edges()
+    assert np.isnan(edge_x[2::3]).all()
+    assert (edge_x[0], edge_y[0]) == pos[nodes[edges[0, 0]]]
+
+    roles = {node: NODE_ROLES[role][0] for node, role in zip(nodes, node_roles(in_degree, out_degree))}
+    print(f"   roles: {roles}")
+    assert roles['app'] == 'Entry points'
+    assert roles['utils'] == 'Leaf modules'
+    assert roles['lonely'] == 'Balanced'
+    print("✅ Chart arrays work")
+
+
+if __name__ == "__main__":
+    try:
+        test_layout()
+        test_chart_arrays()
+        print("\n✅ All graph layout tests passed!")
+    except Exception as e:
+        print(f"\n❌ Error testing graph layout: {e}")
+        import traceback
+        traceback.print_exc()
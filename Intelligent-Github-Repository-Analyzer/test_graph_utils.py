@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for compact graph serialization and the on-disk graph cache
+"""
+
+import tempfile
+import networkx as nx
+from graph_utils import serialize_graph_data, deserialize_graph_data, save_graph_data, load_graph_data
+
+
+def make_graph():
+    G = nx.DiGraph()
+    G.add_node('src.app', lines=120, complexity=7, file_path='src/app.py', file_type='.py')
+    G.add_node('src.utils', lines=40, complexity=1, file_path='src/utils.py', file_type='.py')
+    G.add_node('web.main', lines=80, complexity=3, file_path='web/main.js', file_type='.js')
+    # External dependencies carry no attributes
+    G.add_edges_from([('src.app', 'src.utils'), ('src.app', 'ext:requests'), ('web.main', 'react')])
+    return G
+
+
+def assert_same_graph(G, restored):
+    assert list(restored.nodes()) == list(G.nodes())
+    assert set(restored.edges()) == set(G.edges())
+    for node in G.nodes():
+        assert restored.nodes[node] == G.nodes[node], node
+
+
+def test_round_trip():
+    print("🔍 Testing compact round trip...")
+    G = make_graph()
+    graph_data = serialize_graph_data(G)
+    assert graph_data['edges'].dtype.name == 'int32'
+    assert graph_data['attributes']['file_type']['categories'] == ['.py', '.js']
+    assert_same_graph(G, deserialize_graph_data(graph_data))
+    assert serialize_graph_data(nx.DiGraph()) is None
+
+    # Unhashable values are kept as a JSON column instead of dropping the graph
+    G.nodes['src.app']['exports'] = ['main', 'run']
+    G.nodes['src.utils']['exports'] = {'helper': 1}
+    graph_data = serialize_graph_data(G)
+    assert graph_data['attributes']['exports']['kind'] == 'json'
+    assert_same_graph(G, deserialize_graph_data(graph_data))
+
+    # The older per-node dict form still loads
+    old_form = {
+        'nodes': [{'id': node, 'data': dict(data)} for node, data in G.nodes(data=True)],
+        'edges': [{'source': source, 'target': target} for source, target in G.edges()]
+    }
+    assert_same_graph(G, deserialize_graph_data(old_form))
+    print("✅ Compact round trip works")
+
+
+def test_disk_cache():
+    print("\n🔍 Testing on-disk graph cache...")
+    G = make_graph()
+    with tempfile.TemporaryDirectory() as cache_path:
+        assert load_graph_data(cache_path, "c1") is None
+        assert save_graph_data(serialize_graph_data(G), cache_path, "c1")
+        assert_same_graph(G, deserialize_graph_data(load_graph_data(cache_path, "c1")))
+        # A graph built from another commit is stale
+        assert load_graph_data(cache_path, "c2") is None
+        assert load_graph_data(cache_path, None) is None
+    print("✅ On-disk graph cache works")
+
+
+if __name__ == "__main__":
+    try:
+        test_round_trip()
+        test_disk_cache()
+        print("\n✅ All graph utils tests passed!")
+    except Exception as e:
+        print(f"\n❌ Error testing graph utils: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for the one-pass security pattern scanner
+"""
+
+import re
+from file_analyzers import PatternScanner, SECURITY_PATTERNS, SECURITY_SCANNER
+
+SAMPLE = '''import hashlib
+PASSWORD = "hunter22"
+session.get(url, ssl_verify=False)
+cursor.execute("SELECT * FROM t WHERE id = %s" % user_id)
+digest = hashlib.md5(data)
+cipher = DES(key)
+'''
+
+
+def test_findings_and_lines():
+    print("🔍 Testing findings and line numbers...")
+    found = SECURITY_SCANNER.scan(SAMPLE)
+    print(f"   found: { {category: finding['lines'] for category, finding in found.items()} }")
+    assert found['hardcoded_secrets']['lines'] == [2]
+    # 'verify' starts inside 'ssl_verify' and must still be seen
+    assert found['insecure_requests']['lines'] == [3]
+    assert found['sql_injection']['lines'] == [4]
+    assert found['weak_crypto']['lines'] == [5, 6]
+    assert 'unsafe_eval' not in found
+    print("✅ Findings and line numbers work")
+
+
+def test_matches_individual_searches():
+    print("\n🔍 Testing equivalence with per-pattern searches...")
+    texts = [SAMPLE, "", "nothing to see here", "x = eval (input())\nos.system('ls')\n", "executed(); exec (code)"]
+    for text in texts:
+        expected = {}
+        for category, patterns in SECURITY_PATTERNS.items():
+            for pattern in patterns:
+                if re.search(pattern, text.lower(), re.IGNORECASE):
+                    expected[category] = pattern
+                    break
+        found = SECURITY_SCANNER.scan(text)
+        assert expected == {category: finding['pattern'] for category, finding in found.items()}, text
+
+    # Rules without a literal prefix fall back to a plain search
+    scanner = PatternScanner({'any_digit': [r'\d+'], 'word': [r'abc']})
+    assert scanner.unanchored == [0]
+    assert scanner.scan("x\nabc 12")['any_digit']['lines'] == [2]
+    print("✅ Scanner matches individual searches")
+
+
+if __name__ == "__main__":
+    try:
+        test_findings_and_lines()
+        test_matches_individual_searches()
+        print("\n✅ All pattern scanner tests passed!")
+    except Exception as e:
+        print(f"\n❌ Error testing pattern scanner: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for hybrid retrieval helpers (lexical index, top-k selection, rank fusion)
+"""
+
+import tempfile
+import numpy as np
+from lexical_index import LexicalIndex
+from langchain_core.documents import Document
+from repo_reader import top_k_indices, reciprocal_rank_fusion, search_documents
+
+
+def test_lexical_index_scores():
+    print("🔍 Testing BM25/TF-IDF lexical index...")
+    tokenized = [
+        ["the", "cache", "manager", "saves", "cache"],
+        ["graph", "utils", "serialize", "graph"],
+        ["llm", "client", "groq", "retry"],
+    ]
+    index = LexicalIndex.from_tokenized(tokenized)
+    assert len(index) == 3
+
+    bm25_scores, tfidf_scores = index.score(["graph"])
+    print(f"   scores for 'graph': bm25={np.round(bm25_scores, 3)} tfidf={np.round(tfidf_scores, 3)}")
+    assert int(np.argmax(bm25_scores)) == 1
+    assert int(np.argmax(tfidf_scores)) == 1
+    # TF-IDF scores are cosines, and unknown or stop-word-only queries score nothing
+    assert 0 < tfidf_scores.max() <= 1.0
+    assert not index.score(["unknown"])[0].any()
+    assert not index.score(["the"])[1].any()
+
+    # Term counts survive a save/load round trip through memory-mapped arrays
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index.save(tmp_dir)
+        loaded = LexicalIndex.load(tmp_dir)
+        assert isinstance(loaded.postings_docs, np.memmap)
+        assert np.allclose(loaded.score(["cache", "groq"])[0], index.score(["cache", "groq"])[0])
+        assert loaded.term_counts()[0] == {"the": 1, "cache": 2, "manager": 1, "saves": 1}
+    print("✅ Lexical index works")
+
+
+def test_top_k_indices():
+    print("\n🔍 Testing top-k candidate selection...")
+    scores = np.array([0.0, 3.0, 1.0, 5.0, 0.0, 2.0])
+    assert list(top_k_indices(scores, 3)) == [3, 1, 5]
+    # Zero scores rank last (earlier position first), and k larger than the corpus is fine
+    assert list(top_k_indices(scores, 10)) == [3, 1, 5, 2, 0, 4]
+    assert len(top_k_indices(np.zeros(4), 2)) == 2
+    print("✅ Top-k selection works")
+
+
+def test_reciprocal_rank_fusion():
+    print("\n🔍 Testing reciprocal rank fusion...")
+    rankings = [[3, 1], [1, 2], [1]]
+    fused = reciprocal_rank_fusion(rankings, n_results=2)
+    print(f"   fused order: {fused}")
+    # Document 1 is found by every retriever, so it must win
+    assert fused == [1, 3]
+    # Order is preserved and results are unique
+    assert len(set(reciprocal_rank_fusion(rankings, n_results=5))) == 3
+    print("✅ Rank fusion works")
+
+
+def test_search_without_matches():
+    print("\n🔍 Testing search with no matching terms...")
+    tokenized = [
+        ["cache", "manager", "saves", "cache"],
+        ["graph", "utils", "serialize", "graph"],
+        ["llm", "client", "groq", "retry"],
+    ]
+    documents = [Document(page_content=" ".join(tokens)) for tokens in tokenized]
+    index_bundle = {"lexical": LexicalIndex.from_tokenized(tokenized)}
+    # No lexical overlap and no Chroma collection: the context must still be filled
+    results = search_documents("zebra", index_bundle, documents, n_results=2)
+    assert len(results) == 2
+    # A partial match comes first, then the best remaining positions
+    results = search_documents("graph", index_bundle, documents, n_results=3)
+    assert results[0] is documents[1]
+    assert len({id(doc) for doc in results}) == 3
+    print("✅ Search without matches works")
+
+
+if __name__ == "__main__":
+    try:
+        test_lexical_index_scores()
+        test_top_k_indices()
+        test_reciprocal_rank_fusion()
+        test_search_without_matches()
+        print("\n✅ All retrieval tests passed!")
+    except Exception as e:
+        print(f"\n❌ Error testing retrieval: {e}")
+        import traceback
+        traceback.print_exc()
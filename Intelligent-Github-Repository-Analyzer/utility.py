@@ -1,10 +1,28 @@
 import re
-import nltk
 import os
 
-nltk.download("punkt")
+_nltk_data_checked = False
+
+def ensure_nltk_data():
+    """Download the punkt tokenizer if it is missing; call once from the main process before tokenizing.
+
+    Kept out of import time so pool workers, which import this module, never
+    repeat the check.
+    """
+    global _nltk_data_checked
+    if _nltk_data_checked:
+        return
+    import nltk
+    try:
+        nltk.data.find("tokenizers/punkt")
+    except LookupError:
+        nltk.download("punkt")
+    _nltk_data_checked = True
 
 def clean_and_tokenize(text):
+    # Imported here so importing this module stays cheap for pool workers
+    import nltk
+
     text = re.sub(r'\s+', ' ', text)
     text = re.sub(r'<[^>]*>', '', text)
     text = re.sub(r'\[.*?\]', '', text)